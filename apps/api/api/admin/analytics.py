@@ -6,6 +6,7 @@ from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 
 from ..core.database import engine
+from ..core.serialization import fast_json
 
 from ..core.models import AnalyticsDailyStats, ContentEvent, Poi, Tour, AppEvent, User, UserCohort, RetentionMatrix, Funnel, FunnelStep, FunnelConversion
 from ..analytics.aggregation import run_daily_aggregation, calculate_cohorts, calculate_retention, calculate_funnel_stats
@@ -284,4 +285,4 @@ def get_heatmap_data(
              if cnt > max_val: max_val = cnt
              
     # Normalize intensity 0-1 if client wants, or send raw
-    return {"points": points, "max": max_val}
+    return fast_json({"points": points, "max": max_val})
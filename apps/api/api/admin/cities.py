@@ -9,6 +9,8 @@ from pydantic import BaseModel
 
 from ..core.models import City, CityBase, AuditLog, AppEvent, User, Poi, Tour
 from ..auth.deps import get_current_admin, get_session, require_permission
+from ..core.pagination import keyset_page, count_cached, ranked_page
+from ..core.search import fuzzy_search
 
 router = APIRouter()
 
@@ -45,6 +47,7 @@ class CityListResponse(BaseModel):
     page: int
     per_page: int
     pages: int
+    next_cursor: Optional[str] = None
 
 # --- ENDPOINTS ---
 
@@ -53,25 +56,28 @@ def list_cities(
     search: Optional[str] = None,
     page: int = 1,
     per_page: int = 20,
+    cursor: Optional[str] = None,
     session: Session = Depends(get_session),
     user: User = Depends(require_permission('city:read'))
 ):
     query = select(City)
+    rank = None
     
     if search:
-        query = query.where(or_(
-            City.name_ru.ilike(f"%{search}%"),
-            City.slug.ilike(f"%{search}%")
-        ))
+        # Substring or similar word (trigram GIN indexes), best matches first
+        query, rank = fuzzy_search(session, query, search, City.name_ru, City.slug)
     
-    # Count total
-    total_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(total_query).one()
+    # Total is cached per filter set (approximate for LIST_TOTAL_CACHE_SECONDS)
+    total = count_cached(session, query, f"admin_cities:{search}")
     
-    # Pagination
-    query = query.order_by(City.name_ru)
-    query = query.offset((page - 1) * per_page).limit(per_page)
-    cities = session.exec(query).all()
+    if rank is not None:
+        cities, next_cursor = ranked_page(session, query, rank, City.id, per_page, offset=(page - 1) * per_page)
+    else:
+        # Pagination: keyset on (name_ru, id) with a cursor, else by page
+        cities, next_cursor = keyset_page(
+            session, query, City.name_ru, City.id, per_page,
+            cursor=cursor, offset=(page - 1) * per_page, descending=False
+        )
     
     # Enriched response with counts
     items = []
@@ -95,7 +101,8 @@ def list_cities(
         "total": total,
         "page": page,
         "per_page": per_page,
-        "pages": (total + per_page - 1) // per_page
+        "pages": (total + per_page - 1) // per_page,
+        "next_cursor": next_cursor
     }
 
 @router.post("/admin/cities", response_model=CityRead)
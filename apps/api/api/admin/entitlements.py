@@ -10,6 +10,9 @@ import uuid
 
 from ..core.models import Entitlement, EntitlementGrant, User, City, Tour
 from ..auth.deps import get_session, get_current_admin, require_permission
+from ..core.db_routing import mark_recent_write
+from ..core.access_cache import invalidate_access, invalidate_free_tours
+from ..core.pagination import keyset_page, count_cached
 
 router = APIRouter()
 
@@ -66,6 +69,7 @@ class GrantRead(BaseModel):
 class GrantListResponse(BaseModel):
     items: List[GrantRead]
     total: int
+    next_cursor: Optional[str] = None
 
 # --- Entitlements CRUD ---
 
@@ -158,6 +162,7 @@ def create_entitlement(
     session.add(entitlement)
     session.commit()
     session.refresh(entitlement)
+    invalidate_free_tours()
     
     return EntitlementRead(
         id=entitlement.id,
@@ -211,6 +216,7 @@ def update_entitlement(
     session.add(entitlement)
     session.commit()
     session.refresh(entitlement)
+    invalidate_free_tours()
     
     return EntitlementRead(
         id=entitlement.id,
@@ -247,6 +253,7 @@ def delete_entitlement(
     
     session.delete(entitlement)
     session.commit()
+    invalidate_free_tours()
     return {"status": "deleted"}
 
 # --- Grants ---
@@ -259,10 +266,11 @@ def list_grants(
     active_only: bool = True,
     page: int = 1,
     per_page: int = 50,
+    cursor: Optional[str] = None,
     session: Session = Depends(get_session),
     user: User = Depends(require_permission('billing:read'))
 ):
-    """Список выданных прав"""
+    """Список выданных прав (cursor = next_cursor предыдущей страницы)"""
     query = select(EntitlementGrant)
     
     if entitlement_id:
@@ -274,11 +282,12 @@ def list_grants(
     if active_only:
         query = query.where(EntitlementGrant.revoked_at.is_(None))
     
-    total = session.exec(select(func.count()).select_from(query.subquery())).one()
+    total = count_cached(session, query, f"admin_grants:{entitlement_id}:{device_anon_id}:{source}:{active_only}")
     
-    query = query.order_by(EntitlementGrant.granted_at.desc())
-    query = query.offset((page - 1) * per_page).limit(per_page)
-    grants = session.exec(query).all()
+    grants, next_cursor = keyset_page(
+        session, query, EntitlementGrant.granted_at, EntitlementGrant.id, per_page,
+        cursor=cursor, offset=(page - 1) * per_page
+    )
     
     # Enrich with entitlement info
     result = []
@@ -297,7 +306,7 @@ def list_grants(
             revoked_at=g.revoked_at
         ))
     
-    return {"items": result, "total": total}
+    return {"items": result, "total": total, "next_cursor": next_cursor}
 
 @router.post("/admin/entitlements/{entitlement_id}/grant", response_model=GrantRead, status_code=201)
 def grant_entitlement(
@@ -329,6 +338,8 @@ def grant_entitlement(
     session.add(grant)
     session.commit()
     session.refresh(grant)
+    mark_recent_write(grant.device_anon_id)
+    invalidate_access(grant.device_anon_id)
     
     return GrantRead(
         id=grant.id,
@@ -360,5 +371,7 @@ def revoke_grant(
     grant.revoked_at = datetime.utcnow()
     session.add(grant)
     session.commit()
+    mark_recent_write(grant.device_anon_id)
+    invalidate_access(grant.device_anon_id)
     
     return {"status": "revoked"}
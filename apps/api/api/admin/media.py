@@ -8,7 +8,9 @@ import io
 from ..core.config import config
 from ..auth.deps import get_current_user, get_session
 from ..core.models import User, PoiMedia, TourMedia
+from sqlalchemy import literal, union_all
 from sqlmodel import Session, select, func
+from ..core.search import fuzzy_search
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -43,68 +45,52 @@ def list_media(
     user: User = Depends(get_current_user)
 ):
     """List all media from POIs and Tours"""
-    items = []
-    
     # Use 'type' if provided, otherwise use 'media_type'
     filter_type = type or media_type
-    
-    # Get POI media
-    poi_media_query = select(PoiMedia)
-    poi_media = session.exec(poi_media_query).all()
-    for m in poi_media:
-        # Filter by media type
-        if filter_type and filter_type != 'all' and m.media_type != filter_type:
-            continue
-        # Filter by entity type
-        if entity_type and entity_type != 'all' and entity_type != 'poi':
-            continue
-        # Filter by search (author or url)
+
+    def table_query(model, entity, owner_column):
+        query = select(
+            model.id, model.url, model.media_type, literal(entity).label("entity_type"),
+            owner_column.label("entity_id"), model.license_type, model.author,
+        )
+        if filter_type and filter_type != 'all':
+            query = query.where(model.media_type == filter_type)
+        rank = None
         if search:
-            search_lower = search.lower()
-            author_match = m.author and search_lower in m.author.lower()
-            url_match = m.url and search_lower in m.url.lower()
-            if not (author_match or url_match):
-                continue
-        items.append(MediaItem(
-            id=str(m.id),
-            url=m.url,
-            media_type=m.media_type,
-            entity_type='poi',
-            entity_id=str(m.poi_id),
-            license_type=m.license_type,
-            author=m.author
-        ))
-    
-    # Get Tour media (skip if entity_type filter is 'poi')
-    if not entity_type or entity_type == 'all' or entity_type == 'tour':
-        tour_media_query = select(TourMedia)
-        tour_media = session.exec(tour_media_query).all()
-        for m in tour_media:
-            # Filter by media type
-            if filter_type and filter_type != 'all' and m.media_type != filter_type:
-                continue
-            # Filter by search (author or url)
-            if search:
-                search_lower = search.lower()
-                author_match = m.author and search_lower in m.author.lower()
-                url_match = m.url and search_lower in m.url.lower()
-                if not (author_match or url_match):
-                    continue
-            items.append(MediaItem(
-                id=str(m.id),
-                url=m.url,
-                media_type=m.media_type,
-                entity_type='tour',
-                entity_id=str(m.tour_id),
-                license_type=m.license_type,
-                author=m.author
-            ))
-    
-    total = len(items)
+            # Author or URL: substring or similar word (trigram GIN indexes)
+            query, rank = fuzzy_search(session, query, search, model.author, model.url)
+        if rank is not None:
+            query = query.add_columns(rank.label("rank"))
+        return query
+
+    # Filtering, counting and paging run in the database: one UNION, two statements
+    parts = []
+    if not entity_type or entity_type in ('all', 'poi'):
+        parts.append(table_query(PoiMedia, 'poi', PoiMedia.poi_id))
+    if not entity_type or entity_type in ('all', 'tour'):
+        parts.append(table_query(TourMedia, 'tour', TourMedia.tour_id))
+    if not parts:
+        return MediaListResponse(items=[], total=0, page=page, per_page=per_page, pages=1)
+    media = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+
+    total = session.exec(select(func.count()).select_from(media)).one()
     pages = (total + per_page - 1) // per_page if total > 0 else 1
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_items = items[start:end]
+    order = [media.c.entity_type, media.c.id]
+    if "rank" in media.c:
+        order.insert(0, media.c.rank.desc())
+    rows = session.exec(select(*media.c).order_by(*order).offset((page - 1) * per_page).limit(per_page)).all()
+    paginated_items = [
+        MediaItem(
+            id=str(r.id),
+            url=r.url,
+            media_type=r.media_type,
+            entity_type=r.entity_type,
+            entity_id=str(r.entity_id),
+            license_type=r.license_type,
+            author=r.author
+        )
+        for r in rows
+    ]
     
     return MediaListResponse(
         items=paginated_items,
@@ -11,6 +11,8 @@ from datetime import datetime, timedelta
 
 from ..core.models import Poi, PoiBase, PoiVersion, AuditLog, User, AppEvent, PoiSource, PoiMedia, Narration
 from ..auth.deps import get_current_admin, get_session, require_permission
+from ..core.pagination import keyset_page, count_cached, ranked_page
+from ..core.search import fulltext_match, fuzzy_search, prefix_query
 from ..core.config import config as settings
 from ..core.async_utils import enqueue_job
 import requests
@@ -71,6 +73,7 @@ class PoiListResponse(BaseModel):
     page: int
     per_page: int
     pages: int
+    next_cursor: Optional[str] = None
 
 class PoiDetailResponse(BaseModel):
     poi: PoiRead
@@ -125,12 +128,15 @@ def list_pois(
     city_slug: Optional[str] = None,
     status: Optional[str] = None, # published, draft
     search: Optional[str] = None,
+    search_mode: str = Query("fuzzy", pattern="^(fuzzy|fulltext)$"),
     page: int = 1,
     per_page: int = 20,
+    cursor: Optional[str] = None,
     session: Session = Depends(get_session),
     user: User = Depends(require_permission('poi:read'))
 ):
     query = select(Poi).where(Poi.is_deleted == False)
+    rank = None
     
     if city_slug:
         query = query.where(Poi.city_slug == city_slug)
@@ -140,27 +146,33 @@ def list_pois(
     elif status == "draft":
         query = query.where(Poi.published_at.is_(None))
         
-    if search:
-        query = query.where(or_(
-            Poi.title_ru.ilike(f"%{search}%"),
-            Poi.description_ru.ilike(f"%{search}%")
-        ))
-    
-    # Count total
-    total_query = select(func.count()).select_from(query.subquery())
-    total = session.exec(total_query).one()
-    
-    # Pagination
-    query = query.order_by(Poi.updated_at.desc())
-    query = query.offset((page - 1) * per_page).limit(per_page)
-    items = session.exec(query).all()
+    if search and search_mode == "fulltext":
+        # GIN index on poi.search_vector (word prefixes, any word form)
+        query_text = prefix_query(search)
+        if query_text:
+            query = query.where(fulltext_match(Poi, query_text))
+    elif search:
+        # Substring or similar word (trigram GIN indexes), best matches first
+        query, rank = fuzzy_search(session, query, search, Poi.title_ru, Poi.description_ru)
+    
+    # Total is cached per filter set (approximate for LIST_TOTAL_CACHE_SECONDS)
+    total = count_cached(session, query, f"admin_pois:{city_slug}:{status}:{search_mode}:{search}")
+    
+    if rank is not None:
+        items, next_cursor = ranked_page(session, query, rank, Poi.id, per_page, offset=(page - 1) * per_page)
+    else:
+        # Pagination: keyset on (updated_at, id) with a cursor, else by page
+        items, next_cursor = keyset_page(
+            session, query, Poi.updated_at, Poi.id, per_page, cursor=cursor, offset=(page - 1) * per_page
+        )
     
     return {
         "items": items,
         "total": total,
         "page": page,
         "per_page": per_page,
-        "pages": (total + per_page - 1) // per_page
+        "pages": (total + per_page - 1) // per_page,
+        "next_cursor": next_cursor
     }
 
 @router.post("/admin/pois", response_model=PoiRead, dependencies=[Depends(require_permission('poi:write'))])
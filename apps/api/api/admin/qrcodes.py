@@ -3,11 +3,13 @@ from typing import List, Optional
 from datetime import datetime
 import uuid
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
+from sqlmodel import Session, select, update
 from pydantic import BaseModel
 
 from ..core.models import QRMapping, Poi, Tour, User
 from ..auth.deps import get_current_admin, get_session, require_permission
+from ..core.db_routing import get_read_session
+from ..core.search import fuzzy_search
 
 router = APIRouter()
 
@@ -33,7 +35,11 @@ def list_qr_mappings(
     query = select(QRMapping)
     if target_type: query = query.where(QRMapping.target_type == target_type)
     if is_active is not None: query = query.where(QRMapping.is_active == is_active)
-    if search: query = query.where(QRMapping.code.ilike(f"%{search}%") | QRMapping.label.ilike(f"%{search}%"))
+    if search:
+        # Substring or similar word (trigram GIN indexes), best matches first
+        query, rank = fuzzy_search(session, query, search, QRMapping.code, QRMapping.label)
+        if rank is not None:
+            return session.exec(query.order_by(rank.desc(), QRMapping.created_at.desc())).all()
     return session.exec(query.order_by(QRMapping.created_at.desc())).all()
 
 @router.post("/admin/qr-mappings", tags=["Admin QR"])
@@ -106,15 +112,19 @@ def bulk_generate_qr_codes(
 @router.get("/public/qr/{code}", tags=["Public QR"])
 def resolve_qr_code(
     code: str,
+    read_session: Session = Depends(get_read_session),
     session: Session = Depends(get_session)
 ):
-    mapping = session.exec(select(QRMapping).where(QRMapping.code == code, QRMapping.is_active == True)).first()
+    # Lookup on the replica; only the counter bump hits the primary
+    mapping = read_session.exec(select(QRMapping).where(QRMapping.code == code, QRMapping.is_active == True)).first()
     if not mapping: raise HTTPException(404, "QR code not found")
     
-    # Increment scan counter
-    mapping.scans_count += 1
-    mapping.last_scanned_at = datetime.utcnow()
-    session.add(mapping)
+    # Increment scan counter atomically (no read-modify-write on the primary)
+    session.exec(
+        update(QRMapping)
+        .where(QRMapping.id == mapping.id)
+        .values(scans_count=QRMapping.scans_count + 1, last_scanned_at=datetime.utcnow())
+    )
     session.commit()
     
     return {
@@ -9,7 +9,8 @@ from typing import List, Optional
 from datetime import datetime
 import uuid
 
-from ..core.models import User, TourRating, Tour
+from ..core.models import User, TourRating, TourRatingSummary, Tour
+from ..core.rating_summary import apply_rating_change
 from ..auth.deps import get_session, require_permission
 
 router = APIRouter()
@@ -96,12 +97,10 @@ def get_ratings_stats(
     admin: User = Depends(require_permission('ratings:read'))
 ):
     """Получить статистику отзывов по турам"""
-    # Get all tours with ratings
-    stmt = select(
-        TourRating.tour_id,
-        func.avg(TourRating.rating).label('avg_rating'),
-        func.count(TourRating.id).label('total')
-    ).group_by(TourRating.tour_id)
+    # Maintained per-tour summaries (count, sum, star histogram) with titles
+    stmt = select(TourRatingSummary, Tour.title_ru).join(
+        Tour, Tour.id == TourRatingSummary.tour_id
+    ).where(TourRatingSummary.rating_count > 0)
     
     results = session.exec(stmt).all()
     
@@ -109,32 +108,17 @@ def get_ratings_stats(
     overall_sum = 0
     overall_count = 0
     
-    for tour_id, avg_rating, total in results:
-        tour = session.get(Tour, tour_id)
-        if not tour:
-            continue
-            
-        # Get rating distribution
-        dist_stmt = select(
-            TourRating.rating,
-            func.count(TourRating.id)
-        ).where(TourRating.tour_id == tour_id).group_by(TourRating.rating)
-        
-        dist_results = session.exec(dist_stmt).all()
-        distribution = {i: 0 for i in range(1, 6)}
-        for r, c in dist_results:
-            distribution[r] = c
-        
+    for summary, tour_title in results:
         items.append(RatingStats(
-            tour_id=tour_id,
-            tour_title=tour.title_ru,
-            avg_rating=round(float(avg_rating), 2),
-            total_reviews=total,
-            rating_distribution=distribution
+            tour_id=summary.tour_id,
+            tour_title=tour_title,
+            avg_rating=round(summary.avg_rating, 2),
+            total_reviews=summary.rating_count,
+            rating_distribution=summary.distribution
         ))
         
-        overall_sum += float(avg_rating) * total
-        overall_count += total
+        overall_sum += summary.rating_sum
+        overall_count += summary.rating_count
     
     # Sort by avg rating desc
     items.sort(key=lambda x: x.avg_rating, reverse=True)
@@ -182,6 +166,7 @@ def delete_rating(
     if not rating:
         raise HTTPException(404, "Rating not found")
     
+    apply_rating_change(session, rating.tour_id, rating.rating, None)
     session.delete(rating)
     session.commit()
     
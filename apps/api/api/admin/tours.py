@@ -13,6 +13,8 @@ from ..core.models import (
     ContentValidationIssue, AppEvent, PoiBase, Entitlement
 )
 from ..auth.deps import get_current_admin, get_session, require_permission
+from ..core.access_cache import invalidate_free_tours
+from ..core.search import fulltext_match, fuzzy_search, prefix_query
 
 router = APIRouter()
 
@@ -124,12 +126,14 @@ def list_tours(
     city_slug: Optional[str] = None,
     status: Optional[str] = None,
     search: Optional[str] = None,
+    search_mode: str = Query("fuzzy", pattern="^(fuzzy|fulltext)$"),
     page: int = 1,
     per_page: int = 20,
     session: Session = Depends(get_session),
     user: User = Depends(require_permission('tour:read'))
 ):
     query = select(Tour).where(Tour.is_deleted == False)
+    rank = None
     
     if city_slug:
         query = query.where(Tour.city_slug == city_slug)
@@ -139,12 +143,18 @@ def list_tours(
     elif status == "draft":
         query = query.where(Tour.published_at.is_(None))
         
-    if search:
-        query = query.where(Tour.title_ru.ilike(f"%{search}%"))
+    if search and search_mode == "fulltext":
+        # GIN index on tour.search_vector (word prefixes, any word form)
+        query_text = prefix_query(search)
+        if query_text:
+            query = query.where(fulltext_match(Tour, query_text))
+    elif search:
+        # Substring or similar word (trigram GIN index), best matches first
+        query, rank = fuzzy_search(session, query, search, Tour.title_ru)
         
     total = session.exec(select(func.count()).select_from(query.subquery())).one()
     
-    query = query.order_by(Tour.updated_at.desc())
+    query = query.order_by(rank.desc(), Tour.id) if rank is not None else query.order_by(Tour.updated_at.desc())
     query = query.offset((page-1)*per_page).limit(per_page)
     items = session.exec(query).all()
     
@@ -624,6 +634,7 @@ def make_tour_free(
     )
     session.add(audit)
     session.commit()
+    invalidate_free_tours()
     
     return {"status": "created", "entitlement_id": str(entitlement.id)}
 
@@ -655,5 +666,6 @@ def remove_tour_free_access(
     )
     session.add(audit)
     session.commit()
+    invalidate_free_tours()
     
     return {"status": "removed"}
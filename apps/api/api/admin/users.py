@@ -1,5 +1,5 @@
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlmodel import Session, select, func, text
 from datetime import datetime, timedelta
 from typing import List, Optional
@@ -9,6 +9,8 @@ import uuid
 from ..core.database import engine
 from ..core.models import User, UserIdentity, Role, AuditLog, BlacklistedToken
 from ..auth.deps import get_session, require_permission
+from ..core.pagination import keyset_page
+from ..core.search import fuzzy_search
 
 router = APIRouter()
 
@@ -27,10 +29,12 @@ class UserUpdate(BaseModel):
 
 @router.get("/admin/users", response_model=List[UserRead])
 def list_users(
+    response: Response,
     offset: int = 0,
     limit: int = 50,
     role: Optional[str] = None,
     search: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     session: Session = Depends(get_session),
     admin: User = Depends(require_permission('users:manage'))
 ):
@@ -42,11 +46,14 @@ def list_users(
             uid = uuid.UUID(search)
             query = query.where(User.id == uid)
         except ValueError:
-            # Search by phone/email in UserIdentity
-            query = query.join(UserIdentity).where(UserIdentity.provider_id.ilike(f"%{search}%"))
+            # Search by phone/email in UserIdentity (trigram GIN index); list order unchanged
+            identities, _ = fuzzy_search(session, select(UserIdentity.user_id), search, UserIdentity.provider_id)
+            query = query.where(User.id.in_(identities))
             
-    query = query.offset(offset).limit(limit).order_by(User.created_at.desc())
-    users = session.exec(query).all()
+    # Keyset on (created_at, id) with a cursor; the body stays a plain list
+    users, next_cursor = keyset_page(session, query, User.created_at, User.id, limit, cursor=cursor, offset=offset)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     res = []
     for u in users:
@@ -7,6 +7,8 @@ from sqlalchemy.exc import IntegrityError
 
 from ..core.models import EntitlementGrant, Entitlement, AuditLog
 from ..core.config import config
+from ..core.db_routing import mark_recent_write
+from ..core.access_cache import invalidate_access_async
 from fastapi import HTTPException
 
 logger = logging.getLogger(__name__)
@@ -77,6 +79,8 @@ async def grant_entitlement(
         session.add(audit)
         session.commit()
         session.refresh(grant)
+        mark_recent_write(device_anon_id)
+        await invalidate_access_async(device_anon_id)
         logger.info(f"[{trace_id}] New grant created: {grant.id}")
         return grant, True
         
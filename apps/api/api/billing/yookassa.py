@@ -9,6 +9,8 @@ from sqlalchemy.exc import IntegrityError
 from ..core.database import engine
 from ..core.models import PurchaseIntent, Purchase, Entitlement, EntitlementGrant, AuditLog
 from ..core.config import config
+from ..core.db_routing import mark_recent_write
+from ..core.access_cache import invalidate_access_async
 import uuid
 from datetime import datetime
 
@@ -131,6 +133,8 @@ async def yookassa_webhook(
             session.add(audit)
 
             session.commit()
+            mark_recent_write(intent.device_anon_id)
+            await invalidate_access_async(intent.device_anon_id)
             logger.info("EntitlementGrant successful", extra={"grant_id": str(grant.id), "event": event})
             return {"status": "accepted"}
 
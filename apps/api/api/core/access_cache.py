@@ -0,0 +1,245 @@
+"""
+Entitlement access-decision cache for check_access.
+
+Decisions are keyed by (device_anon_id, city, tour) and stored in one Redis
+hash per device (access:<device>), so a single DEL drops everything a device
+was granted or denied. Writers that change a device's grants (purchase
+confirm, billing grant, admin grant/revoke, deletion worker) call
+invalidate_access() after commit, or invalidate_access_async() from async
+handlers so the Redis round trip does not block the event loop (likewise
+invalidate_free_tours_async()).
+
+invalidate_access() also bumps a per-device generation
+(access-gen:<device>). get_cached_access() returns the generation seen
+before the DB read and set_cached_access() stores the decision only if it
+is unchanged (one Lua call), so a "no" read just before a purchase commits
+cannot be cached after the purchase's invalidation.
+
+The in-process layer only keeps positive decisions, for
+ACCESS_CACHE_LOCAL_TTL_SECONDS: other workers cannot clear it, and a stale
+"no" right after a purchase would lock the buyer out, while a stale "yes"
+after a revoke is harmless for a few seconds.
+
+Free tours are not per device: their ids are precomputed into one set
+(locally and in Redis) and dropped by invalidate_free_tours() whenever
+entitlements change. The set has the same generation guard (one global
+counter, plus a local one for this worker's copy), so a set read from the
+DB before an invalidation is not cached after it.
+"""
+import time
+import logging
+from typing import Optional
+
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .config import config
+from .caching import redis_client, async_redis_client
+from .models import Entitlement
+
+logger = logging.getLogger(__name__)
+
+ACCESS_KEY_PREFIX = "access:"
+GENERATION_KEY_PREFIX = "access-gen:"
+# outlives any DB read between get_cached_access and set_cached_access
+_GENERATION_TTL_SECONDS = 86400
+FREE_TOURS_KEY = "access:free_tours"
+FREE_TOURS_GENERATION_KEY = "access:free_tours:gen"
+_FREE_TOURS_SENTINEL = ""  # keeps an empty set distinguishable from a missing key
+
+# device_anon_id -> {field: expiry}; positive decisions only
+_local_access: dict[str, dict[str, float]] = {}
+_LOCAL_MAX_DEVICES = 10000
+
+# (expiry, tour ids)
+_free_tours: Optional[tuple[float, frozenset]] = None
+_free_tours_generation = 0  # bumped by invalidate_free_tours in this worker
+
+# KEYS: decision hash, generation; ARGV: generation seen, field, value, ttl
+_SET_IF_GENERATION = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then return 0 end
+redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+# KEYS: free tours set, generation; ARGV: generation seen, ttl, members...
+_STORE_FREE_TOURS_IF_GENERATION = """
+if (redis.call('GET', KEYS[2]) or '') ~= ARGV[1] then return 0 end
+redis.call('DEL', KEYS[1])
+redis.call('SADD', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+return 1
+"""
+
+
+def _field(city: str, tour_id) -> str:
+    return f"{city}|{tour_id or '*'}"
+
+
+def _local_get(device_anon_id: str, field: str) -> bool:
+    fields = _local_access.get(device_anon_id)
+    if not fields:
+        return False
+    expires = fields.get(field)
+    if expires is None:
+        return False
+    if expires <= time.monotonic():
+        fields.pop(field, None)
+        return False
+    return True
+
+
+def _local_set(device_anon_id: str, field: str) -> None:
+    if len(_local_access) >= _LOCAL_MAX_DEVICES and device_anon_id not in _local_access:
+        _local_access.clear()
+    _local_access.setdefault(device_anon_id, {})[field] = time.monotonic() + config.ACCESS_CACHE_LOCAL_TTL_SECONDS
+
+
+async def get_cached_access(device_anon_id: str, city: str, tour_id=None) -> tuple[Optional[bool], Optional[str]]:
+    """
+    (cached decision or None when unknown, generation). Pass the generation
+    to set_cached_access after computing the decision; None = do not store
+    it in Redis (lookup failed or Redis not configured).
+    """
+    field = _field(city, tour_id)
+    if _local_get(device_anon_id, field):
+        return True, None
+    if async_redis_client:
+        try:
+            pipe = async_redis_client.pipeline()
+            pipe.hget(f"{ACCESS_KEY_PREFIX}{device_anon_id}", field)
+            pipe.get(f"{GENERATION_KEY_PREFIX}{device_anon_id}")
+            value, generation = await pipe.execute()
+            if value is not None:
+                allowed = value == "1"
+                if allowed:
+                    _local_set(device_anon_id, field)
+                return allowed, None
+            return None, generation or ""
+        except Exception as e:
+            logger.warning(f"Access cache lookup failed: {e}")
+    return None, None
+
+
+async def set_cached_access(device_anon_id: str, city: str, tour_id, allowed: bool, generation: Optional[str]) -> None:
+    field = _field(city, tour_id)
+    if allowed:
+        _local_set(device_anon_id, field)
+    if async_redis_client and generation is not None:
+        try:
+            await async_redis_client.eval(
+                _SET_IF_GENERATION, 2,
+                f"{ACCESS_KEY_PREFIX}{device_anon_id}", f"{GENERATION_KEY_PREFIX}{device_anon_id}",
+                generation, field, "1" if allowed else "0", config.ACCESS_CACHE_TTL_SECONDS,
+            )
+        except Exception as e:
+            logger.warning(f"Access cache store failed: {e}")
+
+
+def _queue_access_invalidation(pipe, device_anon_id: str):
+    generation_key = f"{GENERATION_KEY_PREFIX}{device_anon_id}"
+    pipe.incr(generation_key)
+    pipe.expire(generation_key, _GENERATION_TTL_SECONDS)
+    pipe.delete(f"{ACCESS_KEY_PREFIX}{device_anon_id}")
+    return pipe
+
+
+def invalidate_access(device_anon_id: Optional[str]) -> None:
+    """Drop every cached decision for the device (call after its grants change)."""
+    if not device_anon_id:
+        return
+    _local_access.pop(device_anon_id, None)
+    if redis_client:
+        try:
+            _queue_access_invalidation(redis_client.pipeline(), device_anon_id).execute()
+        except Exception as e:
+            logger.warning(f"Access cache invalidation failed: {e}")
+
+
+async def invalidate_access_async(device_anon_id: Optional[str]) -> None:
+    """invalidate_access for async handlers (does not block the event loop)."""
+    if not device_anon_id:
+        return
+    _local_access.pop(device_anon_id, None)
+    if async_redis_client:
+        try:
+            await _queue_access_invalidation(async_redis_client.pipeline(), device_anon_id).execute()
+        except Exception as e:
+            logger.warning(f"Access cache invalidation failed: {e}")
+
+
+def _drop_local_free_tours() -> None:
+    global _free_tours, _free_tours_generation
+    _free_tours_generation += 1
+    _free_tours = None
+
+
+def _queue_free_tours_invalidation(pipe):
+    pipe.incr(FREE_TOURS_GENERATION_KEY)
+    pipe.delete(FREE_TOURS_KEY)
+    return pipe
+
+
+def invalidate_free_tours() -> None:
+    """Drop the free tour id set (call after entitlements are created/changed/deleted)."""
+    _drop_local_free_tours()
+    if redis_client:
+        try:
+            _queue_free_tours_invalidation(redis_client.pipeline()).execute()
+        except Exception as e:
+            logger.warning(f"Free tours invalidation failed: {e}")
+
+
+async def invalidate_free_tours_async() -> None:
+    """invalidate_free_tours for async handlers (does not block the event loop)."""
+    _drop_local_free_tours()
+    if async_redis_client:
+        try:
+            await _queue_free_tours_invalidation(async_redis_client.pipeline()).execute()
+        except Exception as e:
+            logger.warning(f"Free tours invalidation failed: {e}")
+
+
+async def get_free_tour_ids(session: AsyncSession) -> frozenset:
+    """Ids (as str) of tours with an active free entitlement."""
+    global _free_tours
+    now = time.monotonic()
+    if _free_tours is not None and _free_tours[0] > now:
+        return _free_tours[1]
+
+    local_generation = _free_tours_generation
+    ids = None
+    generation = None  # None = do not store the DB result in Redis
+    if async_redis_client:
+        try:
+            pipe = async_redis_client.pipeline()
+            pipe.smembers(FREE_TOURS_KEY)
+            pipe.get(FREE_TOURS_GENERATION_KEY)
+            members, generation = await pipe.execute()
+            generation = generation or ""
+            if members:
+                ids = frozenset(m for m in members if m != _FREE_TOURS_SENTINEL)
+        except Exception as e:
+            logger.warning(f"Free tours lookup failed: {e}")
+
+    if ids is None:
+        ids = frozenset((await session.exec(
+            select(Entitlement.ref).where(
+                Entitlement.scope == "tour",
+                Entitlement.price_amount == 0,
+                Entitlement.is_active == True
+            )
+        )).all())
+        if async_redis_client and generation is not None:
+            try:
+                await async_redis_client.eval(
+                    _STORE_FREE_TOURS_IF_GENERATION, 2, FREE_TOURS_KEY, FREE_TOURS_GENERATION_KEY,
+                    generation, config.ACCESS_CACHE_TTL_SECONDS, _FREE_TOURS_SENTINEL, *ids,
+                )
+            except Exception as e:
+                logger.warning(f"Free tours store failed: {e}")
+
+    if local_generation == _free_tours_generation:
+        _free_tours = (now + config.ACCESS_CACHE_LOCAL_TTL_SECONDS, ids)
+    return ids
@@ -1,48 +1,81 @@
 import hashlib
-from typing import Any, Type, Optional
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Type, Optional
 from fastapi import Request, Response, HTTPException
-from sqlmodel import Session, select, func
+from fastapi.encoders import jsonable_encoder
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 from datetime import datetime
 import redis
+import redis.asyncio as aioredis
 import os
 import logging
 import json
 
+from .config import config
+from .models import ContentVersion
+
 logger = logging.getLogger(__name__)
 
 # Redis Connection
 REDIS_URL = os.getenv("REDIS_URL") or os.getenv("KV_URL")
 redis_client = None
+async_redis_client = None  # For async handlers: never block the event loop on Redis
 if REDIS_URL:
     try:
         redis_client = redis.Redis.from_url(REDIS_URL, decode_responses=True)
+        async_redis_client = aioredis.Redis.from_url(REDIS_URL, decode_responses=True)
     except Exception as e:
         logger.warning(f"Redis connection failed: {e}")
 
 SCHEMA_VERSION = "v1"
 
+def _version_key(model: Any, city_slug: Optional[str] = None) -> tuple:
+    return (model.__tablename__, city_slug or "")
+
+def _format_version_marker(model: Any, city_slug: Optional[str], version: int) -> str:
+    # Deterministic hash of the marker
+    marker_str = f"{SCHEMA_VERSION}|{model.__tablename__}|{city_slug}|{version}"
+    hash_val = hashlib.sha256(marker_str.encode("utf-8")).hexdigest()
+    
+    return f'W/"{hash_val[:16]}"'
+
 def generate_version_marker(session: Session, model: Any, city_slug: Optional[str] = None) -> str:
     """
     Generate a cheap version marker from DB.
-    Marker = MAX(updated_at) + COUNT(*) + city_slug + schema_version.
+    Marker = content_versions counter for (model, city_slug) + schema_version:
+    one primary-key lookup, bumped on every write (core/content_versions.py).
     """
-    # 1. Base Query
-    query = select(func.max(model.updated_at), func.count(model.id))
-    
-    # 2. Add City Filter if applicable
-    if city_slug and hasattr(model, "city_slug"):
-        query = query.where(model.city_slug == city_slug)
-    elif city_slug and hasattr(model, "slug"):
-        query = query.where(model.slug == city_slug)
-        
-    result = session.exec(query).first()
-    max_updated, count = result if result else (None, 0)
-    
-    # 3. Deterministic hash of the marker
-    marker_str = f"{SCHEMA_VERSION}|{city_slug}|{max_updated}|{count}"
-    hash_val = hashlib.sha256(marker_str.encode("utf-8")).hexdigest()
-    
-    return f'W/"{hash_val[:16]}"'
+    row = session.get(ContentVersion, _version_key(model, city_slug))
+    return _format_version_marker(model, city_slug, row.version if row else 0)
+
+async def generate_version_marker_async(session: AsyncSession, model: Any, city_slug: Optional[str] = None) -> str:
+    """Async variant of generate_version_marker for AsyncSession handlers."""
+    row = await session.get(ContentVersion, _version_key(model, city_slug))
+    return _format_version_marker(model, city_slug, row.version if row else 0)
+
+def _content_versions_query(city_slug: Optional[str], names: list):
+    return select(ContentVersion).where(
+        ContentVersion.entity.in_(names),
+        ContentVersion.city_slug == (city_slug or "")
+    )
+
+def _format_content_versions(names: list, rows) -> str:
+    versions = {row.entity: row.version for row in rows}
+    return "|".join(f"{name}:{versions.get(name, 0)}" for name in names)
+
+def content_versions(session: Session, city_slug: Optional[str], *models: Any) -> str:
+    """Counters of several entities for one city in one query, e.g. "tour:3|poi:12" (cache-key part)."""
+    names = [m.__tablename__ for m in models]
+    return _format_content_versions(names, session.exec(_content_versions_query(city_slug, names)).all())
+
+async def content_versions_async(session: AsyncSession, city_slug: Optional[str], *models: Any) -> str:
+    """Async variant of content_versions."""
+    names = [m.__tablename__ for m in models]
+    return _format_content_versions(names, (await session.exec(_content_versions_query(city_slug, names))).all())
 
 def check_etag_versioned(request: Request, response: Response, etag: str, is_public: bool = True):
     """
@@ -68,3 +101,284 @@ def check_etag_versioned(request: Request, response: Response, etag: str, is_pub
         
     response.headers["ETag"] = etag
     response.headers["Cache-Control"] = cache_control
+
+
+# --- Tiered response cache (in-process LRU -> Redis -> compute) ---
+#
+# Entries carry their own freshness: fresh until "f", servable stale until "s".
+# A stale or missing entry is rebuilt by exactly one request per key: in
+# process via a per-key lock, across workers via a Redis lock. While it
+# rebuilds, other requests get the stale value if there is one (mirrors the
+# stale-while-revalidate we send to CDNs) or wait briefly for the new value.
+# Values are stored JSON-encoded (jsonable_encoder), exactly as FastAPI would
+# serialise them. Put a content version (generate_version_marker) in the key
+# so admin writes take effect immediately instead of after the TTL.
+
+RESPONSE_CACHE_PREFIX = "rc:"
+RESPONSE_LOCK_PREFIX = "rc-lock:"
+
+
+class _LocalLRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry["s"] <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: dict) -> None:
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+_local_responses = _LocalLRU(config.RESPONSE_CACHE_LOCAL_MAX_ENTRIES)
+_thread_flights: dict[str, list] = {}  # key -> [threading.Lock, users]
+_thread_flights_lock = threading.Lock()
+_async_flights: dict[str, list] = {}  # key -> [asyncio.Lock, users]
+
+
+def _is_fresh(entry: Optional[dict]) -> bool:
+    return entry is not None and entry["f"] > time.time()
+
+
+def _new_entry(value: Any, fresh_ttl: int, stale_ttl: int) -> dict:
+    now = time.time()
+    return {"v": jsonable_encoder(value), "f": now + fresh_ttl, "s": now + fresh_ttl + stale_ttl}
+
+
+def _decode_entry(raw: Optional[str]) -> Optional[dict]:
+    if not raw:
+        return None
+    entry = json.loads(raw)
+    return entry if entry["s"] > time.time() else None
+
+
+def _redis_ttl(entry: dict) -> int:
+    return max(1, int(entry["s"] - time.time()))
+
+
+def _lookup(key: str) -> Optional[dict]:
+    entry = _local_responses.get(key)
+    if _is_fresh(entry) or not redis_client:
+        return entry
+    try:
+        shared = _decode_entry(redis_client.get(RESPONSE_CACHE_PREFIX + key))
+    except Exception as e:
+        logger.warning(f"Response cache lookup failed: {e}")
+        return entry
+    if shared and (entry is None or shared["f"] > entry["f"]):
+        _local_responses.set(key, shared)
+        return shared
+    return entry
+
+
+async def _lookup_async(key: str) -> Optional[dict]:
+    entry = _local_responses.get(key)
+    if _is_fresh(entry) or not async_redis_client:
+        return entry
+    try:
+        shared = _decode_entry(await async_redis_client.get(RESPONSE_CACHE_PREFIX + key))
+    except Exception as e:
+        logger.warning(f"Response cache lookup failed: {e}")
+        return entry
+    if shared and (entry is None or shared["f"] > entry["f"]):
+        _local_responses.set(key, shared)
+        return shared
+    return entry
+
+
+def _store(key: str, entry: dict) -> None:
+    _local_responses.set(key, entry)
+    if redis_client:
+        try:
+            redis_client.setex(RESPONSE_CACHE_PREFIX + key, _redis_ttl(entry), json.dumps(entry))
+        except Exception as e:
+            logger.warning(f"Response cache store failed: {e}")
+
+
+async def _store_async(key: str, entry: dict) -> None:
+    _local_responses.set(key, entry)
+    if async_redis_client:
+        try:
+            await async_redis_client.setex(RESPONSE_CACHE_PREFIX + key, _redis_ttl(entry), json.dumps(entry))
+        except Exception as e:
+            logger.warning(f"Response cache store failed: {e}")
+
+
+def _thread_flight(key: str) -> list:
+    with _thread_flights_lock:
+        flight = _thread_flights.get(key)
+        if flight is None:
+            flight = _thread_flights[key] = [threading.Lock(), 0]
+        flight[1] += 1
+        return flight
+
+
+def _leave_thread_flight(key: str, flight: list) -> None:
+    with _thread_flights_lock:
+        flight[1] -= 1
+        if flight[1] == 0 and _thread_flights.get(key) is flight:
+            del _thread_flights[key]
+
+
+def _async_flight(key: str) -> list:
+    """Per-key asyncio lock shared by the tasks of this worker; pair with _leave_async_flight."""
+    flight = _async_flights.get(key)
+    if flight is None:
+        flight = _async_flights[key] = [asyncio.Lock(), 0]
+    flight[1] += 1
+    return flight
+
+
+def _leave_async_flight(key: str, flight: list) -> None:
+    flight[1] -= 1
+    if flight[1] == 0 and _async_flights.get(key) is flight:
+        del _async_flights[key]
+
+
+def _shared_lock(key: str):
+    """Cross-worker rebuild lock (None = no Redis, go ahead). Returns (acquired, lock)."""
+    if not redis_client:
+        return True, None
+    try:
+        lock = redis_client.lock(RESPONSE_LOCK_PREFIX + key, timeout=config.RESPONSE_CACHE_LOCK_SECONDS)
+        return lock.acquire(blocking=False), lock
+    except Exception as e:
+        logger.warning(f"Response cache lock failed: {e}")
+        return True, None
+
+
+async def _shared_lock_async(key: str):
+    if not async_redis_client:
+        return True, None
+    try:
+        lock = async_redis_client.lock(RESPONSE_LOCK_PREFIX + key, timeout=config.RESPONSE_CACHE_LOCK_SECONDS)
+        return await lock.acquire(blocking=False), lock
+    except Exception as e:
+        logger.warning(f"Response cache lock failed: {e}")
+        return True, None
+
+
+def _wait_for_rebuild(key: str) -> Optional[dict]:
+    deadline = time.monotonic() + config.RESPONSE_CACHE_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = _lookup(key)
+        if _is_fresh(entry):
+            return entry
+    return None
+
+
+async def _wait_for_rebuild_async(key: str) -> Optional[dict]:
+    deadline = time.monotonic() + config.RESPONSE_CACHE_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        entry = await _lookup_async(key)
+        if _is_fresh(entry):
+            return entry
+    return None
+
+
+def cached_response(key: str, compute: Callable[[], Any], fresh_ttl: int = 60, stale_ttl: Optional[int] = None) -> Any:
+    """
+    Tiered, single-flight cache for sync handlers.
+    compute() runs on a miss (or for one request once the entry is stale);
+    exceptions propagate and nothing is cached.
+    """
+    stale_ttl = config.RESPONSE_CACHE_STALE_SECONDS if stale_ttl is None else stale_ttl
+    entry = _lookup(key)
+    if _is_fresh(entry):
+        return entry["v"]
+
+    flight = _thread_flight(key)
+    lock = flight[0]
+    if not lock.acquire(blocking=entry is None):
+        _leave_thread_flight(key, flight)
+        return entry["v"]  # another thread is rebuilding; serve stale
+    try:
+        entry = _lookup(key)
+        if _is_fresh(entry):
+            return entry["v"]
+        acquired, shared = _shared_lock(key)
+        if not acquired:
+            if entry is not None:
+                return entry["v"]
+            rebuilt = _wait_for_rebuild(key)
+            if rebuilt is not None:
+                return rebuilt["v"]
+        try:
+            entry = _new_entry(compute(), fresh_ttl, stale_ttl)
+            _store(key, entry)
+            return entry["v"]
+        finally:
+            if shared is not None and acquired:
+                try:
+                    shared.release()
+                except Exception:
+                    pass
+    finally:
+        lock.release()
+        _leave_thread_flight(key, flight)
+
+
+async def cached_response_async(key: str, compute: Callable[[], Awaitable[Any]], fresh_ttl: int = 60, stale_ttl: Optional[int] = None) -> Any:
+    """Async variant of cached_response; compute is a coroutine function."""
+    stale_ttl = config.RESPONSE_CACHE_STALE_SECONDS if stale_ttl is None else stale_ttl
+    entry = await _lookup_async(key)
+    if _is_fresh(entry):
+        return entry["v"]
+
+    flight = _async_flights.get(key)
+    if flight is None:
+        flight = _async_flights[key] = [asyncio.Lock(), 0]
+    lock = flight[0]
+    if lock.locked() and entry is not None:
+        return entry["v"]  # another task is rebuilding; serve stale
+    flight[1] += 1
+    try:
+        async with lock:
+            entry = await _lookup_async(key)
+            if _is_fresh(entry):
+                return entry["v"]
+            acquired, shared = await _shared_lock_async(key)
+            if not acquired:
+                if entry is not None:
+                    return entry["v"]
+                rebuilt = await _wait_for_rebuild_async(key)
+                if rebuilt is not None:
+                    return rebuilt["v"]
+            try:
+                entry = _new_entry(await compute(), fresh_ttl, stale_ttl)
+                await _store_async(key, entry)
+                return entry["v"]
+            finally:
+                if shared is not None and acquired:
+                    try:
+                        await shared.release()
+                    except Exception:
+                        pass
+    finally:
+        flight[1] -= 1
+        if flight[1] == 0 and _async_flights.get(key) is flight:
+            del _async_flights[key]
+
+
+def reset_response_cache() -> None:
+    """Drop the in-process tier (tests, ops)."""
+    _local_responses.clear()
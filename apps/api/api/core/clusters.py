@@ -0,0 +1,97 @@
+"""
+Hierarchical grid clusters of a city's map points (POIs, helper places).
+
+Cells are squares of the Web Mercator tile grid, CELLS_PER_TILE per tile side
+(64 px of a 256 px tile, the usual client-side cluster radius). The tree is
+built bottom-up: points are bucketed once at CLUSTER_MAX_ZOOM and every
+coarser level merges four child cells into their parent, so the whole
+hierarchy costs O(points + cells). Each cell keeps per-kind counts,
+coordinate sums (centroid) and, while it holds a single point of a kind, the
+point itself.
+
+A bbox query at zoom z reads the cells of that level inside the box; if
+they exceed max_features it steps to coarser levels until they fit, so the
+response size is bounded regardless of city size.
+"""
+import math
+from typing import Optional
+
+CELLS_PER_TILE = 4
+CLUSTER_MAX_ZOOM = 18
+_MAX_LAT = 85.05112878
+
+
+def cell_xy(lat: float, lon: float, zoom: int) -> tuple[int, int]:
+    """Web Mercator grid cell of (lat, lon) at `zoom`."""
+    n = (1 << zoom) * CELLS_PER_TILE
+    lat = max(min(lat, _MAX_LAT), -_MAX_LAT)
+    x = (lon + 180.0) / 360.0 * n
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n
+    return min(max(int(x), 0), n - 1), min(max(int(y), 0), n - 1)
+
+
+class ClusterTree:
+    def __init__(self, points: list[dict]):
+        # levels[z]: (cx, cy) -> {kind: [count, sum_lat, sum_lon, point or None]}
+        self.levels: list[dict] = [dict() for _ in range(CLUSTER_MAX_ZOOM + 1)]
+        finest = self.levels[CLUSTER_MAX_ZOOM]
+        for p in points:
+            cell = finest.setdefault(cell_xy(p["lat"], p["lon"], CLUSTER_MAX_ZOOM), {})
+            add_to_cell(cell, p["kind"], 1, p["lat"], p["lon"], p)
+        for zoom in range(CLUSTER_MAX_ZOOM, 0, -1):
+            parents = self.levels[zoom - 1]
+            for (cx, cy), cell in self.levels[zoom].items():
+                parent = parents.setdefault((cx >> 1, cy >> 1), {})
+                for kind, (count, sum_lat, sum_lon, point) in cell.items():
+                    add_to_cell(parent, kind, count, sum_lat, sum_lon, point)
+
+    def query(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+              zoom: int, kinds, max_features: int) -> tuple[int, list[dict]]:
+        """(zoom actually used, features) for the bbox; features <= max_features."""
+        zoom = max(0, min(zoom, CLUSTER_MAX_ZOOM))
+        while True:
+            cells = self._cells_in(min_lat, min_lon, max_lat, max_lon, zoom)
+            features = [f for f in (cell_feature(cell, kinds) for cell in cells) if f]
+            if len(features) <= max_features or zoom == 0:
+                return zoom, features[:max_features]
+            zoom -= 1
+
+    def _cells_in(self, min_lat, min_lon, max_lat, max_lon, zoom):
+        level = self.levels[zoom]
+        x0, y0 = cell_xy(max_lat, min_lon, zoom)  # y grows southwards
+        x1, y1 = cell_xy(min_lat, max_lon, zoom)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(level):
+            return [c for (cx, cy), c in level.items() if x0 <= cx <= x1 and y0 <= cy <= y1]
+        return [level[(cx, cy)] for cx in range(x0, x1 + 1) for cy in range(y0, y1 + 1) if (cx, cy) in level]
+
+
+def add_to_cell(cell: dict, kind: str, count: int, sum_lat: float, sum_lon: float, point: Optional[dict]) -> None:
+    entry = cell.get(kind)
+    if entry is None:
+        cell[kind] = [count, sum_lat, sum_lon, point if count == 1 else None]
+    else:
+        entry[0] += count
+        entry[1] += sum_lat
+        entry[2] += sum_lon
+        entry[3] = None
+
+
+def cell_feature(cell: dict, kinds) -> Optional[dict]:
+    """The cell as a map feature for `kinds`: the point itself when alone, else a cluster."""
+    entries = {k: e for k, e in cell.items() if k in kinds}
+    count = sum(e[0] for e in entries.values())
+    if count == 0:
+        return None
+    if count == 1:
+        p = next(iter(entries.values()))[3]
+        item = {"type": p["kind"], "id": p["id"], "title": p["title"], "lat": p["lat"], "lon": p["lon"]}
+        if p["kind"] == "helper":
+            item["helper_type"] = p["helper_type"]
+        return item
+    return {
+        "type": "cluster",
+        "count": count,
+        "counts": {k: e[0] for k, e in entries.items()},
+        "lat": sum(e[1] for e in entries.values()) / count,
+        "lon": sum(e[2] for e in entries.values()) / count,
+    }
@@ -5,7 +5,26 @@ class AppConfig:
         # FAIL-FAST: Explicitly verify required vars.
         # PostgreSQL connection (local on Cloud.ru or any PostgreSQL instance)
         self.DATABASE_URL = self._get_required("DATABASE_URL")
-        
+
+        # DB connection pool (sized per uvicorn worker process).
+        # DB_MAX_CONNECTIONS is the total budget across all WEB_CONCURRENCY workers;
+        # when set, each worker's pool_size + max_overflow is capped to its share.
+        self.DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+        self.DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+        self.DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+        self.DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+        self.DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+        self.DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "60"))
+        self.DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "0"))
+        self.DB_DISABLE_POOL = os.getenv("DB_DISABLE_POOL", "false").lower() == "true"
+        self.WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+        # Optional streaming read replica for read-only public endpoints.
+        # After a write (purchase, grant, rating) the device reads from the primary
+        # for DB_REPLICA_RYW_SECONDS so it never sees pre-write replica state.
+        self.DATABASE_REPLICA_URL = (os.getenv("DATABASE_REPLICA_URL") or "").strip() or None
+        self.DB_REPLICA_RYW_SECONDS = int(os.getenv("DB_REPLICA_RYW_SECONDS", "30"))
+
         # Deploy environment: "production", "staging", "development"
         # Replaces VERCEL_ENV - works on any hosting (Cloud.ru, VPS, etc.)
         self.DEPLOY_ENV = os.getenv("DEPLOY_ENV", "development").strip()
@@ -22,6 +41,8 @@ class AppConfig:
         self.ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
         if not self.ADMIN_API_TOKEN and self.is_production:
              raise RuntimeError("CRITICAL: ADMIN_API_TOKEN is required in production.")
+        # Bearer token of the /ops/metrics scraper (endpoint answers 401 while unset)
+        self.METRICS_TOKEN = (os.getenv("METRICS_TOKEN") or "").strip() or None
         
         # S3-compatible storage (MinIO, Yandex Object Storage, etc.)
         # Replaces Vercel Blob
@@ -72,6 +93,55 @@ class AppConfig:
         # Redis (Optional, used for shared rate limiting)
         self.REDIS_URL = os.getenv("REDIS_URL")
 
+        # Entitlement access-decision cache (check_access): Redis TTL and the
+        # shorter in-process TTL for positive decisions / the free tour id set
+        self.ACCESS_CACHE_TTL_SECONDS = int(os.getenv("ACCESS_CACHE_TTL_SECONDS", "120"))
+        self.ACCESS_CACHE_LOCAL_TTL_SECONDS = int(os.getenv("ACCESS_CACHE_LOCAL_TTL_SECONDS", "15"))
+
+        # Tiered response cache for public lists (core/caching.cached_response):
+        # stale window after max-age, rebuild lock/wait time, in-process LRU size
+        self.RESPONSE_CACHE_STALE_SECONDS = int(os.getenv("RESPONSE_CACHE_STALE_SECONDS", "600"))
+        self.RESPONSE_CACHE_LOCK_SECONDS = int(os.getenv("RESPONSE_CACHE_LOCK_SECONDS", "5"))
+        self.RESPONSE_CACHE_LOCAL_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_LOCAL_MAX_ENTRIES", "2000"))
+
+        # orjson rendering for large public payloads (core/serialization.py), opt-in
+        self.FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() == "true"
+
+        # Precompressed public payload bodies (core/precompressed.py): reuse time
+        # for version-keyed bodies, in-process LRU size, disk tier when Redis is
+        # not configured and its size cap, brotli quality (11 is several times slower than 9)
+        self.PUBLIC_BLOB_TTL_SECONDS = int(os.getenv("PUBLIC_BLOB_TTL_SECONDS", "86400"))
+        self.PUBLIC_BLOB_LOCAL_MAX_ENTRIES = int(os.getenv("PUBLIC_BLOB_LOCAL_MAX_ENTRIES", "200"))
+        self.PUBLIC_BLOB_DIR = (os.getenv("PUBLIC_BLOB_DIR") or "").strip() or None
+        self.PUBLIC_BLOB_DIR_MAX_MB = int(os.getenv("PUBLIC_BLOB_DIR_MAX_MB", "1024"))
+        self.PUBLIC_BLOB_BROTLI_QUALITY = int(os.getenv("PUBLIC_BLOB_BROTLI_QUALITY", "9"))
+
+        # Cached COUNT(*) totals of paginated lists (core/pagination.count_cached)
+        self.LIST_TOTAL_CACHE_SECONDS = int(os.getenv("LIST_TOTAL_CACHE_SECONDS", "30"))
+
+        # In-process per-city spatial index (core/spatial_index.py): content
+        # version re-check interval, cities kept per worker, largest city indexed
+        self.SPATIAL_INDEX_ENABLED = os.getenv("SPATIAL_INDEX_ENABLED", "true").lower() == "true"
+        self.SPATIAL_INDEX_CHECK_SECONDS = int(os.getenv("SPATIAL_INDEX_CHECK_SECONDS", "5"))
+        self.SPATIAL_INDEX_MAX_CITIES = int(os.getenv("SPATIAL_INDEX_MAX_CITIES", "50"))
+        self.SPATIAL_INDEX_MAX_POINTS = int(os.getenv("SPATIAL_INDEX_MAX_POINTS", "200000"))
+
+        # Most features one /public/cities/{slug}/clusters response may hold
+        self.CLUSTER_MAX_FEATURES = int(os.getenv("CLUSTER_MAX_FEATURES", "500"))
+
+        # Delta sync (/public/cities/{slug}/changes): rows younger than this are
+        # left for the next sync so late-committing transactions are not skipped
+        self.CHANGES_SETTLE_SECONDS = int(os.getenv("CHANGES_SETTLE_SECONDS", "5"))
+
+        # Admin list search (core/search.fuzzy_search): minimum pg_trgm
+        # word_similarity for a fuzzy hit; 0.6 is the pg_trgm default (no extra statement)
+        self.SEARCH_SIMILARITY_THRESHOLD = float(os.getenv("SEARCH_SIMILARITY_THRESHOLD", "0.6"))
+
+        # In-process title autocomplete (core/suggest.py): content version
+        # re-check interval and cities kept per worker
+        self.SUGGEST_INDEX_CHECK_SECONDS = int(os.getenv("SUGGEST_INDEX_CHECK_SECONDS", "5"))
+        self.SUGGEST_INDEX_MAX_CITIES = int(os.getenv("SUGGEST_INDEX_MAX_CITIES", "50"))
+
         # App Versioning (Dynamic via ENV)
         self.APP_MIN_VERSION_ANDROID = os.getenv("APP_MIN_VERSION_ANDROID", "1.0.0").strip()
         self.APP_MIN_VERSION_IOS = os.getenv("APP_MIN_VERSION_IOS", "1.0.0").strip()
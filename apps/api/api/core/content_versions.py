@@ -0,0 +1,148 @@
+"""
+Version counters behind the public list ETags (content_versions table).
+
+A Session after_flush hook bumps (entity, city_slug) and (entity, "") for
+every City, Poi, Tour and HelperPlace row inserted, changed or deleted, in
+the same transaction as the write. Child rows (tour items/media, narrations,
+POI media) bump their parent tour/POI's counters and touch its updated_at,
+so cached manifests built from them are keyed correctly and delta sync
+(/public/cities/{slug}/changes) re-sends the parent. That covers the admin
+write paths (admin/poi, tours, cities, helpers) and ingestion without
+per-endpoint calls; a tour moved between cities bumps both. Code that writes these tables
+with Core statements must call bump_content_version() itself.
+
+generate_version_marker() then costs one primary-key lookup instead of a
+MAX(updated_at)/COUNT(*) scan.
+"""
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import event, inspect, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session as OrmSession
+
+from .models import City, ContentVersion, HelperPlace, Narration, Poi, PoiMedia, Tour, TourItem, TourMedia
+
+ALL_CITIES = ""
+
+# model -> attribute holding its city slug
+TRACKED_MODELS = {
+    City: "slug",
+    Poi: "city_slug",
+    Tour: "city_slug",
+    HelperPlace: "city_slug",
+}
+
+
+# child model -> (parent model, foreign key attribute)
+CHILD_MODELS = {
+    TourItem: (Tour, "tour_id"),
+    TourMedia: (Tour, "tour_id"),
+    Narration: (Poi, "poi_id"),
+    PoiMedia: (Poi, "poi_id"),
+}
+
+
+def entity_name(model) -> str:
+    return model.__tablename__
+
+
+def _upsert(dialect_name: str, keys: Iterable[tuple[str, str]]):
+    module = sqlite if dialect_name == "sqlite" else postgresql
+    now = datetime.utcnow()
+    table = ContentVersion.__table__
+    stmt = module.insert(table).values([
+        {"entity": entity, "city_slug": city_slug, "version": 1, "updated_at": now}
+        for entity, city_slug in sorted(keys)  # fixed lock order across writers
+    ])
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.entity, table.c.city_slug],
+        set_={"version": table.c.version + 1, "updated_at": now},
+    )
+
+
+def bump_content_version(session, entity: str, city_slug: Optional[str] = None) -> None:
+    """Bump the counters for one entity (and city). Does not commit."""
+    keys = {(entity, ALL_CITIES)}
+    if city_slug:
+        keys.add((entity, city_slug))
+    session.execute(_upsert(session.get_bind().dialect.name, keys))
+
+
+def _city_slugs(obj, attr: str) -> set:
+    """Current and (if changed in this flush) previous city slug."""
+    slugs = {getattr(obj, attr, None)}
+    history = inspect(obj).attrs[attr].history
+    slugs.update(history.deleted or ())
+    return {s for s in slugs if s}
+
+
+def _changed_keys(session) -> tuple[set, set]:
+    """(entity, city) keys of changed rows, and (parent model, id) of changed child rows."""
+    keys, parents = set(), set()
+    for bucket, check_modified in ((session.new, False), (session.dirty, True), (session.deleted, False)):
+        for obj in bucket:
+            model = type(obj)
+            if model not in TRACKED_MODELS and model not in CHILD_MODELS:
+                continue
+            if check_modified and not session.is_modified(obj, include_collections=False):
+                continue
+            if model in CHILD_MODELS:
+                parent, fk = CHILD_MODELS[model]
+                if getattr(obj, fk, None) is not None:
+                    parents.add((parent, getattr(obj, fk)))
+                continue
+            entity = entity_name(model)
+            keys.add((entity, ALL_CITIES))
+            keys.update((entity, slug) for slug in _city_slugs(obj, TRACKED_MODELS[model]))
+    return keys, parents
+
+
+def _parent_keys(conn, parents: set) -> set:
+    """
+    Touch the parents of changed child rows (updated_at, for delta sync) and
+    resolve them to their (entity, city) keys, in one statement per parent model.
+    """
+    keys = set()
+    now = datetime.utcnow()
+    for parent in {model for model, _ in parents}:
+        ids = [pk for model, pk in parents if model is parent]
+        entity = entity_name(parent)
+        keys.add((entity, ALL_CITIES))
+        rows = conn.execute(
+            update(parent).where(parent.id.in_(ids)).values(updated_at=now).returning(parent.city_slug)
+        )
+        keys.update((entity, slug) for (slug,) in rows if slug)
+    return keys
+
+
+def _keep_previous_slug(target, value, oldvalue, initiator):
+    return value
+
+
+# active_history loads the old slug on assignment even when the instance was
+# expired by a commit, so a moved row can bump its previous city too
+for _model, _attr in TRACKED_MODELS.items():
+    event.listen(getattr(_model, _attr), "set", _keep_previous_slug, active_history=True, retval=True)
+
+
+@event.listens_for(OrmSession, "before_flush")
+def _collect_changes(session, flush_context, instances):
+    # Attribute history is still available before the flush
+    keys, parents = _changed_keys(session)
+    if keys:
+        session.info.setdefault("content_version_keys", set()).update(keys)
+    if parents:
+        session.info.setdefault("content_version_parents", set()).update(parents)
+
+
+@event.listens_for(OrmSession, "after_flush")
+def _bump_changed(session, flush_context):
+    keys = session.info.pop("content_version_keys", None) or set()
+    parents = session.info.pop("content_version_parents", None)
+    if not keys and not parents:
+        return
+    conn = session.connection()
+    if parents:
+        keys |= _parent_keys(conn, parents)
+    conn.execute(_upsert(conn.dialect.name, keys))
@@ -1,18 +1,177 @@
+from typing import AsyncGenerator, Optional
 from sqlmodel import create_engine, SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 from .config import config
+from .query_metrics import instrument_engine
+from . import content_versions  # noqa: F401 - registers the ETag version-counter flush hooks
 
 # Singleton DB Engine
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import NullPool, QueuePool, AsyncAdaptedQueuePool
 
 # PostgreSQL connection (local on Cloud.ru server)
 db_url = config.DATABASE_URL
 
+
+def _pool_limits(engines: int = 1) -> tuple[int, int]:
+    """
+    Per-worker, per-engine (pool_size, max_overflow).
+    If DB_MAX_CONNECTIONS is set, every uvicorn worker (and each of its sync/async
+    engines) gets an equal share of it, so the total never exceeds the budget.
+    """
+    pool_size = max(1, config.DB_POOL_SIZE)
+    max_overflow = max(0, config.DB_MAX_OVERFLOW)
+
+    if config.DB_MAX_CONNECTIONS > 0:
+        per_worker = max(1, config.DB_MAX_CONNECTIONS // (config.WEB_CONCURRENCY * engines))
+        pool_size = min(pool_size, per_worker)
+        max_overflow = min(max_overflow, per_worker - pool_size)
+
+    return pool_size, max_overflow
+
+
+def _engine_kwargs(url: str) -> dict:
+    # SQLite (tests / local tooling) keeps SQLAlchemy defaults
+    if url.startswith("sqlite"):
+        return {}
+
+    kwargs = {
+        "connect_args": {
+            "connect_timeout": config.DB_CONNECT_TIMEOUT
+        }
+    }
+
+    # Escape hatch for PgBouncer in transaction mode, where the bouncer owns pooling
+    if config.DB_DISABLE_POOL:
+        kwargs["poolclass"] = NullPool
+        return kwargs
+
+    pool_size, max_overflow = _pool_limits(_engines_per_worker(url))
+    kwargs.update(
+        poolclass=QueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,  # Drop connections before server/firewall idle limits
+        pool_pre_ping=config.DB_POOL_PRE_PING,  # Detect stale connections after DB restarts
+    )
+    return kwargs
+
+
+def _async_url(url: str) -> Optional[str]:
+    """
+    postgresql:// (psycopg2) -> postgresql+asyncpg://.
+    Returns None for backends without an async driver installed (SQLite in tests).
+    """
+    u = make_url(url)
+    if u.get_backend_name() != "postgresql":
+        return None
+    # asyncpg does not understand libpq's sslmode; _async_connect_args maps it
+    u = u.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+    return u.render_as_string(hide_password=False)
+
+
+def _async_connect_args(url: str) -> dict:
+    connect_args = {"timeout": config.DB_CONNECT_TIMEOUT}
+    sslmode = make_url(url).query.get("sslmode")
+    if sslmode in ("require", "verify-ca", "verify-full"):
+        connect_args["ssl"] = sslmode
+    return connect_args
+
+
+def _async_engine_kwargs(url: str) -> dict:
+    kwargs = {"connect_args": _async_connect_args(url)}
+    if config.DB_DISABLE_POOL:
+        kwargs["poolclass"] = NullPool
+        return kwargs
+
+    pool_size, max_overflow = _pool_limits(_engines_per_worker(url))
+    kwargs.update(
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+    )
+    return kwargs
+
+
+def _engines_per_worker(url: str) -> int:
+    # Sync engine + async engine (when PostgreSQL) share the connection budget
+    return 2 if _async_url(url) else 1
+
+
 engine = create_engine(
-    db_url, 
+    db_url,
     echo=False,
-    poolclass=NullPool,
-    connect_args={
-        "connect_timeout": 60
-    }
+    **_engine_kwargs(db_url)
 )
 
+# Async engine for the public read path (asyncpg).
+# Handlers on it are not bound by the AnyIO threadpool size.
+async_db_url = _async_url(db_url)
+async_engine: Optional[AsyncEngine] = (
+    create_async_engine(async_db_url, echo=False, **_async_engine_kwargs(db_url))
+    if async_db_url else None
+)
+
+AsyncSessionLocal = (
+    async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+    if async_engine else None
+)
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async DB engine is not configured (PostgreSQL DATABASE_URL required)")
+    async with AsyncSessionLocal() as session:
+        yield session
+
+
+# Optional read replica (DATABASE_REPLICA_URL) for read-only public traffic.
+# Without it the replica handles below are aliases of the primary engines.
+replica_db_url = config.DATABASE_REPLICA_URL
+if replica_db_url:
+    replica_engine = create_engine(replica_db_url, echo=False, **_engine_kwargs(replica_db_url))
+    _async_replica_url = _async_url(replica_db_url)
+    async_replica_engine: Optional[AsyncEngine] = (
+        create_async_engine(_async_replica_url, echo=False, **_async_engine_kwargs(replica_db_url))
+        if _async_replica_url else None
+    )
+else:
+    replica_engine = engine
+    async_replica_engine = async_engine
+
+AsyncReplicaSessionLocal = (
+    async_sessionmaker(async_replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if async_replica_engine else None
+)
+
+# Per-request query counting / DB time (see core/query_metrics.py)
+for _e in (engine, async_engine, replica_engine, async_replica_engine):
+    if _e is not None:
+        instrument_engine(_e.sync_engine if isinstance(_e, AsyncEngine) else _e)
+
+
+def get_pool_status(target=None) -> dict:
+    """
+    Pool statistics for /ops/health (sizing against WEB_CONCURRENCY).
+    """
+    pool = (target or engine).pool
+    status = {"class": type(pool).__name__}
+
+    if isinstance(pool, (QueuePool, AsyncAdaptedQueuePool)):
+        status.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+            "recycle": pool._recycle,
+            "pre_ping": pool._pre_ping,
+            "workers": config.WEB_CONCURRENCY,
+        })
+    return status
@@ -0,0 +1,127 @@
+"""
+Read/write routing between the primary and the optional read replica.
+
+Read-only public endpoints take their session from get_read_session /
+get_async_read_session. Writes always go to the primary. A device that just
+wrote something it will read back (purchase, grant, rating) is pinned to the
+primary for DB_REPLICA_RYW_SECONDS (read-your-writes), so replica lag can
+never hide a fresh entitlement.
+"""
+import time
+import logging
+from typing import AsyncGenerator, Generator, Optional
+from fastapi import Request
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .config import config
+from .database import engine, replica_engine, AsyncSessionLocal, AsyncReplicaSessionLocal
+from .caching import redis_client, async_redis_client
+
+logger = logging.getLogger(__name__)
+
+RYW_KEY_PREFIX = "ryw:"
+DEVICE_HEADER = "X-Device-Anon-Id"
+
+# Process-local marks (device_anon_id -> expiry); Redis shares them across workers
+_recent_writes: dict[str, float] = {}
+_LOCAL_MAX_ENTRIES = 10000
+
+
+def replica_enabled() -> bool:
+    return replica_engine is not engine
+
+
+def _remember_local(device_anon_id: str) -> None:
+    now = time.monotonic()
+    if len(_recent_writes) >= _LOCAL_MAX_ENTRIES:
+        for key, expires in list(_recent_writes.items()):
+            if expires <= now:
+                _recent_writes.pop(key, None)
+    _recent_writes[device_anon_id] = now + config.DB_REPLICA_RYW_SECONDS
+
+
+def _seen_local(device_anon_id: str) -> bool:
+    expires = _recent_writes.get(device_anon_id)
+    if expires is None:
+        return False
+    if expires <= time.monotonic():
+        _recent_writes.pop(device_anon_id, None)
+        return False
+    return True
+
+
+def mark_recent_write(device_anon_id: Optional[str]) -> None:
+    """Pin the device's reads to the primary for the read-your-writes window."""
+    if not device_anon_id or not replica_enabled():
+        return
+    _remember_local(device_anon_id)
+    if redis_client:
+        try:
+            redis_client.setex(f"{RYW_KEY_PREFIX}{device_anon_id}", config.DB_REPLICA_RYW_SECONDS, "1")
+        except Exception as e:
+            logger.warning(f"RYW mark failed: {e}")
+
+
+async def mark_recent_write_async(device_anon_id: Optional[str]) -> None:
+    if not device_anon_id or not replica_enabled():
+        return
+    _remember_local(device_anon_id)
+    if async_redis_client:
+        try:
+            await async_redis_client.setex(f"{RYW_KEY_PREFIX}{device_anon_id}", config.DB_REPLICA_RYW_SECONDS, "1")
+        except Exception as e:
+            logger.warning(f"RYW mark failed: {e}")
+
+
+def has_recent_write(device_anon_id: Optional[str]) -> bool:
+    if not device_anon_id:
+        return False
+    if _seen_local(device_anon_id):
+        return True
+    if redis_client:
+        try:
+            return bool(redis_client.exists(f"{RYW_KEY_PREFIX}{device_anon_id}"))
+        except Exception as e:
+            logger.warning(f"RYW lookup failed: {e}")
+    return False
+
+
+async def has_recent_write_async(device_anon_id: Optional[str]) -> bool:
+    if not device_anon_id:
+        return False
+    if _seen_local(device_anon_id):
+        return True
+    if async_redis_client:
+        try:
+            return bool(await async_redis_client.exists(f"{RYW_KEY_PREFIX}{device_anon_id}"))
+        except Exception as e:
+            logger.warning(f"RYW lookup failed: {e}")
+    return False
+
+
+def _request_device_id(request: Request) -> Optional[str]:
+    return request.query_params.get("device_anon_id") or request.headers.get(DEVICE_HEADER)
+
+
+def get_read_session(request: Request) -> Generator[Session, None, None]:
+    """Session for read-only handlers: replica unless the device just wrote."""
+    target = engine
+    if replica_enabled() and not has_recent_write(_request_device_id(request)):
+        target = replica_engine
+    with Session(target) as session:
+        yield session
+
+
+async def get_async_read_session(request: Request) -> AsyncGenerator[AsyncSession, None]:
+    if AsyncSessionLocal is None:
+        raise RuntimeError("Async DB engine is not configured (PostgreSQL DATABASE_URL required)")
+    factory = AsyncSessionLocal
+    if (
+        AsyncReplicaSessionLocal is not None
+        and replica_enabled()
+        and not await has_recent_write_async(_request_device_id(request))
+    ):
+        factory = AsyncReplicaSessionLocal
+    async with factory() as session:
+        yield session
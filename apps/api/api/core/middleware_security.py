@@ -6,6 +6,7 @@ from typing import Callable, Any
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.types import ASGIApp
+from .query_metrics import start_request_stats, end_request_stats, record_route, server_timing
 
 logger = logging.getLogger("api.access")
 
@@ -21,9 +22,22 @@ class SecurityMiddleware(BaseHTTPMiddleware):
         if content_length and int(content_length) > 1_000_000: # 1MB limit
             return Response("Payload Too Large", status_code=413)
 
-        response = await call_next(request)
+        # Handlers run in a child task / threadpool with a copy of this context;
+        # they mutate the shared stats object, so counts are visible here.
+        stats, stats_token = start_request_stats()
+        try:
+            response = await call_next(request)
+        finally:
+            end_request_stats(stats_token)
         process_time = (time.time() - start_time) * 1000
 
+        # Route template (not raw path) keeps histogram cardinality bounded
+        route = getattr(request.scope.get("route"), "path", None) or "unmatched"
+        record_route(request.method, route, stats)
+        existing_timing = response.headers.get("Server-Timing")
+        timing = server_timing(stats, process_time)
+        response.headers["Server-Timing"] = f"{existing_timing}, {timing}" if existing_timing else timing
+
         # 2. Security Headers
         response.headers["X-Content-Type-Options"] = "nosniff"
         response.headers["Referrer-Policy"] = "no-referrer"
@@ -42,6 +56,9 @@ class SecurityMiddleware(BaseHTTPMiddleware):
             "method": request.method,
             "status": response.status_code,
             "duration_ms": round(process_time, 2),
+            "route": route,
+            "db_queries": stats.count,
+            "db_ms": round(stats.duration_ms, 2),
             "ip": request.client.host if request.client else "unknown",
             "trace_id": request.headers.get("x-request-id", "unknown")
         }
@@ -6,6 +6,11 @@ from geoalchemy2 import Geography
 from datetime import datetime
 import uuid
 
+
+def trgm_index(name: str, column: str) -> sa.Index:
+    """pg_trgm GIN index: serves ILIKE '%x%' and similarity operators (core/search.fuzzy_search)."""
+    return sa.Index(name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+
 # --- Previous Models ---
 class CityBase(SQLModel):
     slug: str = Field(index=True, unique=True)
@@ -28,6 +33,10 @@ class CityBase(SQLModel):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
 class City(CityBase, table=True):
+    __table_args__ = (
+        trgm_index("ix_city_name_ru_trgm", "name_ru"),
+        trgm_index("ix_city_slug_trgm", "slug"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     tours: List["Tour"] = Relationship(back_populates="city")
     pois: List["Poi"] = Relationship(back_populates="city")
@@ -53,9 +62,17 @@ class PoiBase(SQLModel):
     confidence_score: float = Field(default=0.0)
     preview_audio_url: Optional[str] = None
     preview_bullets: Optional[List[str]] = Field(default=None, sa_column=Column(sa.JSON))
-    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    # onupdate: every ORM update moves it (keyset paging, delta sync)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True, sa_column_kwargs={"onupdate": datetime.utcnow})
 
 class Poi(PoiBase, table=True):
+    # Keyset pagination: (updated_at, id) per city (public) and overall (admin)
+    __table_args__ = (
+        sa.Index("ix_poi_city_updated_id", "city_slug", "updated_at", "id"),
+        sa.Index("ix_poi_updated_id", "updated_at", "id"),
+        trgm_index("ix_poi_title_ru_trgm", "title_ru"),
+        trgm_index("ix_poi_description_ru_trgm", "description_ru"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     geo: Any = Field(sa_column=Column(Geography("POINT", srid=4326, spatial_index=True)), default=None)
     city: Optional[City] = Relationship(back_populates="pois")
@@ -78,6 +95,10 @@ class PoiSource(SQLModel, table=True):
 
 class PoiMedia(SQLModel, table=True):
     __tablename__ = "poi_media"
+    __table_args__ = (
+        trgm_index("ix_poi_media_author_trgm", "author"),
+        trgm_index("ix_poi_media_url_trgm", "url"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     poi_id: uuid.UUID = Field(foreign_key="poi.id", index=True)
     url: str
@@ -117,9 +138,15 @@ class TourBase(SQLModel):
     duration_minutes: Optional[int] = None
     published_at: Optional[datetime] = Field(default=None, index=True)
     created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # onupdate: every ORM update moves it (delta sync, /public/cities/{slug}/changes)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, sa_column_kwargs={"onupdate": datetime.utcnow})
 
 class Tour(TourBase, table=True):
+    # Delta sync: (updated_at, id) per city
+    __table_args__ = (
+        sa.Index("ix_tour_city_updated_id", "city_slug", "updated_at", "id"),
+        trgm_index("ix_tour_title_ru_trgm", "title_ru"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     city: Optional[City] = Relationship(back_populates="tours")
     items: List["TourItem"] = Relationship(back_populates="tour")
@@ -157,6 +184,10 @@ class TourSource(SQLModel, table=True):
 
 class TourMedia(SQLModel, table=True):
     __tablename__ = "tour_media"
+    __table_args__ = (
+        trgm_index("ix_tour_media_author_trgm", "author"),
+        trgm_index("ix_tour_media_url_trgm", "url"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     tour_id: uuid.UUID = Field(foreign_key="tour.id", index=True)
     url: str
@@ -199,6 +230,9 @@ class Entitlement(SQLModel, table=True):
 
 class EntitlementGrant(SQLModel, table=True):
     __tablename__ = "entitlement_grants"
+    __table_args__ = (
+        sa.Index("ix_entitlement_grants_granted_id", "granted_at", "id"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     device_anon_id: str = Field(index=True)
     user_id: Optional[uuid.UUID] = Field(default=None, index=True)
@@ -299,6 +333,9 @@ class HelperPlace(SQLModel, table=True):
 # --- Auth Models (PR-58) ---
 class User(SQLModel, table=True):
     __tablename__ = "users"
+    __table_args__ = (
+        sa.Index("ix_users_created_id", "created_at", "id"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     role: str = Field(default="user") # user, admin, editor
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -316,6 +353,9 @@ class User(SQLModel, table=True):
     
 class UserIdentity(SQLModel, table=True):
     __tablename__ = "user_identities"
+    __table_args__ = (
+        trgm_index("ix_user_identities_provider_id_trgm", "provider_id"),
+    )
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     user_id: uuid.UUID = Field(foreign_key="users.id", index=True)
     provider: str = Field(index=True) # phone, telegram
@@ -368,6 +408,19 @@ class TourVersion(SQLModel, table=True):
     description_ru: Optional[str] = None
     full_snapshot_json: Optional[str] = None
 
+# --- ETag Version Counters ---
+class ContentVersion(SQLModel, table=True):
+    """
+    Monotonic change counter per (entity, city_slug), bumped on every flush
+    that touches the entity (core/content_versions.py). city_slug "" is the
+    all-cities counter. Public list ETags are built from it.
+    """
+    __tablename__ = "content_versions"
+    entity: str = Field(primary_key=True)  # table name: "tour", "poi", "city", "helper_places"
+    city_slug: str = Field(default="", primary_key=True)
+    version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
 class ContentValidationIssue(SQLModel, table=True):
     __tablename__ = "content_validation_issues"
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
@@ -493,6 +546,10 @@ class FunnelConversion(SQLModel, table=True):
 
 class QRMapping(SQLModel, table=True):
     __tablename__ = "qr_mappings"
+    __table_args__ = (
+        trgm_index("ix_qr_mappings_code_trgm", "code"),
+        trgm_index("ix_qr_mappings_label_trgm", "label"),
+    )
     
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     code: str = Field(unique=True, index=True)  # "SPB001"
@@ -562,3 +619,28 @@ class TourRating(SQLModel, table=True):
     updated_at: datetime = Field(default_factory=datetime.utcnow)
     
     tour: Optional[Tour] = Relationship()
+
+
+class TourRatingSummary(SQLModel, table=True):
+    """
+    Denormalised per-tour rating aggregate, kept in step with tour_ratings by
+    api.core.rating_summary (same transaction as the rating write).
+    """
+    __tablename__ = "tour_rating_summaries"
+    tour_id: uuid.UUID = Field(foreign_key="tour.id", primary_key=True)
+    rating_count: int = Field(default=0)
+    rating_sum: int = Field(default=0)
+    stars_1: int = Field(default=0)
+    stars_2: int = Field(default=0)
+    stars_3: int = Field(default=0)
+    stars_4: int = Field(default=0)
+    stars_5: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    @property
+    def avg_rating(self) -> Optional[float]:
+        return self.rating_sum / self.rating_count if self.rating_count else None
+
+    @property
+    def distribution(self) -> dict:
+        return {i: getattr(self, f"stars_{i}") for i in range(1, 6)}
@@ -0,0 +1,123 @@
+"""
+Keyset (cursor) pagination for list endpoints.
+
+OFFSET n makes the database produce and throw away n rows, so deep pages get
+linearly slower. A keyset page seeks past the last row the client saw:
+
+    WHERE (sort, id) < (:last_sort, :last_id) ORDER BY sort DESC, id DESC LIMIT n
+
+which an index on the sort column serves at the same cost on every page. The
+id tiebreaker makes the order total, so rows sharing a timestamp are neither
+skipped nor repeated.
+
+Cursors are opaque to clients (url-safe base64 of the last row's key).
+Totals are optional: count_cached() caches COUNT(*) per filter set, so paging
+does not pay a full count per page.
+"""
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import func, literal, tuple_
+from sqlmodel import Session, select
+
+from .caching import cached_response
+from .config import config
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else str(v) for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _python_type(column) -> Optional[type]:
+    try:
+        return column.type.python_type
+    except NotImplementedError:
+        return None
+
+
+def decode_cursor(cursor: str, columns) -> tuple:
+    """Key values of a cursor, typed like `columns`; 400 for anything malformed."""
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            raise ValueError("cursor length")
+        values = []
+        for column, value in zip(columns, raw):
+            kind = _python_type(column)
+            if kind is datetime:
+                value = datetime.fromisoformat(value)
+            elif kind is uuid.UUID:
+                value = uuid.UUID(value)
+            elif kind in (int, float):
+                value = kind(value)
+            values.append(value)
+        return tuple(values)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def seek_past(columns, key, descending: bool = True):
+    """WHERE clause for rows strictly after `key` in (columns) order."""
+    # typed binds: the key must be compared in the column's storage format
+    key = [literal(v, c.type) for c, v in zip(columns, key)]
+    return tuple_(*columns) < tuple_(*key) if descending else tuple_(*columns) > tuple_(*key)
+
+
+def keyset_page(
+    session: Session,
+    query,
+    sort_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    descending: bool = True,
+) -> tuple[list, Optional[str]]:
+    """
+    One page of `query` (a select of one entity) ordered by (sort, id).
+    With a cursor the page starts right after it; without one, `offset` is
+    used (page-number compatibility). Returns (rows, next_cursor); the
+    cursor is None on the last page.
+    """
+    columns = (sort_column, id_column)
+    if cursor:
+        query = query.where(seek_past(columns, decode_cursor(cursor, columns), descending))
+    elif offset:
+        query = query.offset(offset)
+    order = [c.desc() for c in columns] if descending else [c.asc() for c in columns]
+    rows = list(session.exec(query.order_by(*order).limit(limit + 1)).all())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return rows, next_cursor
+
+
+def ranked_page(session: Session, query, rank, id_column, limit: int, offset: int = 0) -> tuple[list, None]:
+    """
+    One page of `query` by relevance (rank DESC, id) for search results.
+    Page numbers only: a rank is not a stable seek key, so next_cursor is None.
+    """
+    rows = session.exec(query.order_by(rank.desc(), id_column).offset(offset).limit(limit)).all()
+    return list(rows), None
+
+
+def count_cached(session: Session, query, key: str, ttl: Optional[int] = None) -> int:
+    """
+    COUNT(*) of `query` (no ORDER BY/LIMIT), cached under `key`. Put a
+    content version in the key for an exact count; otherwise it is
+    approximate within `ttl` (LIST_TOTAL_CACHE_SECONDS).
+    """
+    ttl = config.LIST_TOTAL_CACHE_SECONDS if ttl is None else ttl
+    return cached_response(
+        f"count:{key}",
+        lambda: session.exec(select(func.count()).select_from(query.subquery())).one(),
+        fresh_ttl=ttl,
+    )
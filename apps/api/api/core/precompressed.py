@@ -0,0 +1,328 @@
+"""
+Precompressed, content-addressed bodies for public payloads that only change
+on publish (/public/cities, city tours, catalog, city offline manifest, map
+vector tiles).
+
+Keys carry the content version (the generate_version_marker ETag), so the
+first request after a publish renders the payload once, encodes it and
+compresses it to gzip and brotli. Every later request for that version gets
+the stored body for its Accept-Encoding: no ORM, serialization or
+compression work (GZipMiddleware passes bodies with Content-Encoding through).
+
+Bodies live in an in-process LRU plus a shared tier: Redis when configured,
+otherwise PUBLIC_BLOB_DIR on local disk (shared by the workers of one host).
+Each file's mtime is its expiry; writes sweep expired files (at most once a
+minute per worker) and then the earliest-expiring ones beyond
+PUBLIC_BLOB_DIR_MAX_MB. The payload is stored only as these bodies; misses
+are single-flight per worker.
+"""
+import asyncio
+import gzip
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import redis
+import redis.asyncio as aioredis
+from fastapi import Request, Response
+
+from .config import config
+from .caching import REDIS_URL, _LocalLRU, _leave_thread_flight, _thread_flight
+from .serialization import json_bytes
+
+try:
+    import brotli
+except ImportError:  # optional dependency: gzip only
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+BLOB_PREFIX = "blob:"
+IDENTITY = "identity"
+# Server preference when the client accepts several
+ENCODINGS = ("br", "gzip")
+DISK_SWEEP_SECONDS = 60
+_TMP_PREFIX = ".tmp-"
+# a temp file older than this was left by a crashed write
+_TMP_MAX_AGE_SECONDS = 3600
+
+# Separate clients: the shared ones in caching.py decode responses to str
+_redis = None
+_async_redis = None
+if REDIS_URL:
+    try:
+        _redis = redis.Redis.from_url(REDIS_URL)
+        _async_redis = aioredis.Redis.from_url(REDIS_URL)
+    except Exception as e:
+        logger.warning(f"Redis connection failed: {e}")
+
+_local_blobs = _LocalLRU(config.PUBLIC_BLOB_LOCAL_MAX_ENTRIES)
+_async_flights: dict[str, list] = {}  # key -> [asyncio.Lock, users]
+_last_sweep = 0.0
+_sweep_lock = threading.Lock()
+
+
+def encode_blobs(value: Any) -> dict[str, bytes]:
+    """JSON body of value in every supported encoding."""
+    return compress_blobs(json_bytes(value))
+
+
+def compress_blobs(body: bytes) -> dict[str, bytes]:
+    """An already rendered body (JSON, vector tile) in every supported encoding."""
+    blobs = {IDENTITY: body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        blobs["br"] = brotli.compress(body, quality=config.PUBLIC_BLOB_BROTLI_QUALITY)
+    return blobs
+
+
+def choose_encoding(accept_encoding: Optional[str], available) -> str:
+    """Best encoding from `available` the client accepts (q=0 excludes), else identity."""
+    accepted = {}
+    for part in (accept_encoding or "").lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name] = q
+    for encoding in ENCODINGS:
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return IDENTITY
+
+
+def blob_response(
+    request: Request, response: Response, blobs: dict[str, bytes], media_type: str = "application/json",
+) -> Response:
+    """Serve the stored body matching Accept-Encoding, with the headers set on `response` (ETag, Cache-Control)."""
+    encoding = choose_encoding(request.headers.get("accept-encoding"), blobs)
+    out = Response(content=blobs[encoding], media_type=media_type)
+    out.headers.raw.extend(
+        (k, v) for k, v in response.headers.raw if k not in (b"content-length", b"content-type")
+    )
+    if encoding != IDENTITY:
+        out.headers["Content-Encoding"] = encoding
+    out.headers.add_vary_header("Accept-Encoding")
+    return out
+
+
+# --- storage ---
+
+def _disk_path(key: str, encoding: str) -> str:
+    return os.path.join(config.PUBLIC_BLOB_DIR, f"{hashlib.sha256(key.encode()).hexdigest()}.{encoding}")
+
+
+def _disk_get(key: str) -> Optional[dict[str, bytes]]:
+    # identity is written last: its mtime is the expiry of the whole set
+    try:
+        if os.stat(_disk_path(key, IDENTITY)).st_mtime <= time.time():
+            return None
+        blobs = {}
+        for encoding in (IDENTITY,) + ENCODINGS:
+            try:
+                with open(_disk_path(key, encoding), "rb") as f:
+                    blobs[encoding] = f.read()
+            except FileNotFoundError:
+                pass
+        return blobs
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warning(f"Blob read failed: {e}")
+        return None
+
+
+def _disk_sweep(now: float) -> None:
+    """Delete expired blob files, then the earliest-expiring ones over PUBLIC_BLOB_DIR_MAX_MB."""
+    live, total = [], 0
+    for entry in os.scandir(config.PUBLIC_BLOB_DIR):
+        try:
+            stat = entry.stat()
+            if entry.name.startswith(_TMP_PREFIX):
+                if stat.st_mtime < now - _TMP_MAX_AGE_SECONDS:
+                    os.remove(entry.path)
+            elif stat.st_mtime <= now:
+                os.remove(entry.path)
+            else:
+                live.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        except FileNotFoundError:
+            pass  # removed by another worker
+    limit = config.PUBLIC_BLOB_DIR_MAX_MB * 1024 * 1024
+    for _, size, path in sorted(live):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def _maybe_sweep() -> None:
+    global _last_sweep
+    now = time.time()
+    with _sweep_lock:
+        if now - _last_sweep < DISK_SWEEP_SECONDS:
+            return
+        _last_sweep = now
+    try:
+        _disk_sweep(now)
+    except OSError as e:
+        logger.warning(f"Blob sweep failed: {e}")
+
+
+def _disk_put(key: str, blobs: dict[str, bytes], expires: float) -> None:
+    try:
+        os.makedirs(config.PUBLIC_BLOB_DIR, exist_ok=True)
+        for encoding in sorted(blobs, key=lambda e: e == IDENTITY):
+            fd, tmp = tempfile.mkstemp(dir=config.PUBLIC_BLOB_DIR, prefix=_TMP_PREFIX)
+            with os.fdopen(fd, "wb") as f:
+                f.write(blobs[encoding])
+            os.utime(tmp, (expires, expires))
+            os.replace(tmp, _disk_path(key, encoding))
+    except OSError as e:
+        logger.warning(f"Blob write failed: {e}")
+        return
+    _maybe_sweep()
+
+
+def _decode_hash(raw: Optional[dict]) -> Optional[dict[str, bytes]]:
+    if not raw or IDENTITY.encode() not in raw:
+        return None
+    return {k.decode(): v for k, v in raw.items()}
+
+
+def get_blobs(key: str) -> Optional[dict[str, bytes]]:
+    entry = _local_blobs.get(key)
+    if entry is not None:
+        return entry["b"]
+    blobs, ttl = None, None
+    if _redis:
+        try:
+            pipe = _redis.pipeline()
+            pipe.hgetall(BLOB_PREFIX + key)
+            pipe.ttl(BLOB_PREFIX + key)
+            raw, ttl = pipe.execute()
+            blobs = _decode_hash(raw)
+        except Exception as e:
+            logger.warning(f"Blob lookup failed: {e}")
+    elif config.PUBLIC_BLOB_DIR:
+        blobs = _disk_get(key)
+    if blobs is not None:
+        # the local copy must not outlive the shared one
+        _local_blobs.set(key, {"s": time.time() + (ttl if ttl and ttl > 0 else 1), "b": blobs})
+    return blobs
+
+
+async def get_blobs_async(key: str) -> Optional[dict[str, bytes]]:
+    entry = _local_blobs.get(key)
+    if entry is not None:
+        return entry["b"]
+    blobs, ttl = None, None
+    if _async_redis:
+        try:
+            pipe = _async_redis.pipeline()
+            pipe.hgetall(BLOB_PREFIX + key)
+            pipe.ttl(BLOB_PREFIX + key)
+            raw, ttl = await pipe.execute()
+            blobs = _decode_hash(raw)
+        except Exception as e:
+            logger.warning(f"Blob lookup failed: {e}")
+    elif config.PUBLIC_BLOB_DIR:
+        blobs = await asyncio.to_thread(_disk_get, key)
+    if blobs is not None:
+        _local_blobs.set(key, {"s": time.time() + (ttl if ttl and ttl > 0 else 1), "b": blobs})
+    return blobs
+
+
+def store_blobs(key: str, blobs: dict[str, bytes], ttl: int) -> None:
+    _local_blobs.set(key, {"s": time.time() + ttl, "b": blobs})
+    if _redis:
+        try:
+            pipe = _redis.pipeline()
+            pipe.delete(BLOB_PREFIX + key)
+            pipe.hset(BLOB_PREFIX + key, mapping=blobs)
+            pipe.expire(BLOB_PREFIX + key, ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Blob store failed: {e}")
+    elif config.PUBLIC_BLOB_DIR:
+        _disk_put(key, blobs, time.time() + ttl)
+
+
+async def store_blobs_async(key: str, blobs: dict[str, bytes], ttl: int) -> None:
+    _local_blobs.set(key, {"s": time.time() + ttl, "b": blobs})
+    if _async_redis:
+        try:
+            pipe = _async_redis.pipeline()
+            pipe.delete(BLOB_PREFIX + key)
+            pipe.hset(BLOB_PREFIX + key, mapping=blobs)
+            pipe.expire(BLOB_PREFIX + key, ttl)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Blob store failed: {e}")
+    elif config.PUBLIC_BLOB_DIR:
+        await asyncio.to_thread(_disk_put, key, blobs, time.time() + ttl)
+
+
+# --- endpoint helpers ---
+
+def precompressed_response(
+    request: Request, response: Response, key: str, load: Callable[[], Any], ttl: Optional[int] = None,
+) -> Response:
+    """
+    Serve load()'s payload for `key` from stored precompressed bodies, building
+    them on a miss. ttl bounds how long a body is reused: leave the default
+    (PUBLIC_BLOB_TTL_SECONDS) only when the key fully determines the payload.
+    """
+    ttl = config.PUBLIC_BLOB_TTL_SECONDS if ttl is None else ttl
+    blobs = get_blobs(key)
+    if blobs is None:
+        flight = _thread_flight(BLOB_PREFIX + key)
+        try:
+            with flight[0]:
+                blobs = get_blobs(key)
+                if blobs is None:
+                    blobs = encode_blobs(load())
+                    store_blobs(key, blobs, ttl)
+        finally:
+            _leave_thread_flight(BLOB_PREFIX + key, flight)
+    return blob_response(request, response, blobs)
+
+
+async def precompressed_response_async(
+    request: Request, response: Response, key: str, load: Callable[[], Awaitable[Any]], ttl: Optional[int] = None,
+) -> Response:
+    """Async variant of precompressed_response; compression runs in a worker thread."""
+    ttl = config.PUBLIC_BLOB_TTL_SECONDS if ttl is None else ttl
+    blobs = await get_blobs_async(key)
+    if blobs is None:
+        flight = _async_flights.get(key)
+        if flight is None:
+            flight = _async_flights[key] = [asyncio.Lock(), 0]
+        flight[1] += 1
+        try:
+            async with flight[0]:
+                blobs = await get_blobs_async(key)
+                if blobs is None:
+                    blobs = await asyncio.to_thread(encode_blobs, await load())
+                    await store_blobs_async(key, blobs, ttl)
+        finally:
+            flight[1] -= 1
+            if flight[1] == 0 and _async_flights.get(key) is flight:
+                del _async_flights[key]
+    return blob_response(request, response, blobs)
+
+
+def reset_public_blobs() -> None:
+    """Drop the in-process tier (tests, ops)."""
+    _local_blobs.clear()
@@ -0,0 +1,136 @@
+"""
+Per-request SQL instrumentation.
+
+SQLAlchemy cursor events on every engine count statements and accumulate
+DB time into the QueryStats of the current request (a contextvar set by
+SecurityMiddleware). Totals are exposed as a Server-Timing header, access log
+fields and per-route histograms (/ops/metrics, Prometheus text format).
+"""
+import time
+import threading
+from contextvars import ContextVar
+from typing import Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+class QueryStats:
+    __slots__ = ("count", "duration_ms")
+
+    def __init__(self):
+        self.count = 0
+        self.duration_ms = 0.0
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+
+def start_request_stats():
+    """Begin collecting for the current request. Returns (stats, token) for reset."""
+    stats = QueryStats()
+    return stats, _current_stats.set(stats)
+
+
+def end_request_stats(token) -> None:
+    _current_stats.reset(token)
+
+
+def current_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration_ms += elapsed_ms
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Attach the counters to a sync Engine (use AsyncEngine.sync_engine for async)."""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def server_timing(stats: QueryStats, total_ms: float) -> str:
+    return f'db;dur={stats.duration_ms:.1f};desc="{stats.count} queries", app;dur={total_ms:.1f}'
+
+
+# --- Per-route histograms (in-process, per worker) ---
+
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+DB_TIME_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class _Histogram:
+    __slots__ = ("buckets", "counts", "sum", "total")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.total = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.sum += value
+        self.total += 1
+
+
+_lock = threading.Lock()
+_route_histograms: dict[tuple[str, str], tuple[_Histogram, _Histogram]] = {}
+
+
+def record_route(method: str, route: str, stats: QueryStats) -> None:
+    key = (method, route)
+    with _lock:
+        hists = _route_histograms.get(key)
+        if hists is None:
+            hists = (_Histogram(QUERY_COUNT_BUCKETS), _Histogram(DB_TIME_BUCKETS_MS))
+            _route_histograms[key] = hists
+        hists[0].observe(stats.count)
+        hists[1].observe(stats.duration_ms)
+
+
+def reset_route_metrics() -> None:
+    with _lock:
+        _route_histograms.clear()
+
+
+def _render_histogram(lines: list, name: str, labels: str, hist: _Histogram) -> None:
+    for bound, count in zip(hist.buckets, hist.counts):
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {hist.total}')
+    lines.append(f"{name}_sum{{{labels}}} {hist.sum:.3f}")
+    lines.append(f"{name}_count{{{labels}}} {hist.total}")
+
+
+def render_prometheus() -> str:
+    lines = [
+        "# HELP db_queries_per_request SQL statements executed per request",
+        "# TYPE db_queries_per_request histogram",
+    ]
+    with _lock:
+        items = sorted(_route_histograms.items())
+    for (method, route), (count_hist, _) in items:
+        _render_histogram(lines, "db_queries_per_request", f'method="{method}",route="{route}"', count_hist)
+
+    lines += [
+        "# HELP db_time_ms_per_request DB time per request in milliseconds",
+        "# TYPE db_time_ms_per_request histogram",
+    ]
+    for (method, route), (_, time_hist) in items:
+        _render_histogram(lines, "db_time_ms_per_request", f'method="{method}",route="{route}"', time_hist)
+    return "\n".join(lines) + "\n"
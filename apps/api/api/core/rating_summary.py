@@ -0,0 +1,126 @@
+"""
+Maintained per-tour rating aggregates (tour_rating_summaries).
+
+Every write to tour_ratings calls apply_rating_change() in the same
+transaction, which bumps count/sum/histogram with a single atomic upsert, so
+concurrent raters never lose an increment. Readers take the summary row by
+primary key instead of aggregating tour_ratings. An existing rating is
+changed through update_rating(), which takes the old value from the row it
+actually replaced, so two concurrent updates from one device never both
+subtract the same old rating. rebuild_rating_summaries()
+recomputes everything from tour_ratings to repair drift
+(scripts/rebuild_rating_summaries.py).
+"""
+import uuid
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import case, delete, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import Session, select
+
+from .models import TourRating, TourRatingSummary
+
+STARS = range(1, 6)
+
+
+def _insert(session: Session):
+    dialect = session.get_bind().dialect.name
+    module = sqlite if dialect == "sqlite" else postgresql
+    return module.insert(TourRatingSummary)
+
+
+def apply_rating_change(
+    session: Session,
+    tour_id: uuid.UUID,
+    old_rating: Optional[int],
+    new_rating: Optional[int],
+) -> None:
+    """
+    Record one rating write: insert (old=None), update (both set) or delete
+    (new=None). Does not commit; the caller commits with the rating itself.
+    """
+    if old_rating == new_rating:
+        return
+    deltas = {"rating_count": 0, "rating_sum": 0, **{f"stars_{i}": 0 for i in STARS}}
+    if old_rating is not None:
+        deltas["rating_count"] -= 1
+        deltas["rating_sum"] -= old_rating
+        deltas[f"stars_{old_rating}"] -= 1
+    if new_rating is not None:
+        deltas["rating_count"] += 1
+        deltas["rating_sum"] += new_rating
+        deltas[f"stars_{new_rating}"] += 1
+
+    now = datetime.utcnow()
+    table = TourRatingSummary.__table__
+    stmt = _insert(session).values(tour_id=tour_id, updated_at=now, **{k: max(v, 0) for k, v in deltas.items()})
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.tour_id],
+        set_={**{k: table.c[k] + v for k, v in deltas.items() if v}, "updated_at": now},
+    )
+    session.exec(stmt)
+
+
+def update_rating(session: Session, rating: TourRating, new_rating: int, **values) -> None:
+    """
+    Set an existing rating (plus other columns in `values`) and apply the
+    summary delta. The UPDATE only matches the old value it was computed
+    from; if a concurrent update committed first, the current value is
+    re-read and the update retried. Does not commit.
+    """
+    old_rating = rating.rating
+    while True:
+        result = session.exec(
+            update(TourRating)
+            .where(TourRating.id == rating.id, TourRating.rating == old_rating)
+            .values(rating=new_rating, **values)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            break
+        current = session.exec(select(TourRating.rating).where(TourRating.id == rating.id)).first()
+        if current is None:
+            raise LookupError(f"tour rating {rating.id} no longer exists")
+        old_rating = current
+    apply_rating_change(session, rating.tour_id, old_rating, new_rating)
+
+
+def get_rating_summaries(session: Session, tour_ids: Iterable[uuid.UUID]) -> dict:
+    """tour_id -> TourRatingSummary for the given tours (missing = no ratings)."""
+    ids = list(tour_ids)
+    if not ids:
+        return {}
+    rows = session.exec(select(TourRatingSummary).where(TourRatingSummary.tour_id.in_(ids))).all()
+    return {row.tour_id: row for row in rows}
+
+
+def rebuild_rating_summaries(session: Session, tour_id: Optional[uuid.UUID] = None) -> int:
+    """
+    Recompute summaries from tour_ratings (all tours, or one). Rows for tours
+    without ratings are removed. Commits; returns the number of summaries written.
+    """
+    stmt = select(
+        TourRating.tour_id,
+        func.count(TourRating.id),
+        func.sum(TourRating.rating),
+        *[func.sum(case((TourRating.rating == i, 1), else_=0)) for i in STARS],
+    ).group_by(TourRating.tour_id)
+    purge = delete(TourRatingSummary)
+    if tour_id is not None:
+        stmt = stmt.where(TourRating.tour_id == tour_id)
+        purge = purge.where(TourRatingSummary.tour_id == tour_id)
+
+    rows = session.exec(stmt).all()
+    now = datetime.utcnow()
+    session.exec(purge)
+    for row in rows:
+        session.add(TourRatingSummary(
+            tour_id=row[0],
+            rating_count=row[1],
+            rating_sum=row[2] or 0,
+            updated_at=now,
+            **{f"stars_{i}": row[2 + i] or 0 for i in STARS},
+        ))
+    session.commit()
+    return len(rows)
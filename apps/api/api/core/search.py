@@ -0,0 +1,112 @@
+"""
+Full-text search over POIs and tours (PostgreSQL tsvector + GIN).
+
+poi.search_vector and tour.search_vector are STORED generated columns
+(migration a5b1e3c9d7f2, expression vector_sql()), so they follow every
+write without triggers:
+
+    title (russian stems + simple words, ru and en)   weight A
+    description (russian stems, ru and en)            weight B
+
+The simple config keeps names, transliterations and words the Russian
+stemmer would mangle; the russian one matches inflected forms. The columns
+are not mapped on the models (SQLite test databases cannot create them) and
+are referenced here by name.
+
+A query is split into words, each a prefix term ("кремл:*"), all required,
+matched in either config: "кафедральный собор" and "кафедральн соб" find
+the same rows. Ranking is ts_rank_cd, so title hits beat description hits.
+
+Admin lists (short names, codes, phones, URLs) use fuzzy_search() instead:
+pg_trgm GIN indexes (migration b6c2f4d0e8a1) serve both the substring
+ILIKE and the word-similarity operator, so typos still match and neither
+needs a sequential scan.
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import func, literal, literal_column, or_
+from sqlmodel import Session, select
+
+from .config import config
+
+MAX_TERMS = 8
+_WORD = re.compile(r"\w+", re.UNICODE)
+# typed constants: a bound parameter would leave the config to the driver's typing
+_RUSSIAN = literal_column("'russian'::regconfig")
+_SIMPLE = literal_column("'simple'::regconfig")
+
+
+def _text(*columns: str) -> str:
+    # ё is folded to е on both sides: the stemmers treat them as different letters
+    joined = " || ' ' || ".join(f"coalesce({c}, '')" for c in columns)
+    return f"translate({joined}, 'ёЁ', 'еЕ')"
+
+
+def vector_sql(titles=("title_ru", "title_en"), descriptions=("description_ru", "description_en")) -> str:
+    """Generated column expression (keep in sync with migration a5b1e3c9d7f2)."""
+    return (
+        f"setweight(to_tsvector('russian', {_text(*titles)}), 'A') || "
+        f"setweight(to_tsvector('simple', {_text(*titles)}), 'A') || "
+        f"setweight(to_tsvector('russian', {_text(*descriptions)}), 'B')"
+    )
+
+
+def prefix_query(text: str) -> Optional[str]:
+    """to_tsquery text for the user's input ('a:* & b:*'), None when it has no words."""
+    words = [w.replace("ё", "е") for w in _WORD.findall(text.lower()) if w.strip("_")][:MAX_TERMS]
+    if not words:
+        return None
+    return " & ".join(f"{w}:*" for w in words)
+
+
+def search_vector(model):
+    return literal_column(f"{model.__tablename__}.search_vector")
+
+
+def ts_query(query_text: str):
+    """Match in the russian or the simple config."""
+    return func.to_tsquery(_RUSSIAN, query_text).op("||")(func.to_tsquery(_SIMPLE, query_text))
+
+
+def fulltext_match(model, query_text: str):
+    """WHERE clause: the row matches prefix_query() output."""
+    return search_vector(model).op("@@")(ts_query(query_text))
+
+
+def fulltext_rank(model, query_text: str):
+    return func.ts_rank_cd(search_vector(model), ts_query(query_text))
+
+
+# --- trigram (admin lists) ---
+
+PG_TRGM_DEFAULT_THRESHOLD = 0.6
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def fuzzy_search(session: Session, query, term: str, *columns):
+    """
+    (query, rank) for a search box over `columns`: rows where a column
+    contains `term` or has a word similar to it (word_similarity at least
+    SEARCH_SIMILARITY_THRESHOLD). rank is the best word_similarity, for
+    ORDER BY rank DESC. On SQLite only the substring match applies.
+    """
+    pattern = _like_pattern(term)
+    if session.get_bind().dialect.name != "postgresql":
+        return query.where(or_(*(c.ilike(pattern, escape="\\") for c in columns))), None
+
+    threshold = config.SEARCH_SIMILARITY_THRESHOLD
+    if threshold != PG_TRGM_DEFAULT_THRESHOLD:
+        # <% compares against this setting; transaction-local
+        session.exec(select(func.set_config("pg_trgm.word_similarity_threshold", str(threshold), True)))
+    bound = literal(term)
+    match = or_(
+        *(c.ilike(pattern, escape="\\") for c in columns),
+        *(bound.op("<%")(c) for c in columns),
+    )
+    rank = func.greatest(*(func.coalesce(func.word_similarity(bound, c), 0) for c in columns))
+    return query.where(match), rank
@@ -3,44 +3,159 @@ import hmac
 import hashlib
 import time
 import base64
+import threading
+import uuid
+from typing import Optional
 from .config import config
 
 logger = logging.getLogger(__name__)
 
-def sign_asset_url(url: str, ttl_seconds: int = 3600) -> str:
-    """
-    Signs a URL for temporary access using HMAC and TTL.
-    Even if blob is public, this enforces platform-level gating.
-    """
-    if not url: return url
-    
-    # Fail-fast if secret is missing but signing is required for P0
-    secret = config.YOOKASSA_WEBHOOK_SECRET # Using webhook secret as a platform secret if no other is defined
-    if not secret:
-        logger.error("CRITICAL: No platform secret for URL signing.")
-        return url
-        
-    expires = int(time.time()) + ttl_seconds
-    
-    # 1. Prepare base string
-    # Remove existing query if any (simplified)
-    base_url = url.split("?")[0]
-    payload = f"{base_url}|{expires}"
-    
-    # 2. Generate HMAC
+# Expiries are rounded up to this bucket, so a signature can be reused by
+# every response signed in the same bucket instead of one HMAC per URL per call
+SIGNATURE_BUCKET_SECONDS = 300
+_SIGNATURE_CACHE_MAX = 50000
+
+# expires -> {base_url: encoded signature}; buckets are created and evicted
+# under the lock (sync handlers sign from threadpool threads)
+_signatures: dict[int, dict[str, str]] = {}
+_signatures_lock = threading.Lock()
+
+
+def _bucketed_expiry(ttl_seconds: int) -> int:
+    """now + ttl, rounded up to the bucket (never shorter than requested)."""
+    deadline = int(time.time()) + ttl_seconds
+    return -(-deadline // SIGNATURE_BUCKET_SECONDS) * SIGNATURE_BUCKET_SECONDS
+
+
+def signature_bucket(ttl_seconds: int = 3600) -> int:
+    """Expiry shared by every URL signed now; changes every SIGNATURE_BUCKET_SECONDS (cache-key part)."""
+    return _bucketed_expiry(ttl_seconds)
+
+
+def _bucket_signatures(expires: int) -> dict[str, str]:
+    with _signatures_lock:
+        bucket = _signatures.get(expires)
+        if bucket is None:
+            now = int(time.time())
+            for old in [e for e in _signatures if e <= now]:
+                _signatures.pop(old, None)
+            bucket = _signatures[expires] = {}
+        elif len(bucket) >= _SIGNATURE_CACHE_MAX:
+            # replaced, not cleared: other threads may be reading the old dict
+            bucket = _signatures[expires] = {}
+        return bucket
+
+
+def _hmac_token(secret: str, payload: str) -> str:
     signature = hmac.new(
         secret.encode("utf-8"),
         payload.encode("utf-8"),
         hashlib.sha256
     ).digest()
-    
-    encoded_sig = base64.urlsafe_b64encode(signature).decode("utf-8").rstrip("=")
-    
-    # 3. Append params
-    separator = "&" if "?" in url else "?"
-    signed_url = f"{url}{separator}token={encoded_sig}&expires={expires}"
-    
-    return signed_url
+    return base64.urlsafe_b64encode(signature).decode("utf-8").rstrip("=")
+
+
+def _prefix_payload(prefix: str, expires: int) -> str:
+    # Domain-separated from per-URL payloads ("<url>|<expires>")
+    return f"prefix|{prefix}|{expires}"
+
+
+def asset_prefix(url: str) -> Optional[str]:
+    """
+    Entity-scoped storage directory of an asset URL ("…/poi/<uuid>/"), or None.
+    Only directories named by an entity id qualify: a token for a shared
+    directory such as "narrations/" would unlock every asset in it.
+    """
+    if not url:
+        return None
+    directory, _, _ = url.split("?")[0].rpartition("/")
+    try:
+        uuid.UUID(directory.rpartition("/")[2])
+    except ValueError:
+        return None
+    return directory + "/"
+
+
+def sign_asset_prefix(prefix: str, ttl_seconds: int = 3600) -> Optional[dict]:
+    """One token for every object under prefix: {"prefix", "token", "expires"}."""
+    secret = config.YOOKASSA_WEBHOOK_SECRET
+    if not secret:
+        logger.error("CRITICAL: No platform secret for URL signing.")
+        return None
+    expires = _bucketed_expiry(ttl_seconds)
+    bucket = _bucket_signatures(expires)
+    key = _prefix_payload(prefix, expires)
+    token = bucket.get(key)
+    if token is None:
+        token = bucket[key] = _hmac_token(secret, key)
+    return {"prefix": prefix, "token": token, "expires": expires}
+
+
+class AssetUrlSigner:
+    """
+    Signs many asset URLs for one response: one expiry and secret lookup,
+    repeated URLs signed once, signatures memoised per expiry bucket.
+
+    With prefix_scoped=True, URLs under an entity-scoped directory are left
+    unsigned and covered by one prefix token per directory (tokens()); other
+    URLs still get per-URL signatures.
+    """
+
+    def __init__(self, ttl_seconds: int = 3600, prefix_scoped: bool = False):
+        self.secret = config.YOOKASSA_WEBHOOK_SECRET # Using webhook secret as a platform secret if no other is defined
+        self.ttl_seconds = ttl_seconds
+        self.expires = _bucketed_expiry(ttl_seconds)
+        self.prefix_scoped = prefix_scoped
+        self._prefixes: set[str] = set()
+        self._signed: dict[str, str] = {}
+        self._warned = False
+
+    def __call__(self, url: str) -> str:
+        if not url:
+            return url
+        # Fail-fast if secret is missing but signing is required for P0
+        if not self.secret:
+            if not self._warned:
+                logger.error("CRITICAL: No platform secret for URL signing.")
+                self._warned = True
+            return url
+        signed = self._signed.get(url)
+        if signed is None:
+            prefix = asset_prefix(url) if self.prefix_scoped else None
+            if prefix:
+                self._prefixes.add(prefix)
+                signed = url
+            else:
+                signed = self._sign(url)
+            self._signed[url] = signed
+        return signed
+
+    def sign_many(self, urls) -> list:
+        return [self(url) for url in urls]
+
+    def tokens(self) -> list:
+        """Prefix tokens covering the URLs left unsigned (prefix_scoped mode)."""
+        return [t for t in (sign_asset_prefix(p, self.ttl_seconds) for p in sorted(self._prefixes)) if t]
+
+    def _sign(self, url: str) -> str:
+        # Remove existing query if any (simplified)
+        base_url = url.split("?")[0]
+        bucket = _bucket_signatures(self.expires)
+        encoded_sig = bucket.get(base_url)
+        if encoded_sig is None:
+            encoded_sig = bucket[base_url] = _hmac_token(self.secret, f"{base_url}|{self.expires}")
+
+        separator = "&" if "?" in url else "?"
+        return f"{url}{separator}token={encoded_sig}&expires={self.expires}"
+
+
+def sign_asset_url(url: str, ttl_seconds: int = 3600) -> str:
+    """
+    Signs a URL for temporary access using HMAC and TTL.
+    Even if blob is public, this enforces platform-level gating.
+    For many URLs in one response use AssetUrlSigner.
+    """
+    return AssetUrlSigner(ttl_seconds)(url)
 
 def verify_asset_signature(url: str, token: str, expires: int) -> bool:
     """
@@ -64,3 +179,31 @@ def verify_asset_signature(url: str, token: str, expires: int) -> bool:
     actual_sig = base64.urlsafe_b64decode(token + "==")
     
     return hmac.compare_digest(expected_sig, actual_sig)
+
+def verify_asset_prefix_token(url: str, prefix: str, token: str, expires: int) -> bool:
+    """
+    Verifies a prefix token for url: the object must live under prefix (no
+    path traversal) and the token must match prefix + expiry.
+    """
+    if int(time.time()) > expires:
+        return False
+
+    secret = config.YOOKASSA_WEBHOOK_SECRET
+    if not secret: return False
+
+    base_url = url.split("?")[0]
+    if not prefix.endswith("/") or not base_url.startswith(prefix):
+        return False
+    rest = base_url[len(prefix):]
+    if ".." in rest or "%2e" in rest.lower():
+        return False
+
+    expected = _hmac_token(secret, _prefix_payload(prefix, expires))
+    return hmac.compare_digest(expected, token)
+
+
+def verify_asset_access(url: str, token: str, expires: int, prefix: Optional[str] = None) -> bool:
+    """Edge check for either signing mode: per-URL token, or prefix token when prefix is given."""
+    if prefix:
+        return verify_asset_prefix_token(url, prefix, token, expires)
+    return verify_asset_signature(url, token, expires)
@@ -0,0 +1,117 @@
+"""
+Fast JSON rendering for large responses (manifests, catalog, POI detail).
+
+FastAPI's default path runs every return value through jsonable_encoder
+(a recursive Python walk that re-encodes each UUID and datetime) and then
+stdlib json. FastJSONResponse renders with orjson, which encodes those types
+natively; without orjson installed it falls back to the default path.
+
+Opt-in via FAST_JSON_RESPONSES:
+- index.py mounts the public and map routers with json_response_class()
+- hot endpoints return fast_json(data, response), which also skips
+  jsonable_encoder (a returned Response bypasses FastAPI's serializer)
+
+Both are no-ops when the flag is off.
+
+iter_json_object() encodes a document incrementally for StreamingResponse
+(city offline manifest), independent of the flag.
+"""
+import json
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, Optional
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from .config import config
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj: Any):
+    """orjson fallback for types it does not encode natively."""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, Decimal):
+        return float(obj)
+    return jsonable_encoder(obj)
+
+
+def json_bytes(content: Any) -> bytes:
+    """Compact UTF-8 JSON, via orjson when installed (also used for streamed chunks)."""
+    if orjson is None:
+        return json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by orjson (UUID/datetime/dataclass handled natively)."""
+
+    def render(self, content: Any) -> bytes:
+        return json_bytes(content)
+
+
+def fast_json_enabled() -> bool:
+    return config.FAST_JSON_RESPONSES and orjson is not None
+
+
+def json_response_class() -> type[JSONResponse]:
+    """Default response class for routers mounted in index.py."""
+    return FastJSONResponse if fast_json_enabled() else JSONResponse
+
+
+def fast_json(data: Any, response: Optional[Response] = None, status_code: int = 200):
+    """
+    Return data as a FastJSONResponse, carrying over headers already set on the
+    injected Response (Cache-Control, ETag). With the flag off, data is
+    returned unchanged for FastAPI's default serialization.
+    """
+    if not fast_json_enabled():
+        return data
+    out = FastJSONResponse(data, status_code=status_code)
+    if response is not None:
+        # content-length was computed for our body; keep it
+        out.headers.raw.extend(
+            (k, v) for k, v in response.headers.raw if k not in (b"content-length", b"content-type")
+        )
+    return out
+
+
+STREAM_CHUNK_BYTES = 64 * 1024
+
+
+def iter_json_object(fields: Iterable[tuple[str, Any]], chunk_size: int = STREAM_CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Encode a JSON object as a stream of ~chunk_size byte chunks. Fields are
+    written in order; an iterator value is written as an array item by item
+    (never materialised), a callable value is called when its turn comes, so
+    it can report totals gathered from the arrays before it.
+    """
+    buf = bytearray(b"{")
+    for n, (key, value) in enumerate(fields):
+        if n:
+            buf += b","
+        buf += json_bytes(key) + b":"
+        if callable(value):
+            value = value()
+        if not isinstance(value, Iterator):
+            buf += json_bytes(value)
+            continue
+        buf += b"["
+        for i, item in enumerate(value):
+            if i:
+                buf += b","
+            buf += json_bytes(item)
+            if len(buf) >= chunk_size:
+                yield bytes(buf)
+                buf.clear()
+        buf += b"]"
+    buf += b"}"
+    yield bytes(buf)
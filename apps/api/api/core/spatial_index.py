@@ -0,0 +1,258 @@
+"""
+In-process spatial index per city for /public/nearby, /public/helpers?bbox=
+and /public/cities/{slug}/clusters.
+
+A city's published POIs and helper places are few (thousands) and change
+rarely, so each worker keeps them in a grid of ~1 km cells keyed by
+(floor(lat / CELL_DEG), floor(lon / CELL_DEG)). A radius query reads only
+the cells overlapping the circle's bounding box and ranks the candidates by
+haversine distance, vectorised with NumPy when it is installed.
+
+The index is built lazily on first use and tagged with the city's
+content-version counters (poi, helper_places). Within
+SPATIAL_INDEX_CHECK_SECONDS it is served with no database round trip; after
+that one primary-key lookup confirms the version, and a changed version
+triggers a rebuild (two queries; the async path builds in a worker thread
+so the event loop keeps serving). Cities with more than
+SPATIAL_INDEX_MAX_POINTS points are not indexed (callers fall back to
+PostGIS). A city with no points (or an unknown slug) gets an empty index
+that is not kept, so it cannot evict a real city from the LRU.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from .caching import (
+    _async_flight, _leave_async_flight, _leave_thread_flight, _thread_flight, content_versions, content_versions_async,
+)
+from .clusters import ClusterTree
+from .config import config
+from .models import HelperPlace, Poi
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency: pure-Python distances
+    np = None
+
+CELL_DEG = 0.01
+_FLIGHT_PREFIX = "spatial_index:"
+EARTH_RADIUS_M = 6371008.8
+_M_PER_DEG_LAT = 111320.0
+
+
+def _cell(lat: float, lon: float) -> tuple[int, int]:
+    return math.floor(lat / CELL_DEG), math.floor(lon / CELL_DEG)
+
+
+class CityIndex:
+    """Points of one city: dicts with kind ("poi"/"helper"), id, title, lat, lon (helpers also their list payload)."""
+
+    def __init__(self, version: str, points: list[dict]):
+        self.version = version
+        self.points = points
+        self.checked_at = time.monotonic()
+        self._clusters: Optional[ClusterTree] = None
+        self.cells: dict[tuple[int, int], list[int]] = {}
+        for i, p in enumerate(points):
+            self.cells.setdefault(_cell(p["lat"], p["lon"]), []).append(i)
+        if np is not None:
+            self._lat = np.radians(np.array([p["lat"] for p in points], dtype=float))
+            self._lon = np.radians(np.array([p["lon"] for p in points], dtype=float))
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def cluster_tree(self) -> ClusterTree:
+        """Map clusters of the same points, built on first use."""
+        if self._clusters is None:
+            self._clusters = ClusterTree(self.points)
+        return self._clusters
+
+    def _candidates(self, lat_min: float, lon_min: float, lat_max: float, lon_max: float) -> list[int]:
+        (r0, c0), (r1, c1) = _cell(lat_min, lon_min), _cell(lat_max, lon_max)
+        found = []
+        if (r1 - r0 + 1) * (c1 - c0 + 1) > len(self.cells):
+            # large box (world viewport, radius near a pole): walk the populated cells instead
+            for (r, c), idx in self.cells.items():
+                if r0 <= r <= r1 and c0 <= c <= c1:
+                    found.extend(idx)
+            return found
+        for r in range(r0, r1 + 1):
+            for c in range(c0, c1 + 1):
+                found.extend(self.cells.get((r, c), ()))
+        return found
+
+    def _distances(self, idx: list[int], lat: float, lon: float):
+        """Haversine distance in metres from (lat, lon) to points idx."""
+        lat1, lon1 = math.radians(lat), math.radians(lon)
+        if np is not None:
+            lat2, lon2 = self._lat[idx], self._lon[idx]
+            a = np.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+            return (2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))).tolist()
+        out = []
+        for i in idx:
+            lat2, lon2 = math.radians(self.points[i]["lat"]), math.radians(self.points[i]["lon"])
+            a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+            out.append(2 * EARTH_RADIUS_M * math.asin(math.sqrt(a)))
+        return out
+
+    def nearby(self, lat: float, lon: float, radius_m: float, limit: int, kinds) -> list[tuple[float, dict]]:
+        """(distance_m, point) within radius_m, nearest first."""
+        dlat = radius_m / _M_PER_DEG_LAT
+        # at most every longitude: lon - 180 .. lon + 180
+        dlon = min(radius_m / (_M_PER_DEG_LAT * max(math.cos(math.radians(lat)), 1e-6)), 180.0)
+        idx = [i for i in self._candidates(lat - dlat, lon - dlon, lat + dlat, lon + dlon)
+               if self.points[i]["kind"] in kinds]
+        if not idx:
+            return []
+        hits = [(d, self.points[i]) for d, i in zip(self._distances(idx, lat, lon), idx) if d <= radius_m]
+        hits.sort(key=lambda h: h[0])
+        return hits[:limit]
+
+    def within_bbox(self, lat_min: float, lon_min: float, lat_max: float, lon_max: float, kind: str) -> list[dict]:
+        return [
+            p for p in (self.points[i] for i in self._candidates(lat_min, lon_min, lat_max, lon_max))
+            if p["kind"] == kind and lat_min <= p["lat"] <= lat_max and lon_min <= p["lon"] <= lon_max
+        ]
+
+
+# city -> CityIndex, or None when the city is too large to index
+_indexes: "OrderedDict[str, Optional[CityIndex]]" = OrderedDict()
+_checked: dict[str, tuple[str, float]] = {}  # city -> (version, monotonic time) for unindexed cities
+
+
+def _poi_query(city: str):
+    return select(Poi.id, Poi.title_ru, Poi.lat, Poi.lon).where(
+        Poi.city_slug == city, Poi.published_at != None, Poi.lat != None, Poi.lon != None
+    )
+
+
+def _helper_query(city: str):
+    return select(HelperPlace).where(HelperPlace.city_slug == city, HelperPlace.lat != None, HelperPlace.lon != None)
+
+
+def _points(pois, helpers) -> list[dict]:
+    points = [{"kind": "poi", "id": p.id, "title": p.title_ru, "lat": p.lat, "lon": p.lon} for p in pois]
+    points += [
+        {"kind": "helper", "id": h.id, "title": h.name_ru or h.type, "lat": h.lat, "lon": h.lon,
+         "helper_type": h.type, "payload": {**h.model_dump(exclude={'geo'}), 'title': h.name_ru or ''}}
+        for h in helpers
+    ]
+    return points
+
+
+def _fresh(city: str) -> tuple[bool, Optional[CityIndex]]:
+    """(served without a check, index) while inside SPATIAL_INDEX_CHECK_SECONDS."""
+    index = _indexes.get(city)
+    now = time.monotonic()
+    if index is not None and now - index.checked_at < config.SPATIAL_INDEX_CHECK_SECONDS:
+        return True, index
+    checked = _checked.get(city)
+    if index is None and checked and now - checked[1] < config.SPATIAL_INDEX_CHECK_SECONDS:
+        return True, None
+    return False, index
+
+
+def _remember(city: str, version: str, index: Optional[CityIndex]) -> Optional[CityIndex]:
+    if index is not None and not len(index):
+        _indexes.pop(city, None)
+        _checked.pop(city, None)
+        return index
+    if index is None:
+        _indexes.pop(city, None)
+        _checked[city] = (version, time.monotonic())
+        return None
+    _checked.pop(city, None)
+    _indexes[city] = index
+    _indexes.move_to_end(city)
+    while len(_indexes) > config.SPATIAL_INDEX_MAX_CITIES:
+        _indexes.popitem(last=False)
+    return index
+
+
+def _build(version: str, pois, helpers) -> Optional[CityIndex]:
+    if len(pois) + len(helpers) > config.SPATIAL_INDEX_MAX_POINTS:
+        return None
+    return CityIndex(version, _points(pois, helpers))
+
+
+def _reuse(city: str, index: Optional[CityIndex], version: str):
+    """(done, index) when the stored state is still valid for `version`."""
+    if index is not None and index.version == version:
+        index.checked_at = time.monotonic()
+        return True, index
+    checked = _checked.get(city)
+    if index is None and checked and checked[0] == version:
+        _checked[city] = (version, time.monotonic())
+        return True, None
+    return False, None
+
+
+def get_city_index(session: Session, city: str) -> Optional[CityIndex]:
+    """The city's index, built or refreshed as needed; None = use PostGIS."""
+    if not config.SPATIAL_INDEX_ENABLED:
+        return None
+    fresh, index = _fresh(city)
+    if fresh:
+        return index
+    # per-city build lock, dropped when no request waits on it (any slug can be asked for)
+    flight_key = _FLIGHT_PREFIX + city
+    flight = _thread_flight(flight_key)
+    try:
+        with flight[0]:
+            return _load(session, city)
+    finally:
+        _leave_thread_flight(flight_key, flight)
+
+
+def _load(session: Session, city: str) -> Optional[CityIndex]:
+    fresh, index = _fresh(city)
+    if fresh:
+        return index
+    version = content_versions(session, city, Poi, HelperPlace)
+    done, kept = _reuse(city, index, version)
+    if done:
+        return kept
+    pois = session.exec(_poi_query(city)).all()
+    helpers = session.exec(_helper_query(city)).all()
+    return _remember(city, version, _build(version, pois, helpers))
+
+
+async def get_city_index_async(session: AsyncSession, city: str) -> Optional[CityIndex]:
+    """Async variant of get_city_index."""
+    if not config.SPATIAL_INDEX_ENABLED:
+        return None
+    fresh, index = _fresh(city)
+    if fresh:
+        return index
+    flight_key = _FLIGHT_PREFIX + city
+    flight = _async_flight(flight_key)
+    try:
+        async with flight[0]:
+            return await _load_async(session, city)
+    finally:
+        _leave_async_flight(flight_key, flight)
+
+
+async def _load_async(session: AsyncSession, city: str) -> Optional[CityIndex]:
+    fresh, index = _fresh(city)
+    if fresh:
+        return index
+    version = await content_versions_async(session, city, Poi, HelperPlace)
+    done, kept = _reuse(city, index, version)
+    if done:
+        return kept
+    pois = (await session.exec(_poi_query(city))).all()
+    helpers = (await session.exec(_helper_query(city))).all()
+    return _remember(city, version, await asyncio.to_thread(_build, version, pois, helpers))
+
+
+def reset_spatial_indexes() -> None:
+    """Drop every city index (tests, ops)."""
+    _indexes.clear()
+    _checked.clear()
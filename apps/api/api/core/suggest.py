@@ -0,0 +1,194 @@
+"""
+In-process autocomplete over published POI and tour titles per city
+(/public/cities/{slug}/suggest).
+
+Titles are normalised to one Latin form: case folded, ё folded to е,
+Cyrillic transliterated, Latin accents stripped, punctuation dropped
+("Дом-музей Канта" -> "dom muzei kanta"). "кант", "Kant" and "kant" all
+reach the same keys.
+
+The index is two sorted arrays of (key, entry) pairs with one key per
+word start of every title (title_ru and title_en), each holding the rest
+of the title from that word on: keys from the first word (whole-title
+prefixes, ranked first) and keys from later words (infix matches at a word
+boundary: "собор" finds "Кафедральный собор"). The query, words joined, is
+a bisect range in each, read in order until `limit` entries: the cost does
+not depend on how many titles match. Only when the words are typed out of
+title order ("канта дом") is the most selective word's range scanned,
+at most MAX_SCAN keys, checking the other words.
+
+Like the spatial index (core/spatial_index.py) it is built lazily, tagged
+with the city's content-version counters (poi, tour) and served with no
+database round trip within SUGGEST_INDEX_CHECK_SECONDS; a changed version
+triggers a rebuild (two queries). An empty index (unknown slug) is not
+kept, so it cannot evict a real city from the LRU.
+"""
+import re
+import time
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import Optional
+
+from sqlmodel import Session, select
+
+from .caching import _leave_thread_flight, _thread_flight, content_versions
+from .config import config
+from .models import Poi, Tour
+
+MAX_QUERY_WORDS = 5
+KEY_CHARS = 48  # keys are cut here; longer queries are checked against the words
+MAX_SCAN = 300  # keys checked for a multi-word query typed out of title order
+_FLIGHT_PREFIX = "suggest:"
+
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+})
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def normalize_words(text: Optional[str]) -> list[str]:
+    """Folded, transliterated words of `text`."""
+    if not text:
+        return []
+    # after transliteration: NFKD would split й and ё first
+    latin = unicodedata.normalize("NFKD", text.casefold().translate(_TRANSLIT))
+    return _WORD.findall("".join(c for c in latin if not unicodedata.combining(c)))
+
+
+class SuggestIndex:
+    """Titles of one city: entries are dicts with type ("poi"/"tour"), id, title_ru, title_en."""
+
+    def __init__(self, version: str, entries: list[dict]):
+        self.version = version
+        self.entries = entries
+        self.checked_at = time.monotonic()
+        self._words: list[list[str]] = []
+        starts, inner = [], []
+        for i, entry in enumerate(entries):
+            words = []
+            for title in (entry["title_ru"], entry.get("title_en")):
+                title_words = normalize_words(title)
+                joined = " ".join(title_words)
+                offset = 0
+                for n, w in enumerate(title_words):
+                    (inner if n else starts).append((joined[offset:offset + KEY_CHARS], i))
+                    offset += len(w) + 1
+                words += title_words
+            self._words.append(words)
+        # (keys, refs) pairs: whole-title keys, then keys from later words
+        self._arrays = []
+        for pairs in (starts, inner):
+            pairs.sort()
+            self._arrays.append(([k for k, _ in pairs], [i for _, i in pairs]))
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _ranges(self, prefix: str):
+        """(refs, lo, hi) of the keys starting with `prefix`, whole-title keys first."""
+        for keys, refs in self._arrays:
+            lo = bisect_left(keys, prefix)
+            yield refs, lo, bisect_left(keys, prefix + "\uffff", lo)
+
+    def suggest(self, query: str, limit: int) -> list[dict]:
+        words = normalize_words(query)[:MAX_QUERY_WORDS]
+        if not words:
+            return []
+        found: dict[int, None] = {}  # insertion-ordered set
+
+        # Words typed in title order: the query is a key prefix, ranked by array order
+        phrase = " ".join(words)
+        for refs, lo, hi in self._ranges(phrase[:KEY_CHARS]):
+            for pos in range(lo, hi):
+                i = refs[pos]
+                if len(phrase) > KEY_CHARS and phrase not in " ".join(self._words[i]):
+                    continue
+                found[i] = None
+                if len(found) >= limit:
+                    return [self.entries[i] for i in found]
+
+        # Any order: scan the most selective word's range, check the other words
+        if len(words) > 1:
+            lead = max(words, key=len)
+            rest = list(words)
+            rest.remove(lead)
+            budget = MAX_SCAN
+            for refs, lo, hi in self._ranges(lead[:KEY_CHARS]):
+                for pos in range(lo, min(hi, lo + budget)):
+                    i = refs[pos]
+                    title_words = self._words[i]
+                    if i not in found and all(any(w.startswith(q) for w in title_words) for q in rest):
+                        found[i] = None
+                        if len(found) >= limit:
+                            break
+                budget -= min(hi - lo, budget)
+                if len(found) >= limit or budget <= 0:
+                    break
+        return [self.entries[i] for i in found]
+
+
+# city -> SuggestIndex, least recently used first
+_indexes: "OrderedDict[str, SuggestIndex]" = OrderedDict()
+
+
+def _title_query(model, city: str):
+    return select(model.id, model.title_ru, model.title_en).where(
+        model.city_slug == city, model.published_at != None, model.is_deleted == False
+    )
+
+
+def _entries(pois, tours) -> list[dict]:
+    return [
+        {"type": kind, "id": row.id, "title_ru": row.title_ru, "title_en": row.title_en}
+        for kind, rows in (("poi", pois), ("tour", tours))
+        for row in rows
+    ]
+
+
+def _remember(city: str, index: SuggestIndex) -> SuggestIndex:
+    if not len(index):
+        _indexes.pop(city, None)
+        return index
+    _indexes[city] = index
+    _indexes.move_to_end(city)
+    while len(_indexes) > config.SUGGEST_INDEX_MAX_CITIES:
+        _indexes.popitem(last=False)
+    return index
+
+
+def get_suggest_index(session: Session, city: str) -> SuggestIndex:
+    """The city's title index, built or refreshed as needed."""
+    index = _indexes.get(city)
+    if index is not None and time.monotonic() - index.checked_at < config.SUGGEST_INDEX_CHECK_SECONDS:
+        return index
+    # per-city build lock, dropped when no request waits on it (any slug can be asked for)
+    flight_key = _FLIGHT_PREFIX + city
+    flight = _thread_flight(flight_key)
+    try:
+        with flight[0]:
+            return _load(session, city)
+    finally:
+        _leave_thread_flight(flight_key, flight)
+
+
+def _load(session: Session, city: str) -> SuggestIndex:
+    index = _indexes.get(city)
+    if index is not None and time.monotonic() - index.checked_at < config.SUGGEST_INDEX_CHECK_SECONDS:
+        return index
+    version = content_versions(session, city, Poi, Tour)
+    if index is not None and index.version == version:
+        index.checked_at = time.monotonic()
+        return index
+    pois = session.exec(_title_query(Poi, city)).all()
+    tours = session.exec(_title_query(Tour, city)).all()
+    return _remember(city, SuggestIndex(version, _entries(pois, tours)))
+
+
+def reset_suggest_indexes() -> None:
+    """Drop every city index (tests, ops)."""
+    _indexes.clear()
@@ -10,6 +10,8 @@ from .preview.service import generate_preview_content
 from ..offline.worker import process_offline_bundle # PR-33b
 import asyncio
 from .config import config
+from .db_routing import mark_recent_write
+from .access_cache import invalidate_access_async
 from qstash import QStash
 import uuid # Added for _process_narration
 # from ..billing.service import grant_entitlement 
@@ -249,6 +251,8 @@ async def _process_deletion(session: Session, job: Job):
         session.add(audit)
         
         session.commit()
+        mark_recent_write(subject_id)
+        await invalidate_access_async(subject_id)
         job.status = "COMPLETED"
         job.result = "Deleted"
         
@@ -1,19 +1,19 @@
 from typing import List, Optional
+import asyncio
 import hashlib
-from fastapi import APIRouter, Depends, Response, Query, Request
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Path, Response, Query, Request
+from sqlmodel import Session, select, text
+from sqlmodel.ext.asyncio.session import AsyncSession
 from pydantic import BaseModel
 
-from .core.database import engine
-from .core.models import HelperPlace
-from .core.caching import check_etag_versioned, generate_version_marker
+from .core.db_routing import get_read_session, get_async_read_session
+from .core.models import HelperPlace, Poi
+from .core.caching import check_etag_versioned, generate_version_marker, content_versions_async
+from .core.config import config
+from .core.precompressed import blob_response, compress_blobs, get_blobs_async, store_blobs_async
 
 router = APIRouter()
 
-def get_session():
-    with Session(engine) as session:
-        yield session
-
 class AttributionResponse(BaseModel):
     attribution_text: str
     attribution_url: Optional[str] = None
@@ -24,7 +24,7 @@ def get_map_attribution(
     request: Request,
     response: Response, 
     city: str = Query(..., description="Tenant slug"), 
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     # Attribution Logic for OSM ODbL compliance
     data = {
@@ -46,18 +46,83 @@ def get_helpers(
     response: Response,
     city: str = Query(..., description="Tenant slug"),
     category: Optional[str] = Query(None, description="Filter by category (toilet, water, cafe)"),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
+    # Version first: a revalidation (304) costs no row fetch
+    etag = generate_version_marker(session, HelperPlace, city)
+    check_etag_versioned(request, response, etag, is_public=True)
+
     query = select(HelperPlace).where(HelperPlace.city_slug == city)
     
     if category:
         query = query.where(HelperPlace.type == category)
         
     helpers = session.exec(query).all()
-    data = [helper.model_dump() for helper in helpers]
-    
-    # Generate ETag from data
-    etag = generate_version_marker(session, HelperPlace, city)
-    check_etag_versioned(request, response, etag, is_public=True)
-    
-    return data
+    return [helper.model_dump(exclude={'geo'}) for helper in helpers]
+
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+# Below this zoom a tile spans a whole region: use /public/cities/{slug}/clusters
+TILE_MIN_ZOOM = 8
+TILE_MAX_ZOOM = 22
+_WEB_MERCATOR_SIZE = 2 * 20037508.342789244
+
+# Both layers in one statement. `geo && area` is served by the GiST index on
+# geo; area is the tile envelope plus the render buffer, so symbols near an
+# edge are drawn by both neighbouring tiles.
+TILE_SQL = f"""
+    WITH bounds AS (
+        SELECT ST_TileEnvelope(:z, :x, :y) AS env,
+               ST_Transform(ST_Expand(ST_TileEnvelope(:z, :x, :y), :margin), 4326)::geography AS area
+    ),
+    pois AS (
+        SELECT ST_AsMVTGeom(ST_Transform(p.geo::geometry, 3857), b.env, {TILE_EXTENT}, {TILE_BUFFER}, true) AS geom,
+               p.id::text AS id, p.title_ru AS title
+        FROM poi p, bounds b
+        WHERE p.city_slug = :city AND p.published_at IS NOT NULL AND p.geo && b.area
+    ),
+    helpers AS (
+        SELECT ST_AsMVTGeom(ST_Transform(h.geo::geometry, 3857), b.env, {TILE_EXTENT}, {TILE_BUFFER}, true) AS geom,
+               h.id::text AS id, h.type AS helper_type, COALESCE(h.name_ru, h.type) AS title
+        FROM helper_places h, bounds b
+        WHERE h.city_slug = :city AND h.geo && b.area
+    )
+    SELECT COALESCE((SELECT ST_AsMVT(pois, 'pois', {TILE_EXTENT}, 'geom') FROM pois), ''::bytea)
+        || COALESCE((SELECT ST_AsMVT(helpers, 'helpers', {TILE_EXTENT}, 'geom') FROM helpers), ''::bytea)
+"""
+
+
+@router.get("/public/tiles/{z}/{x}/{y}.mvt", response_class=Response)
+async def get_tile(
+    request: Request,
+    response: Response,
+    z: int = Path(..., ge=TILE_MIN_ZOOM, le=TILE_MAX_ZOOM),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    city: str = Query(..., description="Tenant slug"),
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    """
+    Vector tile (layers `pois`, `helpers`) of one city. Tiles are stored
+    precompressed per (city, content version, tile) and carry an ETag of the
+    same key, so a publish changes every tile's ETag and nothing else needs
+    invalidating. The ETag is weak: the br, gzip and identity bodies differ
+    byte for byte (Vary: Accept-Encoding).
+    """
+    if x >= 1 << z or y >= 1 << z:
+        raise HTTPException(status_code=404, detail="Tile out of range")
+
+    versions = await content_versions_async(session, city, Poi, HelperPlace)
+    key = f"tile:{city}:{versions}:{z}/{x}/{y}"
+    check_etag_versioned(request, response, f'W/"{hashlib.md5(key.encode()).hexdigest()}"', is_public=True)
+
+    blobs = await get_blobs_async(key)
+    if blobs is None:
+        margin = _WEB_MERCATOR_SIZE / (1 << z) * TILE_BUFFER / TILE_EXTENT
+        params = {"z": z, "x": x, "y": y, "city": city, "margin": margin}
+        tile = (await session.execute(text(TILE_SQL), params)).scalar()
+        blobs = await asyncio.to_thread(compress_blobs, bytes(tile or b""))
+        await store_blobs_async(key, blobs, config.PUBLIC_BLOB_TTL_SECONDS)
+    return blob_response(request, response, blobs, media_type=MVT_MEDIA_TYPE)
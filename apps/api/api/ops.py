@@ -115,7 +115,36 @@ def health_check():
         status = "fail"
         error = f"Config Error: {str(e)}"
 
-    return {"status": status, "checks": checks, "error": error}
+    # Connection pool stats (no DB round trip, safe for liveness)
+    db_pool = None
+    db_pool_async = None
+    db_pool_replica = None
+    try:
+        from .core.database import get_pool_status, async_engine, engine, replica_engine
+        db_pool = get_pool_status()
+        if async_engine is not None:
+            db_pool_async = get_pool_status(async_engine.sync_engine)
+        if replica_engine is not engine:
+            db_pool_replica = get_pool_status(replica_engine)
+        checks.append("db_pool")
+    except Exception as e:
+        logger.warning(f"Pool status unavailable: {e}")
+
+    return {"status": status, "checks": checks, "error": error, "db_pool": db_pool, "db_pool_async": db_pool_async, "db_pool_replica": db_pool_replica}
+
+@router.get("/ops/metrics")
+def metrics(authorization: str = Header(None)):
+    """
+    Per-route SQL histograms (queries and DB time per request), Prometheus text format.
+    Values are per worker process. Protected by METRICS_TOKEN (Authorization: Bearer).
+    """
+    import hmac
+    from .core.config import config
+    from .core.query_metrics import render_prometheus
+    expected = f"Bearer {config.METRICS_TOKEN}" if config.METRICS_TOKEN else None
+    if not expected or not hmac.compare_digest((authorization or "").encode(), expected.encode()):
+        raise HTTPException(401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"})
+    return Response(content=render_prometheus(), media_type="text/plain; version=0.0.4")
 
 @router.get("/ops/check-ratings-import")
 def check_ratings_import(request: Request):
@@ -240,6 +269,7 @@ def init_free_tour(tour_id: str, session: Session = Depends(get_session)):
     Create free entitlement for a tour (no auth required for bootstrap).
     """
     from .core.models import Entitlement
+    from .core.access_cache import invalidate_free_tours
     slug = f"tour_{tour_id}_free"
     existing = session.exec(select(Entitlement).where(Entitlement.slug == slug)).first()
     if existing:
@@ -257,6 +287,7 @@ def init_free_tour(tour_id: str, session: Session = Depends(get_session)):
     session.add(ent)
     session.commit()
     session.refresh(ent)
+    invalidate_free_tours()
     return {"status": "created", "slug": slug, "entitlement_id": str(ent.id)}
 
 @router.post("/ops/migrate")
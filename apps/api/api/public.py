@@ -1,20 +1,38 @@
 import uuid
 import hashlib
 import secrets
+import json
 from datetime import datetime, timedelta
 from typing import List, Optional
 from fastapi import APIRouter, Depends, Response, Query, HTTPException, Request, BackgroundTasks
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session, select, text, func, SQLModel
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import selectinload, joinedload
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
 from .core.database import engine
+from .core.db_routing import get_read_session, get_async_read_session, mark_recent_write
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from .core.models import City, Tour, Poi, HelperPlace, Entitlement, EntitlementGrant, ContentEvent, TourItem, Itinerary, ItineraryItem, TourRating
-from .core.caching import redis_client
-from .core.security import sign_asset_url
-from .core.caching import SCHEMA_VERSION, generate_version_marker, check_etag_versioned
+from .core.models import City, Tour, Poi, HelperPlace, Entitlement, EntitlementGrant, ContentEvent, TourItem, Itinerary, ItineraryItem, TourRating, TourRatingSummary
+from .core.models import Narration, PoiMedia, TourMedia
+from .core.caching import redis_client, async_redis_client
+from .core.security import AssetUrlSigner, SIGNATURE_BUCKET_SECONDS, signature_bucket
+from .core.rating_summary import apply_rating_change, update_rating
+from .core.access_cache import get_cached_access, set_cached_access, get_free_tour_ids
+from .core.caching import SCHEMA_VERSION, generate_version_marker, generate_version_marker_async, check_etag_versioned
+from .core.caching import cached_response, cached_response_async, content_versions, content_versions_async
+from .core.precompressed import precompressed_response, precompressed_response_async
+from .core.serialization import fast_json, iter_json_object
+from .core.pagination import keyset_page, count_cached, decode_cursor, encode_cursor, seek_past
+from .core.spatial_index import get_city_index, get_city_index_async
+from .core.search import fulltext_match, fulltext_rank, prefix_query
+from .core.suggest import get_suggest_index
+from .core.clusters import CELLS_PER_TILE, CLUSTER_MAX_ZOOM, _MAX_LAT, add_to_cell, cell_feature
+from .core.config import config
+from .public_schemas import CatalogTour, PoiDetail, TourManifest
 
 router = APIRouter()
 limiter = Limiter(key_func=get_remote_address)
@@ -23,52 +41,35 @@ def get_session():
     with Session(engine) as session:
         yield session
 
-def check_access(session: Session, city: str, device_anon_id: Optional[str], tour_id: Optional[uuid.UUID] = None) -> bool:
+async def check_access(session: AsyncSession, city: str, device_anon_id: Optional[str], tour_id: Optional[uuid.UUID] = None) -> bool:
     """
     Checks if a device has an active entitlement for a city or a specific tour.
     Admin bypass is handled at middleware or auth level if needed, 
     but for public manifest endpoints we check device_anon_id.
     """
-    # 0. Check if tour has a FREE entitlement (price_amount = 0)
-    if tour_id:
-        free_entitlement = session.exec(
-            select(Entitlement).where(
-                Entitlement.scope == "tour",
-                Entitlement.ref == str(tour_id),
-                Entitlement.price_amount == 0,
-                Entitlement.is_active == True
-            )
-        ).first()
-        if free_entitlement:
-            return True
+    # 0. Free tours (active entitlement with price_amount = 0): precomputed id set
+    if tour_id and str(tour_id) in await get_free_tour_ids(session):
+        return True
     
     if not device_anon_id:
         return False
+
+    cached, generation = await get_cached_access(device_anon_id, city, tour_id)
+    if cached is not None:
+        return cached
         
-    # 1. Check City-wide access
-    query = select(EntitlementGrant).where(
+    # 1. City-wide access, or 2. the specific tour if tour_id is provided
+    scope_filter = and_(Entitlement.scope == "city", Entitlement.ref == city)
+    if tour_id:
+        scope_filter = or_(scope_filter, and_(Entitlement.scope == "tour", Entitlement.ref == str(tour_id)))
+    query = select(EntitlementGrant.id).where(
         EntitlementGrant.device_anon_id == device_anon_id,
         EntitlementGrant.revoked_at == None
-    ).join(Entitlement).where(
-        Entitlement.scope == "city",
-        Entitlement.ref == city
-    )
-    if session.exec(query).first():
-        return True
-        
-    # 2. Check Specific Tour access if tour_id is provided
-    if tour_id:
-        query = select(EntitlementGrant).where(
-            EntitlementGrant.device_anon_id == device_anon_id,
-            EntitlementGrant.revoked_at == None
-        ).join(Entitlement).where(
-            Entitlement.scope == "tour",
-            Entitlement.ref == str(tour_id)
-        )
-        if session.exec(query).first():
-            return True
-            
-    return False
+    ).join(Entitlement).where(scope_filter).limit(1)
+    allowed = (await session.exec(query)).first() is not None
+
+    await set_cached_access(device_anon_id, city, tour_id, allowed, generation)
+    return allowed
 
 def log_analytics_bg(event_data: dict):
     with Session(engine) as session:
@@ -79,28 +80,26 @@ def log_analytics_bg(event_data: dict):
         except Exception as e:
             print(f"Failed to log event: {e}")
 
-@router.get("/public/tours/{tour_id}/manifest")
+@router.get("/public/tours/{tour_id}/manifest", responses={200: {"model": TourManifest}})
 @limiter.limit("20/minute") # Heavy bundle data
-def get_tour_manifest(
+async def get_tour_manifest(
     response: Response, request: Request, tour_id: uuid.UUID, 
     background_tasks: BackgroundTasks, # Injected
     city: str = Query(...), 
-    device_anon_id: str = Query(...), session: Session = Depends(get_session)
+    device_anon_id: str = Query(...),
+    signing: str = Query("url", pattern="^(url|prefix)$", description="prefix: one token per asset directory (asset_tokens) instead of per-URL signatures"),
+    session: AsyncSession = Depends(get_async_read_session)
 ):
     """Gated Manifest: private, no-store."""
-    if not check_access(session, city, device_anon_id, tour_id):
+    if not await check_access(session, city, device_anon_id, tour_id):
         raise HTTPException(status_code=403, detail="Payment Required", headers={"Cache-Control": "private, no-store"})
     
-    # Optimized loading
-    query = select(Tour).where(Tour.id == tour_id).options(
-        selectinload(Tour.media),
-        selectinload(Tour.items).joinedload(TourItem.poi).options(
-            selectinload(Poi.narrations),
-            selectinload(Poi.media)
-        )
+    # Unsigned skeleton, cached per tour/POI content version of the city
+    versions = await content_versions_async(session, city, Tour, Poi)
+    skeleton = await cached_response_async(
+        f"manifest:{tour_id}:{versions}", lambda: _load_manifest_skeleton(session, tour_id), fresh_ttl=300
     )
-    tour = session.exec(query).first()
-    if not tour or tour.city_slug != city or not tour.published_at:
+    if skeleton["tour"]["city_slug"] != city or not skeleton["tour"]["published_at"]:
         raise HTTPException(status_code=404, detail="Tour not found", headers={"Cache-Control": "private, no-store"})
     
     # Analytics: TOUR_STARTED (Background)
@@ -113,11 +112,26 @@ def get_tour_manifest(
 
     # Manifest is heavy, use no-store to avoid stale local cache of sensitive URLs
     response.headers["Cache-Control"] = "private, no-store"
+    return fast_json(_sign_manifest(skeleton, AssetUrlSigner(prefix_scoped=signing == "prefix")), response)
+
+async def _load_manifest_skeleton(session: AsyncSession, tour_id: uuid.UUID) -> dict:
+    """Manifest with unsigned URLs: everything except the per-request signing pass."""
+    # Optimized loading
+    query = select(Tour).where(Tour.id == tour_id).options(
+        selectinload(Tour.media),
+        selectinload(Tour.items).joinedload(TourItem.poi).options(
+            selectinload(Poi.narrations),
+            selectinload(Poi.media)
+        )
+    )
+    tour = (await session.exec(query)).first()
+    if not tour:
+        raise HTTPException(status_code=404, detail="Tour not found", headers={"Cache-Control": "private, no-store"})
     
     data = tour.model_dump(include={'id', 'city_slug', 'title_ru', 'description_ru', 'duration_minutes', 'published_at'})
     pois_data = []
     assets = []
-    for m in tour.media: assets.append({"url": sign_asset_url(m.url), "type": m.media_type, "owner_id": str(tour.id)})
+    for m in tour.media: assets.append({"url": m.url, "type": m.media_type, "owner_id": str(tour.id)})
     for item in sorted(tour.items, key=lambda i: i.order_index):
         if item.poi:
             p = item.poi.model_dump(include={
@@ -137,8 +151,8 @@ def get_tour_manifest(
             narrations_data = [
                 {
                     "id": str(n.id),
-                    "url": sign_asset_url(n.url),
-                    "kids_url": sign_asset_url(n.kids_url) if n.kids_url else None,
+                    "url": n.url,
+                    "kids_url": n.kids_url,
                     "locale": n.locale,
                     "duration_seconds": n.duration_seconds,
                     "transcript": n.transcript
@@ -148,7 +162,7 @@ def get_tour_manifest(
             media_data = [
                 {
                     "id": str(m.id),
-                    "url": sign_asset_url(m.url),
+                    "url": m.url,
                     "type": m.media_type
                 }
                 for m in item.poi.media
@@ -168,36 +182,48 @@ def get_tour_manifest(
             })
             # Also add to assets for backward compatibility
             for n in item.poi.narrations:
-                assets.append({"url": sign_asset_url(n.url), "type": "audio", "owner_id": str(item.poi.id), "locale": n.locale, "duration": n.duration_seconds})
+                assets.append({"url": n.url, "type": "audio", "owner_id": str(item.poi.id), "locale": n.locale, "duration": n.duration_seconds})
             for m in item.poi.media:
-                assets.append({"url": sign_asset_url(m.url), "type": m.media_type, "owner_id": str(item.poi.id)})
+                assets.append({"url": m.url, "type": m.media_type, "owner_id": str(item.poi.id)})
     return {"tour": data, "pois": pois_data, "assets": assets}
 
+def _sign_manifest(skeleton: dict, sign: AssetUrlSigner) -> dict:
+    """Per-request pass: copy the cached skeleton with signed asset URLs (never mutate it)."""
+    pois = []
+    for p in skeleton["pois"]:
+        pois.append({
+            **p,
+            "narrations": [
+                {**n, "url": sign(n["url"]), "kids_url": sign(n["kids_url"]) if n["kids_url"] else None}
+                for n in p["narrations"]
+            ],
+            "media": [{**m, "url": sign(m["url"])} for m in p["media"]],
+        })
+    assets = [{**a, "url": sign(a["url"])} for a in skeleton["assets"]]
+    return _with_asset_tokens({"tour": skeleton["tour"], "pois": pois, "assets": assets}, sign)
+
+def _with_asset_tokens(data: dict, sign: AssetUrlSigner) -> dict:
+    """Prefix signing mode: unsigned URLs are covered by data["asset_tokens"]."""
+    if sign.prefix_scoped:
+        data["asset_tokens"] = sign.tokens()
+    return data
+
 # ...
 
-@router.get("/public/poi/{poi_id}")
+@router.get("/public/poi/{poi_id}", responses={200: {"model": PoiDetail}})
 @limiter.limit("100/minute")
-def get_poi_detail(response: Response, request: Request, poi_id: uuid.UUID, 
+async def get_poi_detail(response: Response, request: Request, poi_id: uuid.UUID, 
                    background_tasks: BackgroundTasks,
-                   city: str = Query(...), device_anon_id: Optional[str] = Query(None), session: Session = Depends(get_session)):
-    # Try Cache
-    poi_data_raw = None
-    cache_key = f"poi:{poi_id}:raw"
-    if redis_client:
-        try:
-            cached = redis_client.get(cache_key)
-            if cached: poi_data_raw = json.loads(cached)
-        except Exception: pass
-    
-    if not poi_data_raw:
+                   city: str = Query(...), device_anon_id: Optional[str] = Query(None), session: AsyncSession = Depends(get_async_read_session)):
+    async def load():
         # Optimized Query
         query = select(Poi).where(Poi.id == poi_id).options(
             selectinload(Poi.sources),
             selectinload(Poi.media),
             selectinload(Poi.narrations)
         )
-        poi = session.exec(query).first()
-        if not poi or poi.city_slug != city or not poi.published_at: raise HTTPException(status_code=404, detail="Not Found")
+        poi = (await session.exec(query)).first()
+        if not poi or not poi.published_at: raise HTTPException(status_code=404, detail="Not Found")
         
         # Serialize
         poi_data_raw = poi.model_dump(exclude={'geo'})
@@ -205,11 +231,13 @@ def get_poi_detail(response: Response, request: Request, poi_id: uuid.UUID,
         poi_data_raw["media"] = [m.model_dump() for m in poi.media]
         poi_data_raw["narrations_raw"] = [n.model_dump() for n in poi.narrations]
         poi_data_raw["updated_at_iso"] = poi.updated_at.isoformat() if poi.updated_at else ""
-        
-        if redis_client:
-            redis_client.setex(cache_key, 300, json.dumps(poi_data_raw))
+        return poi_data_raw
+
+    poi_data_raw = await cached_response_async(f"poi:{poi_id}:raw", load, fresh_ttl=300)
+    if poi_data_raw.get("city_slug") != city:
+        raise HTTPException(status_code=404, detail="Not Found")
     
-    has_access = check_access(session, city, device_anon_id)
+    has_access = await check_access(session, city, device_anon_id)
     # Individual POI might change, but updated_at is the master marker
     etag = f"{SCHEMA_VERSION}|{poi_id}|{poi_data_raw.get('updated_at_iso')}|{has_access}"
     check_etag_versioned(request, response, f'W/"{hashlib.md5(etag.encode()).hexdigest()}"', is_public=not has_access)
@@ -240,129 +268,341 @@ def get_poi_detail(response: Response, request: Request, poi_id: uuid.UUID,
         if not has_access:
             data["narrations"] = [] 
         else:
+            sign = AssetUrlSigner()
             data["narrations"] = [
                 {
                     "id": str(n["id"]), 
-                    "url": sign_asset_url(n["url"]), 
-                    "kids_url": sign_asset_url(n["kids_url"]) if n.get("kids_url") else None,
+                    "url": sign(n["url"]), 
+                    "kids_url": sign(n["kids_url"]) if n.get("kids_url") else None,
                     "locale": n["locale"], 
                     "duration_seconds": n["duration_seconds"],
                     "transcript": n.get("transcript")
                 } for n in raw_narrations
             ]
-    return data
+    return fast_json(data, response)
 
 
 
+NEARBY_TYPES = ("poi", "helper")
+_NEARBY_POINT = "ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography"
+# Each branch is served by its GiST index twice over: ST_DWithin is the
+# indexable radius filter, ORDER BY geo <-> point a KNN index scan that stops
+# after :limit rows. The point must stay an inline expression (not a join
+# column) for the planner to use the index for ordering.
+_NEARBY_BRANCHES = {
+    "poi": f"""
+        (SELECT id, 'poi' AS kind, NULL AS helper_type, title_ru AS title, lat, lon, geo
+         FROM poi
+         WHERE city_slug = :city AND published_at IS NOT NULL
+           AND ST_DWithin(geo, {_NEARBY_POINT}, :radius)
+         ORDER BY geo <-> {_NEARBY_POINT}
+         LIMIT :limit)""",
+    "helper": f"""
+        (SELECT id, 'helper' AS kind, type AS helper_type, COALESCE(name_ru, type) AS title, lat, lon, geo
+         FROM helper_places
+         WHERE city_slug = :city
+           AND ST_DWithin(geo, {_NEARBY_POINT}, :radius)
+         ORDER BY geo <-> {_NEARBY_POINT}
+         LIMIT :limit)""",
+}
+
+def nearby_sql(types) -> str:
+    """One statement for the requested types; exact distance only for the returned rows."""
+    branches = " UNION ALL ".join(_NEARBY_BRANCHES[t] for t in NEARBY_TYPES if t in types)
+    return f"""
+        SELECT id, kind, helper_type, title, lat, lon, ST_Distance(geo, {_NEARBY_POINT}) AS dist
+        FROM ({branches}) AS nearby
+        ORDER BY dist
+        LIMIT :limit
+    """
+
+def parse_map_types(types: str) -> set:
+    requested = {t.strip() for t in types.split(",") if t.strip()}
+    if not requested or not requested <= set(NEARBY_TYPES):
+        raise HTTPException(status_code=422, detail=f"types must be a subset of {', '.join(NEARBY_TYPES)}")
+    return requested
+
 @router.get("/public/nearby")
 @limiter.limit("50/minute") # Geo-postgis is somewhat expensive
-def get_nearby(response: Response, request: Request, city: str = Query(...), lat: float = Query(...), lon: float = Query(...), radius_m: int = Query(1000, le=5000), session: Session = Depends(get_session)):
-    # KNN Optimization: Use <-> operator for nearest neighbor search, then filter by radius.
-    # This is much faster than checking ST_DWithin on entire table first if index exists.
-    # Logic: Get nearest 50 points, then verify they are within radius.
-    # Actually, standard pattern: ORDER BY geo <-> point LIMIT N.
-    # But we also have `city_slug` constraint and `radius` constraint.
-    # Index on (city_slug, geo) allows efficient filtering.
-    
-    # Using parameterized query for safety
-    poi_sql = text("""
-        SELECT 
-            id, 'poi' as type, title_ru, lat, lon, 
-            ST_Distance(geo, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography) as dist 
-        FROM poi 
-        WHERE 
-            city_slug = :city 
-            AND published_at IS NOT NULL 
-            -- AND ST_DWithin(geo, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography, :radius)
-        ORDER BY 
-            geo <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326) 
-        LIMIT 50
-    """)
-    
-    results = []
-    for row in session.exec(poi_sql, params={"city": city, "lat": lat, "lon": lon, "radius": radius_m}).all():
-        results.append({"id": row[0], "type": "poi", "title": row[2], "lat": row[3], "lon": row[4], "distance_m": int(row[5])})
-    
-    # Results are already sorted by Distance due to KNN operator
+async def get_nearby(
+    response: Response, request: Request,
+    city: str = Query(...), lat: float = Query(..., ge=-90, le=90), lon: float = Query(..., ge=-180, le=180),
+    radius_m: int = Query(1000, ge=1, le=5000),
+    limit: int = Query(50, ge=1, le=200),
+    types: str = Query("poi", description="Comma-separated: poi, helper"),
+    session: AsyncSession = Depends(get_async_read_session)
+):
+    requested = parse_map_types(types)
     response.headers["Cache-Control"] = "public, max-age=10" # Nearby is very reactive
+    index = await get_city_index_async(session, city)
+    if index is not None:
+        results = []
+        for dist, p in index.nearby(lat, lon, radius_m, limit, requested):
+            item = {"id": p["id"], "type": p["kind"], "title": p["title"], "lat": p["lat"], "lon": p["lon"], "distance_m": int(dist)}
+            if p["kind"] == "helper":
+                item["helper_type"] = p["helper_type"]
+            results.append(item)
+        return results
+
+    # City not indexed (disabled or too large): PostGIS
+    params = {"city": city, "lat": lat, "lon": lon, "radius": radius_m, "limit": limit}
+    results = []
+    for row in (await session.execute(text(nearby_sql(requested)), params)).all():
+        item = {"id": row.id, "type": row.kind, "title": row.title, "lat": row.lat, "lon": row.lon, "distance_m": int(row.dist)}
+        if row.kind == "helper":
+            item["helper_type"] = row.helper_type
+        results.append(item)
     return results
 
 @router.get("/public/cities")
-def get_cities(response: Response, request: Request, session: Session = Depends(get_session)):
+def get_cities(response: Response, request: Request, session: Session = Depends(get_read_session)):
     etag = generate_version_marker(session, City)
     check_etag_versioned(request, response, etag)
-    cities = session.exec(select(City).where(City.is_active == True)).all()
-    return [city.model_dump(exclude={'pois', 'tours', 'osm_relation_id'}) for city in cities]
 
-@router.get("/public/catalog")
-def get_catalog(
+    def load():
+        cities = session.exec(select(City).where(City.is_active == True)).all()
+        return [city.model_dump(exclude={'pois', 'tours', 'osm_relation_id'}) for city in cities]
+    return precompressed_response(request, response, f"cities:{etag}", load)
+
+@router.get("/public/catalog", responses={200: {"model": List[CatalogTour]}})
+async def get_catalog(
     response: Response, 
     request: Request, 
     city: str = Query(...), 
     limit: int = Query(50, le=100),
     offset: int = Query(0),
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_read_session)
 ):
-    etag = generate_version_marker(session, Tour, city)
+    etag = await generate_version_marker_async(session, Tour, city)
     check_etag_versioned(request, response, etag)
     
-    query = select(Tour).where(Tour.city_slug == city, Tour.published_at != None)
-    
-    tours = session.exec(query.offset(offset).limit(limit)).all()
+    async def load():
+        query = select(Tour).where(Tour.city_slug == city, Tour.published_at != None)
     
-    result = []
-    for t in tours:
-        tour_data = t.model_dump(include={'id', 'title_ru', 'city_slug', 'duration_minutes', 'cover_image', 'distance_km', 'tour_type', 'description_ru', 'difficulty'})
-        
-        # Get price from entitlement
-        entitlement = session.exec(
+        tours = (await session.exec(query.offset(offset).limit(limit))).all()
+        if not tours:
+            return []
+
+        # Prices and rating stats for the whole page in two queries, merged below
+        refs = [str(t.id) for t in tours]
+        entitlements = {}
+        for e in (await session.exec(
             select(Entitlement).where(
                 Entitlement.scope == "tour",
-                Entitlement.ref == str(t.id),
+                Entitlement.ref.in_(refs),
                 Entitlement.is_active == True
             )
-        ).first()
-        
-        if entitlement:
-            tour_data['price_amount'] = entitlement.price_amount
-            tour_data['price_currency'] = entitlement.price_currency
-            tour_data['is_free'] = entitlement.price_amount == 0
-        else:
-            tour_data['price_amount'] = None
-            tour_data['price_currency'] = 'RUB'
-            tour_data['is_free'] = False
+        )).all():
+            entitlements.setdefault(e.ref, e)
+
+        rating_stats = {
+            s.tour_id: s for s in (await session.exec(
+                select(TourRatingSummary).where(TourRatingSummary.tour_id.in_([t.id for t in tours]))
+            )).all()
+        }
+
+        result = []
+        for t in tours:
+            tour_data = t.model_dump(include={'id', 'title_ru', 'city_slug', 'duration_minutes', 'cover_image', 'distance_km', 'tour_type', 'description_ru', 'difficulty'})
         
-        # Get rating stats
-        rating_stats = session.exec(
-            select(
-                func.count(TourRating.id).label('count'),
-                func.avg(TourRating.rating).label('avg')
-            ).where(TourRating.tour_id == t.id)
-        ).first()
+            # Get price from entitlement
+            entitlement = entitlements.get(str(t.id))
+            if entitlement:
+                tour_data['price_amount'] = entitlement.price_amount
+                tour_data['price_currency'] = entitlement.price_currency
+                tour_data['is_free'] = entitlement.price_amount == 0
+            else:
+                tour_data['price_amount'] = None
+                tour_data['price_currency'] = 'RUB'
+                tour_data['is_free'] = False
         
-        tour_data['avg_rating'] = round(float(rating_stats[1]), 1) if rating_stats[1] else None
-        tour_data['rating_count'] = rating_stats[0] or 0
+            summary = rating_stats.get(t.id)
+            tour_data['avg_rating'] = round(summary.avg_rating, 1) if summary and summary.avg_rating else None
+            tour_data['rating_count'] = summary.rating_count if summary else 0
         
-        result.append(tour_data)
+            result.append(tour_data)
     
-    return result
+        return result
+
+    # Prices/ratings are not in the ETag version: max-age and the 60 s body reuse bound their staleness
+    return await precompressed_response_async(
+        request, response, f"catalog:{city}:{limit}:{offset}:{etag}", load, ttl=60
+    )
 
 @router.get("/public/map/attribution")
 def get_map_attribution(response: Response):
     response.headers["Cache-Control"] = "public, max-age=3600"
     return {"attribution_text": "© OpenStreetMap contributors", "attribution_url": "https://www.openstreetmap.org/copyright"}
 
+def parse_bbox(bbox: str) -> tuple[float, float, float, float]:
+    """'min_lon,min_lat,max_lon,max_lat' -> (min_lat, min_lon, max_lat, max_lon); 422 if malformed."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180):
+        raise HTTPException(status_code=422, detail="bbox must be min_lon,min_lat,max_lon,max_lat")
+    return min_lat, min_lon, max_lat, max_lon
+
 @router.get("/public/helpers")
-def get_helpers(response: Response, request: Request, city: str = Query(...), category: Optional[str] = Query(None), session: Session = Depends(get_session)):
-    q = select(HelperPlace).where(HelperPlace.city_slug == city)
-    if category: q = q.where(HelperPlace.type == category)
-    helpers = session.exec(q).all()
-    return [{**h.model_dump(exclude={'geo'}), 'title': h.name_ru or ''} for h in helpers]
+def get_helpers(
+    response: Response, request: Request, city: str = Query(...), category: Optional[str] = Query(None),
+    bbox: Optional[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat (map viewport)"),
+    session: Session = Depends(get_read_session)
+):
+    if bbox:
+        min_lat, min_lon, max_lat, max_lon = parse_bbox(bbox)
+        index = get_city_index(session, city)
+        if index is not None:
+            return [
+                p["payload"] for p in index.within_bbox(min_lat, min_lon, max_lat, max_lon, "helper")
+                if not category or p["helper_type"] == category
+            ]
+        # City not indexed: plain range filter on lat/lon
+        q = select(HelperPlace).where(
+            HelperPlace.city_slug == city,
+            HelperPlace.lat.between(min_lat, max_lat), HelperPlace.lon.between(min_lon, max_lon),
+        )
+        if category: q = q.where(HelperPlace.type == category)
+        return [{**h.model_dump(exclude={'geo'}), 'title': h.name_ru or ''} for h in session.exec(q).all()]
+
+    version = generate_version_marker(session, HelperPlace, city)
+
+    def load():
+        q = select(HelperPlace).where(HelperPlace.city_slug == city)
+        if category: q = q.where(HelperPlace.type == category)
+        helpers = session.exec(q).all()
+        return [{**h.model_dump(exclude={'geo'}), 'title': h.name_ru or ''} for h in helpers]
+    return cached_response(f"helpers:{city}:{category}:{version}", load)
+
+# Grid cell of the clusters endpoint in SQL (same cells as core/clusters.cell_xy)
+_CLUSTER_BRANCHES = {
+    "poi": """
+        SELECT id::text AS id, 'poi' AS kind, NULL AS helper_type, title_ru AS title, lat, lon
+        FROM poi
+        WHERE city_slug = :city AND published_at IS NOT NULL
+          AND lat BETWEEN :min_lat AND :max_lat AND lon BETWEEN :min_lon AND :max_lon""",
+    "helper": """
+        SELECT id::text AS id, 'helper' AS kind, type AS helper_type, COALESCE(name_ru, type) AS title, lat, lon
+        FROM helper_places
+        WHERE city_slug = :city
+          AND lat BETWEEN :min_lat AND :max_lat AND lon BETWEEN :min_lon AND :max_lon""",
+}
+
+def clusters_sql(types) -> str:
+    """
+    Per-(kind, cell) aggregates for cities without an in-process index, in
+    one statement: cells are computed at the requested zoom (:n cells per
+    axis) and `shift` is the fewest halvings (parent cell = cx >> 1) that
+    bring the viewport to at most :max_features cells.
+    """
+    branches = " UNION ALL ".join(_CLUSTER_BRANCHES[t] for t in NEARBY_TYPES if t in types)
+    return f"""
+        WITH pts AS (
+            SELECT pts.*,
+                   floor((lon + 180) / 360 * :n)::bigint AS cx,
+                   floor((1 - ln(tan(radians(mlat)) + 1 / cos(radians(mlat))) / pi()) / 2 * :n)::bigint AS cy
+            FROM ({branches}) AS pts
+            CROSS JOIN LATERAL (SELECT greatest(least(lat, {_MAX_LAT}), -{_MAX_LAT}) AS mlat) AS m
+        ), level AS (
+            SELECT coalesce(min(s), :zoom) AS shift
+            FROM generate_series(0, :zoom) AS s
+            WHERE (SELECT count(DISTINCT (cx >> s) * :n + (cy >> s)) FROM pts) <= :max_features
+        )
+        SELECT kind, cx >> shift AS cx, cy >> shift AS cy, shift, count(*) AS n,
+               sum(lat) AS sum_lat, sum(lon) AS sum_lon,
+               min(id) AS id, min(title) AS title, min(helper_type) AS helper_type
+        FROM pts CROSS JOIN level
+        GROUP BY kind, cx >> shift, cy >> shift, shift
+        LIMIT :cap
+    """
+
+def _sql_clusters(session: Session, city: str, box, zoom: int, kinds, max_features: int):
+    min_lat, min_lon, max_lat, max_lon = box
+    params = {"city": city, "min_lat": min_lat, "min_lon": min_lon, "max_lat": max_lat, "max_lon": max_lon,
+              "n": (1 << zoom) * CELLS_PER_TILE, "zoom": zoom, "max_features": max_features,
+              "cap": max_features * len(kinds)}
+    cells, shift = {}, 0
+    for r in session.exec(text(clusters_sql(kinds)).bindparams(**params)).all():
+        shift = r.shift
+        point = {"kind": r.kind, "id": r.id, "title": r.title, "lat": r.sum_lat, "lon": r.sum_lon, "helper_type": r.helper_type}
+        add_to_cell(cells.setdefault((r.cx, r.cy), {}), r.kind, r.n, r.sum_lat, r.sum_lon, point)
+    features = [f for f in (cell_feature(c, kinds) for c in cells.values()) if f]
+    return zoom - shift, features[:max_features]
+
+@router.get("/public/cities/{slug}/clusters")
+@limiter.limit("60/minute")
+def get_city_clusters(
+    response: Response, request: Request, slug: str,
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat (map viewport)"),
+    zoom: int = Query(..., ge=0, le=22),
+    types: str = Query("poi", description="Comma-separated: poi, helper"),
+    session: Session = Depends(get_read_session)
+):
+    """
+    POIs/helpers of the viewport grouped into grid clusters for `zoom`.
+    At most CLUSTER_MAX_FEATURES features: a crowded viewport is answered
+    from a coarser level, reported as `zoom`.
+    """
+    box = parse_bbox(bbox)
+    requested = parse_map_types(types)
+    zoom = min(zoom, CLUSTER_MAX_ZOOM)
+    max_features = config.CLUSTER_MAX_FEATURES
+    index = get_city_index(session, slug)
+    if index is not None:
+        used, features = index.cluster_tree().query(*box, zoom, requested, max_features)
+    else:
+        used, features = _sql_clusters(session, slug, box, zoom, requested, max_features)
+    response.headers["Cache-Control"] = "public, max-age=60"
+    return {"zoom": used, "features": features}
+
+@router.get("/public/search")
+@limiter.limit("60/minute")
+def search_city_content(
+    response: Response, request: Request,
+    city: str = Query(...), q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=50, description="Max POIs and max tours"),
+    session: Session = Depends(get_read_session)
+):
+    """Published POIs and tours of the city matching every word of q (prefixes, any word form), best first."""
+    response.headers["Cache-Control"] = "public, max-age=60"
+    query_text = prefix_query(q)
+    if query_text is None:
+        return {"pois": [], "tours": []}
+
+    def ranked(model, *columns):
+        rank = fulltext_rank(model, query_text).label("rank")
+        rows = session.exec(
+            select(*columns, rank)
+            .where(model.city_slug == city, model.published_at != None, model.is_deleted == False,
+                   fulltext_match(model, query_text))
+            .order_by(rank.desc(), model.id)
+            .limit(limit)
+        ).all()
+        return [{**row._mapping, "rank": round(row.rank, 4)} for row in rows]
+
+    return {
+        "pois": ranked(Poi, Poi.id, Poi.title_ru, Poi.category, Poi.cover_image, Poi.lat, Poi.lon),
+        "tours": ranked(Tour, Tour.id, Tour.title_ru, Tour.cover_image, Tour.duration_minutes, Tour.tour_type),
+    }
+
+@router.get("/public/cities/{slug}/suggest")
+@limiter.limit("300/minute") # One request per keystroke
+def suggest_city_titles(
+    response: Response, request: Request, slug: str,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=20),
+    session: Session = Depends(get_read_session)
+):
+    """Published POIs and tours of the city whose title (ru/en, any script) has a word starting with each word of q."""
+    response.headers["Cache-Control"] = "public, max-age=60"
+    index = get_suggest_index(session, slug)
+    return {"items": index.suggest(q, limit)}
 
 # --- Phase 5: Mobile Sync Expanded ---
 
 @router.get("/public/cities/{slug}")
-def get_city_detail(response: Response, request: Request, slug: str, session: Session = Depends(get_session)):
+def get_city_detail(response: Response, request: Request, slug: str, session: Session = Depends(get_read_session)):
     city = session.exec(select(City).where(City.slug == slug)).first()
     if not city:
         raise HTTPException(status_code=404, detail="City not found")
@@ -374,47 +614,91 @@ def get_city_detail(response: Response, request: Request, slug: str, session: Se
 
 @router.get("/public/cities/{slug}/pois")
 @limiter.limit("50/minute")
-def get_city_pois(response: Response, request: Request, slug: str, page: int = 1, per_page: int = 50, session: Session = Depends(get_session)):
+def get_city_pois(
+    response: Response, request: Request, slug: str, page: int = 1, per_page: int = 50,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page (keyset paging, constant cost per page)"),
+    include_total: Optional[bool] = Query(None, description="Default: true with page, false with cursor"),
+    session: Session = Depends(get_read_session)
+):
     # List POIs for "Map Mode" or "Catalog"
-    offset = (page - 1) * per_page
+    # Ordered by (updated_at, id) ascending: a POI edited during a cursor sync
+    # moves behind the cursor and is seen again, never skipped
     query = select(Poi).where(Poi.city_slug == slug, Poi.published_at != None)
     
     # ETag based on latest POI update in city? Expensive. 
     # For list, we might just cache short term or rely on client to not spam.
     # Let's use generic list caching.
     response.headers["Cache-Control"] = "public, max-age=60"
-    
-    total = session.exec(select(func.count()).select_from(query.subquery())).one()
-    pois = session.exec(query.offset(offset).limit(per_page)).all()
-    
-    return {
-        "items": [p.model_dump(include={'id', 'title_ru', 'category', 'lat', 'lon', 'cover_image'}) for p in pois],
+    version = generate_version_marker(session, Poi, slug)
+
+    def load():
+        pois, next_cursor = keyset_page(
+            session, query, Poi.updated_at, Poi.id, per_page,
+            cursor=cursor, offset=(page - 1) * per_page, descending=False,
+        )
+        return {
+            "items": [p.model_dump(include={'id', 'title_ru', 'category', 'lat', 'lon', 'cover_image'}) for p in pois],
+            "next_cursor": next_cursor,
+        }
+    data = cached_response(f"city_pois:{slug}:{cursor or page}:{per_page}:{version}", load)
+    if include_total is None:
+        include_total = cursor is None
+    total = count_cached(session, query, f"city_pois:{slug}:{version}", ttl=300) if include_total else None
+    return fast_json({
+        "items": data["items"],
         "total": total,
         "page": page,
-        "per_page": per_page
-    }
+        "per_page": per_page,
+        "next_cursor": data["next_cursor"],
+    }, response)
 
 @router.get("/public/cities/{slug}/tours")
-def get_city_tours(response: Response, request: Request, slug: str, session: Session = Depends(get_session)):
-    tours = session.exec(select(Tour).where(Tour.city_slug == slug, Tour.published_at != None)).all()
-    return [t.model_dump(include={'id', 'title_ru', 'description_ru', 'cover_image', 'duration_minutes', 'tour_type', 'difficulty', 'distance_km'}) for t in tours]
+def get_city_tours(response: Response, request: Request, slug: str, session: Session = Depends(get_read_session)):
+    version = generate_version_marker(session, Tour, slug)
+
+    def load():
+        tours = session.exec(select(Tour).where(Tour.city_slug == slug, Tour.published_at != None)).all()
+        return [t.model_dump(include={'id', 'title_ru', 'description_ru', 'cover_image', 'duration_minutes', 'tour_type', 'difficulty', 'distance_km'}) for t in tours]
+    return precompressed_response(request, response, f"city_tours:{slug}:{version}", load)
 
 @router.get("/public/cities/{slug}/offline-manifest")
 def get_city_offline_manifest(
     response: Response, 
     request: Request, 
     slug: str, 
-    session: Session = Depends(get_session)
+    signing: str = Query("url", pattern="^(url|prefix)$"),
+    stream: bool = Query(False, description="Stream the document (constant memory, early first byte)"),
+    session: Session = Depends(get_read_session)
 ):
     """
     Синхронный эндпоинт для получения оффлайн манифеста города.
     Возвращает список всех ресурсов (аудио, изображения) для загрузки.
     Не требует QStash - клиент сам скачивает файлы по URL.
+    stream=true: тот же документ, отдаётся по частям (см. _stream_offline_manifest).
     """
     city = session.exec(select(City).where(City.slug == slug)).first()
     if not city:
         raise HTTPException(status_code=404, detail="City not found")
-    
+
+    sign = AssetUrlSigner(prefix_scoped=signing == "prefix")
+    if stream:
+        return StreamingResponse(
+            _stream_offline_manifest(session.get_bind(), city.model_dump(include=OFFLINE_CITY_FIELDS), slug, sign),
+            media_type="application/json",
+            headers={"Cache-Control": "public, max-age=300"},
+        )
+
+    # Кэшируем на 5 минут
+    response.headers["Cache-Control"] = "public, max-age=300"
+    # Готовое (gzip/br) тело на версию контента города и интервал подписей URL
+    versions = content_versions(session, slug, City, Poi, Tour)
+    return precompressed_response(
+        request, response, f"offline:{slug}:{signing}:{versions}:{signature_bucket()}",
+        lambda: _build_offline_manifest(session, city, slug, sign),
+        ttl=SIGNATURE_BUCKET_SECONDS,
+    )
+
+def _build_offline_manifest(session: Session, city: City, slug: str, sign: AssetUrlSigner) -> dict:
     # Загружаем все опубликованные POI с их медиа и нарациями
     pois = session.exec(
         select(Poi)
@@ -435,70 +719,204 @@ def get_city_offline_manifest(
     tours_data = []
     
     for poi in pois:
-        poi_dict = poi.model_dump(include={'id', 'title_ru', 'description_ru', 'lat', 'lon', 'category', 'cover_image'})
-        pois_data.append(poi_dict)
-        
-        # Аудио нарации
-        for n in poi.narrations:
-            if n.url:
-                assets.append({
-                    "id": str(n.id),
-                    "url": sign_asset_url(n.url),
-                    "type": "audio",
-                    "owner_type": "poi",
-                    "owner_id": str(poi.id),
-                    "locale": n.locale,
-                    "duration": n.duration_seconds
-                })
-        
-        # Медиа (изображения)
-        for m in poi.media:
-            if m.url:
-                assets.append({
-                    "id": str(m.id),
-                    "url": sign_asset_url(m.url),
-                    "type": m.media_type or "image",
-                    "owner_type": "poi",
-                    "owner_id": str(poi.id)
-                })
+        pois_data.append(poi.model_dump(include=OFFLINE_POI_FIELDS))
+        # Аудио нарации и медиа (изображения)
+        assets.extend(_offline_poi_assets(poi, sign))
     
     for tour in tours:
-        tour_dict = tour.model_dump(include={'id', 'title_ru', 'description_ru', 'duration_minutes', 'tour_type', 'cover_image', 'distance_km'})
-        tour_dict['items'] = [
-            {
-                'poi_id': str(item.poi_id),
-                'order_index': item.order_index,
-                'override_lat': item.override_lat,
-                'override_lon': item.override_lon,
-                'transition_text_ru': item.transition_text_ru,
-                'transition_audio_url': item.transition_audio_url,
-            }
-            for item in sorted(tour.items, key=lambda i: i.order_index)
-            if item.poi_id
-        ]
-        tours_data.append(tour_dict)
-        
+        tours_data.append(_offline_tour(tour))
         # Медиа тура
-        for m in tour.media:
-            if m.url:
-                assets.append({
-                    "id": str(m.id),
-                    "url": sign_asset_url(m.url),
-                    "type": m.media_type or "image",
-                    "owner_type": "tour",
-                    "owner_id": str(tour.id)
-                })
-    
-    # Кэшируем на 5 минут
-    response.headers["Cache-Control"] = "public, max-age=300"
+        assets.extend(_offline_tour_assets(tour, sign))
     
-    return {
-        "city": city.model_dump(include={'id', 'slug', 'name_ru', 'name_en'}),
+    return _with_asset_tokens({
+        "city": city.model_dump(include=OFFLINE_CITY_FIELDS),
         "pois": pois_data,
         "tours": tours_data,
         "assets": assets,
         "total_assets": len(assets)
-    }
+    }, sign)
+
+OFFLINE_CITY_FIELDS = {'id', 'slug', 'name_ru', 'name_en'}
+OFFLINE_POI_FIELDS = {'id', 'title_ru', 'description_ru', 'lat', 'lon', 'category', 'cover_image'}
+OFFLINE_TOUR_FIELDS = {'id', 'title_ru', 'description_ru', 'duration_minutes', 'tour_type', 'cover_image', 'distance_km'}
+OFFLINE_STREAM_BATCH = 500
+
+def _offline_tour(tour: Tour) -> dict:
+    tour_dict = tour.model_dump(include=OFFLINE_TOUR_FIELDS)
+    tour_dict['items'] = [
+        {
+            'poi_id': str(item.poi_id),
+            'order_index': item.order_index,
+            'override_lat': item.override_lat,
+            'override_lon': item.override_lon,
+            'transition_text_ru': item.transition_text_ru,
+            'transition_audio_url': item.transition_audio_url,
+        }
+        for item in sorted(tour.items, key=lambda i: i.order_index)
+        if item.poi_id
+    ]
+    return tour_dict
+
+def _offline_poi_assets(poi: Poi, sign: AssetUrlSigner) -> list:
+    """Narrations and media of a POI (loaded relationships) as offline manifest assets."""
+    assets = [
+        {"id": str(n.id), "url": sign(n.url), "type": "audio", "owner_type": "poi",
+         "owner_id": str(poi.id), "locale": n.locale, "duration": n.duration_seconds}
+        for n in poi.narrations if n.url
+    ]
+    assets += [
+        {"id": str(m.id), "url": sign(m.url), "type": m.media_type or "image",
+         "owner_type": "poi", "owner_id": str(poi.id)}
+        for m in poi.media if m.url
+    ]
+    return assets
+
+def _offline_tour_assets(tour: Tour, sign: AssetUrlSigner) -> list:
+    return [
+        {"id": str(m.id), "url": sign(m.url), "type": m.media_type or "image",
+         "owner_type": "tour", "owner_id": str(tour.id)}
+        for m in tour.media if m.url
+    ]
+
+def _offline_assets(session: Session, slug: str, sign: AssetUrlSigner):
+    """Assets of the city, table by table (narrations, POI media, tour media), through server-side cursors."""
+    published_pois = (Poi.city_slug == slug, Poi.published_at != None)
+    narrations = select(Narration.id, Narration.url, Narration.poi_id, Narration.locale, Narration.duration_seconds) \
+        .join(Poi, Poi.id == Narration.poi_id).where(*published_pois, Narration.url != None)
+    for n in session.exec(narrations.execution_options(yield_per=OFFLINE_STREAM_BATCH)):
+        yield {"id": str(n.id), "url": sign(n.url), "type": "audio", "owner_type": "poi",
+               "owner_id": str(n.poi_id), "locale": n.locale, "duration": n.duration_seconds}
+
+    poi_media = select(PoiMedia.id, PoiMedia.url, PoiMedia.media_type, PoiMedia.poi_id) \
+        .join(Poi, Poi.id == PoiMedia.poi_id).where(*published_pois, PoiMedia.url != None)
+    for m in session.exec(poi_media.execution_options(yield_per=OFFLINE_STREAM_BATCH)):
+        yield {"id": str(m.id), "url": sign(m.url), "type": m.media_type or "image",
+               "owner_type": "poi", "owner_id": str(m.poi_id)}
+
+    tour_media = select(TourMedia.id, TourMedia.url, TourMedia.media_type, TourMedia.tour_id) \
+        .join(Tour, Tour.id == TourMedia.tour_id).where(Tour.city_slug == slug, Tour.published_at != None, TourMedia.url != None)
+    for m in session.exec(tour_media.execution_options(yield_per=OFFLINE_STREAM_BATCH)):
+        yield {"id": str(m.id), "url": sign(m.url), "type": m.media_type or "image",
+               "owner_type": "tour", "owner_id": str(m.tour_id)}
+
+def _stream_offline_manifest(bind, city_data: dict, slug: str, sign: AssetUrlSigner):
+    """
+    The offline manifest emitted incrementally: POIs, tours and assets are read
+    with yield_per (server-side cursors on PostgreSQL) and written out batch by
+    batch, so memory does not grow with the city. Same document as the
+    buffered response, except that assets come grouped by table instead of
+    interleaved per POI.
+
+    Runs its own session: the request's may already be closed while the
+    response body is being sent.
+    """
+    with Session(bind) as session:
+        total = 0
+
+        def pois():
+            for row in session.exec(
+                select(*[getattr(Poi, f) for f in sorted(OFFLINE_POI_FIELDS)])
+                .where(Poi.city_slug == slug, Poi.published_at != None)
+                .execution_options(yield_per=OFFLINE_STREAM_BATCH)
+            ):
+                yield dict(row._mapping)
+
+        def tours():
+            for tour in session.exec(
+                select(Tour)
+                .where(Tour.city_slug == slug, Tour.published_at != None)
+                .options(selectinload(Tour.items))
+                .execution_options(yield_per=OFFLINE_STREAM_BATCH)
+            ):
+                yield _offline_tour(tour)
+
+        def assets():
+            nonlocal total
+            for asset in _offline_assets(session, slug, sign):
+                total += 1
+                yield asset
+
+        fields = [
+            ("city", city_data),
+            ("pois", pois()),
+            ("tours", tours()),
+            ("assets", assets()),
+            ("total_assets", lambda: total),
+        ]
+        if sign.prefix_scoped:
+            fields.append(("asset_tokens", sign.tokens))
+        yield from iter_json_object(fields)
+
+
+# --- Delta sync ---
+
+# Past the last row of every table: the key of a fully drained table
+_MAX_UUID = uuid.UUID(int=(1 << 128) - 1)
+_CHANGES_CURSOR_COLUMNS = (Poi.updated_at, Poi.id, Tour.updated_at, Tour.id)
+
+def _changed_rows(session: Session, model, options, slug: str, key, horizon: datetime, limit: int):
+    """Rows of `model` in the city with (updated_at, id) in (key, horizon], oldest first; limit + 1 to detect more."""
+    columns = (model.updated_at, model.id)
+    query = select(model).where(model.city_slug == slug, model.updated_at <= horizon)
+    if key is None:
+        # first sync: live rows only, nothing to delete on the client yet
+        query = query.where(model.published_at != None, model.is_deleted == False)
+    else:
+        query = query.where(seek_past(columns, key, descending=False))
+    return session.exec(query.options(*options).order_by(*columns).limit(limit + 1)).all()
+
+@router.get("/public/cities/{slug}/changes")
+@limiter.limit("60/minute")
+def get_city_changes(
+    response: Response, request: Request, slug: str,
+    since: Optional[str] = Query(None, description="next_cursor of the previous sync; omit for a full snapshot"),
+    limit: int = Query(200, ge=1, le=1000, description="Max POIs and max tours per page"),
+    signing: str = Query("url", pattern="^(url|prefix)$"),
+    session: Session = Depends(get_read_session)
+):
+    """
+    Offline manifest deltas. POIs and tours whose row (or narrations, media,
+    tour items: those touch the parent) changed after `since`, in the offline
+    manifest's shapes, with the complete asset list of every returned owner
+    (replace the owner's assets). Unpublished or deleted ones come as ids in
+    `deleted`. Repeat with next_cursor while has_more; keep the last
+    next_cursor for the following sync.
+
+    Rows newer than CHANGES_SETTLE_SECONDS are left for the next sync, so a
+    transaction that commits after a later one is not skipped over.
+    """
+    keys = decode_cursor(since, _CHANGES_CURSOR_COLUMNS) if since else (None, None, None, None)
+    horizon = datetime.utcnow() - timedelta(seconds=config.CHANGES_SETTLE_SECONDS)
+    sign = AssetUrlSigner(prefix_scoped=signing == "prefix")
+
+    pois = _changed_rows(session, Poi, (selectinload(Poi.narrations), selectinload(Poi.media)),
+                         slug, None if since is None else keys[:2], horizon, limit)
+    tours = _changed_rows(session, Tour, (selectinload(Tour.items), selectinload(Tour.media)),
+                          slug, None if since is None else keys[2:], horizon, limit)
+    pois_more, tours_more = len(pois) > limit, len(tours) > limit
+    pois, tours = pois[:limit], tours[:limit]
+
+    def next_key(rows, more):
+        return (rows[-1].updated_at, rows[-1].id) if more else (horizon, _MAX_UUID)
+
+    data = {"pois": [], "tours": [], "assets": [], "deleted": {"pois": [], "tours": []}}
+    for poi in pois:
+        if poi.published_at is None or poi.is_deleted:
+            data["deleted"]["pois"].append(str(poi.id))
+            continue
+        data["pois"].append(poi.model_dump(include=OFFLINE_POI_FIELDS))
+        data["assets"].extend(_offline_poi_assets(poi, sign))
+    for tour in tours:
+        if tour.published_at is None or tour.is_deleted:
+            data["deleted"]["tours"].append(str(tour.id))
+            continue
+        data["tours"].append(_offline_tour(tour))
+        data["assets"].extend(_offline_tour_assets(tour, sign))
+
+    data["next_cursor"] = encode_cursor(next_key(pois, pois_more) + next_key(tours, tours_more))
+    data["has_more"] = pois_more or tours_more
+    response.headers["Cache-Control"] = "no-store"
+    return fast_json(_with_asset_tokens(data, sign), response)
 
 
 # --- Itineraries ---
@@ -568,6 +986,7 @@ def get_itinerary_manifest(
     response: Response, 
     request: Request, 
     itinerary_id: uuid.UUID, 
+    signing: str = Query("url", pattern="^(url|prefix)$"),
     session: Session = Depends(get_session)
 ):
     # Returns format compatible with Tour Manifest
@@ -597,18 +1016,19 @@ def get_itinerary_manifest(
     
     pois_data = []
     assets = []
+    sign = AssetUrlSigner(prefix_scoped=signing == "prefix")
     
     for item in sorted(itinerary.items, key=lambda i: i.order_index):
         if item.poi:
             p = item.poi.model_dump(include={'id', 'title_ru', 'description_ru', 'lat', 'lon'})
             pois_data.append({"order_index": item.order_index, **p})
             for n in item.poi.narrations:
-                assets.append({"url": sign_asset_url(n.url), "type": "audio", "owner_id": str(item.poi.id), "locale": n.locale, "duration": n.duration_seconds})
+                assets.append({"url": sign(n.url), "type": "audio", "owner_id": str(item.poi.id), "locale": n.locale, "duration": n.duration_seconds})
             for m in item.poi.media:
-                assets.append({"url": sign_asset_url(m.url), "type": m.media_type, "owner_id": str(item.poi.id)})
+                assets.append({"url": sign(m.url), "type": m.media_type, "owner_id": str(item.poi.id)})
                 
     response.headers["Cache-Control"] = "private, no-store"
-    return {"tour": data, "pois": pois_data, "assets": assets}
+    return fast_json(_with_asset_tokens({"tour": data, "pois": pois_data, "assets": assets}, sign), response)
 
 @router.put("/public/itineraries/{itinerary_id}")
 def update_itinerary(
@@ -780,12 +1200,13 @@ def rate_tour(
     ).first()
     
     if existing:
-        # Update existing rating
-        existing.rating = payload.rating
-        existing.comment = payload.comment
-        existing.updated_at = datetime.utcnow()
-        session.add(existing)
+        # Update existing rating (summary delta from the value actually replaced)
+        try:
+            update_rating(session, existing, payload.rating, comment=payload.comment, updated_at=datetime.utcnow())
+        except LookupError:
+            raise HTTPException(status_code=409, detail="Rating was deleted concurrently, retry")
         session.commit()
+        mark_recent_write(payload.device_anon_id)
         return {"status": "updated", "rating_id": str(existing.id)}
     else:
         # Create new rating
@@ -796,8 +1217,10 @@ def rate_tour(
             comment=payload.comment
         )
         session.add(rating)
+        apply_rating_change(session, tour_id, None, payload.rating)
         session.commit()
         session.refresh(rating)
+        mark_recent_write(payload.device_anon_id)
         return {"status": "created", "rating_id": str(rating.id)}
 
 @router.get("/public/tours/{tour_id}/ratings")
@@ -806,19 +1229,13 @@ def get_tour_ratings(
     tour_id: uuid.UUID,
     limit: int = Query(20, le=100),
     offset: int = Query(0),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """Get ratings for a tour with aggregated stats."""
-    # Get aggregated stats
-    stats = session.exec(
-        select(
-            func.count(TourRating.id).label('count'),
-            func.avg(TourRating.rating).label('avg')
-        ).where(TourRating.tour_id == tour_id)
-    ).first()
-    
-    rating_count = stats[0] or 0
-    avg_rating = float(stats[1]) if stats[1] else None
+    # Aggregated stats: maintained summary row (primary-key lookup)
+    summary = session.get(TourRatingSummary, tour_id)
+    rating_count = summary.rating_count if summary else 0
+    avg_rating = summary.avg_rating if summary else None
     
     # Get individual ratings
     ratings = session.exec(
@@ -850,7 +1267,7 @@ def get_tour_ratings(
 def get_my_tour_rating(
     tour_id: uuid.UUID,
     device_anon_id: str = Query(...),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """Get current user's rating for a tour."""
     rating = session.exec(
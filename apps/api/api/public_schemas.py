@@ -0,0 +1,140 @@
+"""
+Typed shapes of the large public payloads (tour/itinerary manifest, catalog,
+POI detail).
+
+The endpoints build plain dicts (cached, then signed per request) and render
+them with core.serialization.fast_json, so these models are not run per
+request: they document the contract in OpenAPI (responses=...) and the tests
+validate real handler output against them.
+"""
+import uuid
+from datetime import datetime
+from typing import Any, List, Optional
+
+from pydantic import BaseModel
+
+
+class AssetToken(BaseModel):
+    prefix: str
+    token: str
+    expires: int
+
+
+class ManifestAsset(BaseModel):
+    url: str
+    type: Optional[str] = None
+    owner_id: Optional[str] = None
+    locale: Optional[str] = None
+    duration: Optional[float] = None
+
+
+class ManifestNarration(BaseModel):
+    id: str
+    url: str
+    kids_url: Optional[str] = None
+    locale: str
+    duration_seconds: Optional[float] = None
+    transcript: Optional[str] = None
+
+
+class ManifestMedia(BaseModel):
+    id: str
+    url: str
+    type: Optional[str] = None
+
+
+class ManifestTour(BaseModel):
+    id: uuid.UUID
+    city_slug: Optional[str] = None
+    title_ru: str
+    description_ru: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    published_at: Optional[datetime] = None
+
+
+class ManifestPoi(BaseModel):
+    order_index: int
+    id: uuid.UUID
+    title_ru: str
+    description_ru: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    category: Optional[str] = None
+    address: Optional[str] = None
+    cover_image: Optional[str] = None
+    opening_hours: Optional[Any] = None
+    external_links: Optional[List[str]] = None
+    wikidata_id: Optional[str] = None
+    osm_id: Optional[str] = None
+    preview_audio_url: Optional[str] = None
+    override_lat: Optional[float] = None
+    override_lon: Optional[float] = None
+    effective_lat: Optional[float] = None
+    effective_lon: Optional[float] = None
+    transition_text_ru: Optional[str] = None
+    transition_audio_url: Optional[str] = None
+    narrations: List[ManifestNarration]
+    media: List[ManifestMedia]
+
+
+class TourManifest(BaseModel):
+    tour: ManifestTour
+    pois: List[ManifestPoi]
+    assets: List[ManifestAsset]
+    asset_tokens: Optional[List[AssetToken]] = None
+
+
+class CatalogTour(BaseModel):
+    id: uuid.UUID
+    title_ru: str
+    city_slug: str
+    description_ru: Optional[str] = None
+    duration_minutes: Optional[int] = None
+    cover_image: Optional[str] = None
+    distance_km: Optional[float] = None
+    tour_type: Optional[str] = None
+    difficulty: Optional[str] = None
+    price_amount: Optional[float] = None
+    price_currency: Optional[str] = None
+    is_free: bool
+    avg_rating: Optional[float] = None
+    rating_count: int
+
+
+class PoiSourceOut(BaseModel):
+    id: uuid.UUID
+    name: str
+    url: Optional[str] = None
+
+
+class PoiMediaOut(BaseModel):
+    id: uuid.UUID
+    url: str
+    media_type: str
+    license_type: str
+    author: str
+    source_page_url: Optional[str] = None
+
+
+class PoiDetail(BaseModel):
+    id: uuid.UUID
+    city_slug: str
+    title_ru: str
+    description_ru: Optional[str] = None
+    title_en: Optional[str] = None
+    description_en: Optional[str] = None
+    category: str
+    address: Optional[str] = None
+    cover_image: Optional[str] = None
+    opening_hours: Optional[Any] = None
+    external_links: Optional[List[str]] = None
+    published_at: Optional[datetime] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    preview_audio_url: Optional[str] = None
+    preview_bullets: Optional[List[str]] = None
+    updated_at: Optional[datetime] = None
+    has_access: bool
+    sources: List[PoiSourceOut]
+    media: List[PoiMediaOut]
+    narrations: List[ManifestNarration] = []
@@ -16,6 +16,8 @@ import httpx
 from .core.database import engine
 from .core.models import PurchaseIntent, Purchase, Entitlement, EntitlementGrant, Tour
 from .core.config import config
+from .core.db_routing import mark_recent_write
+from .core.access_cache import invalidate_access_async, invalidate_free_tours_async
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -291,6 +293,7 @@ async def confirm_purchase(
         )
         session.add(entitlement)
         session.commit()
+        await invalidate_free_tours_async()
         session.refresh(entitlement)
     
     # Создаем grant для устройства
@@ -305,6 +308,8 @@ async def confirm_purchase(
     session.add(purchase)
     session.add(grant)
     session.commit()
+    mark_recent_write(intent.device_anon_id)
+    await invalidate_access_async(intent.device_anon_id)
     
     logger.info(f"Purchase confirmed: intent={intent.id}, transaction={transaction_id}")
     
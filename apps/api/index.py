@@ -18,6 +18,7 @@ from api.core.config import config
 from api.core.middleware_security import SecurityMiddleware
 from api.core.models import Job
 from api.core.database import engine
+from api.core.serialization import json_response_class
 # NOTE: process_job is imported lazily inside job_callback to prevent boot crash
 # from billing module failures (PR-43 fix for PR-42 wrong file)
 
@@ -133,6 +134,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # admin/users keyset paging
 )
 
 # Mount Security Middleware (Global) - enabled in production
@@ -151,9 +153,10 @@ def root():
 
 # Mount routers (ops first for diagnostics)
 app.include_router(ops_router, prefix="/v1")
-if public_router: app.include_router(public_router, prefix="/v1")
+# Public/map payloads are the large ones: orjson rendering when FAST_JSON_RESPONSES is on
+if public_router: app.include_router(public_router, prefix="/v1", default_response_class=json_response_class())
 if ingestion_router: app.include_router(ingestion_router, prefix="/v1")
-if map_router: app.include_router(map_router, prefix="/v1")
+if map_router: app.include_router(map_router, prefix="/v1", default_response_class=json_response_class())
 if publish_router: app.include_router(publish_router, prefix="/v1")
 if admin_tours_router: app.include_router(admin_tours_router, prefix="/v1")
 if admin_pois_router: app.include_router(admin_pois_router, prefix="/v1")  # PR-59: POI routes
@@ -0,0 +1,79 @@
+"""
+Serialization micro-benchmark for the large public payloads.
+
+Compares FastAPI's default path (jsonable_encoder + JSONResponse) with
+FastJSONResponse (orjson) on synthetic offline-manifest and catalog payloads
+shaped like the real handler output (UUIDs, datetimes, nested lists).
+
+    cd apps/api && DATABASE_URL=sqlite:// python load_test/bench_json.py
+"""
+import os
+import sys
+import time
+import uuid
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from api.core.serialization import FastJSONResponse
+
+
+def offline_manifest(n_pois: int = 500, n_tours: int = 40) -> dict:
+    now = datetime.utcnow()
+    pois, assets = [], []
+    for i in range(n_pois):
+        poi_id = uuid.uuid4()
+        pois.append({
+            "id": poi_id, "title_ru": f"Точка {i}", "description_ru": "Описание " * 40,
+            "lat": 54.7 + i * 1e-4, "lon": 20.5 + i * 1e-4, "category": "landmark", "cover_image": None,
+        })
+        for kind in ("audio", "image", "image"):
+            assets.append({
+                "id": str(uuid.uuid4()), "url": f"https://cdn.test/poi/{poi_id}/{kind}.bin?token=abc&expires=1",
+                "type": kind, "owner_type": "poi", "owner_id": str(poi_id), "locale": "ru", "duration": 61.5,
+            })
+    tours = [{
+        "id": uuid.uuid4(), "title_ru": f"Тур {t}", "description_ru": "Тур " * 30, "duration_minutes": 90,
+        "tour_type": "walking", "cover_image": None, "distance_km": 3.2, "published_at": now,
+        "items": [{"poi_id": str(pois[(t + k) % n_pois]["id"]), "order_index": k, "override_lat": None,
+                   "override_lon": None, "transition_text_ru": None, "transition_audio_url": None}
+                  for k in range(12)],
+    } for t in range(n_tours)]
+    return {"city": {"id": uuid.uuid4(), "slug": "bench", "name_ru": "Бенч", "name_en": None},
+            "pois": pois, "tours": tours, "assets": assets, "total_assets": len(assets)}
+
+
+def catalog(n: int = 100) -> list:
+    return [{
+        "id": uuid.uuid4(), "title_ru": f"Тур {i}", "city_slug": "bench", "duration_minutes": 60,
+        "cover_image": None, "distance_km": 2.5, "tour_type": "walking", "description_ru": "Тур " * 30,
+        "difficulty": "easy", "price_amount": 299, "price_currency": "RUB", "is_free": False,
+        "avg_rating": 4.6, "rating_count": 12,
+    } for i in range(n)]
+
+
+def bench(name: str, fn, seconds: float = 2.0) -> float:
+    fn()
+    runs, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        runs += 1
+    rate = runs / (time.perf_counter() - start)
+    print(f"  {name:<34} {rate:10.1f} resp/s")
+    return rate
+
+
+def main():
+    for label, payload in (("offline manifest", offline_manifest()), ("catalog (100 tours)", catalog())):
+        size = len(FastJSONResponse(payload).body)
+        print(f"{label}: {size / 1024:.0f} KiB")
+        base = bench("jsonable_encoder + JSONResponse", lambda: JSONResponse(jsonable_encoder(payload)))
+        fast = bench("FastJSONResponse (orjson)", lambda: FastJSONResponse(payload))
+        print(f"  speedup x{fast / base:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+/public/nearby plan check and benchmark on a 50k-point city.
+
+Builds poi/helper_places in a scratch schema of a throwaway PostGIS database,
+prints EXPLAIN ANALYZE of public.nearby_sql() and fails unless both branches
+use their GiST index (no sequential scan), then times it against the
+previous query (KNN LIMIT 50 without the radius filter).
+
+    cd apps/api && NEARBY_BENCH_DATABASE_URL=postgresql://.../audiogid_test \\
+        DATABASE_URL=sqlite:// JWT_SECRET=... python load_test/bench_nearby.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from api.public import nearby_sql
+
+SCHEMA = "bench_nearby"
+N_POIS = 50000
+N_HELPERS = 10000
+CITY = "bench_city"
+# Kaliningrad-sized box, ~20 x 20 km
+CENTER = (54.71, 20.51)
+RUNS = 200
+
+OLD_SQL = """
+    SELECT id, 'poi' as type, title_ru, lat, lon,
+        ST_Distance(geo, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography) as dist
+    FROM poi
+    WHERE city_slug = :city AND published_at IS NOT NULL
+    ORDER BY geo <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)
+    LIMIT 50
+"""
+
+SETUP = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA}, public;
+CREATE TABLE poi (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), title_ru text, city_slug text,
+    published_at timestamp, lat double precision, lon double precision, geo geography(Point, 4326));
+CREATE TABLE helper_places (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), city_slug text, type text, name_ru text,
+    lat double precision, lon double precision, geo geography(Point, 4326));
+INSERT INTO poi (title_ru, city_slug, published_at, lat, lon)
+    SELECT 'POI ' || i, CASE WHEN i % 10 = 0 THEN 'other_city' ELSE '{CITY}' END,
+           CASE WHEN i % 7 = 0 THEN NULL ELSE now() END,
+           {CENTER[0]} - 0.09 + random() * 0.18, {CENTER[1]} - 0.15 + random() * 0.30
+    FROM generate_series(1, {N_POIS}) AS i;
+INSERT INTO helper_places (city_slug, type, name_ru, lat, lon)
+    SELECT '{CITY}', CASE WHEN i % 2 = 0 THEN 'toilet' ELSE 'cafe' END, NULL,
+           {CENTER[0]} - 0.09 + random() * 0.18, {CENTER[1]} - 0.15 + random() * 0.30
+    FROM generate_series(1, {N_HELPERS}) AS i;
+UPDATE poi SET geo = ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography;
+UPDATE helper_places SET geo = ST_SetSRID(ST_MakePoint(lon, lat), 4326)::geography;
+CREATE INDEX idx_poi_geo ON poi USING GIST (geo);
+CREATE INDEX ix_poi_city_slug ON poi (city_slug);
+CREATE INDEX idx_helper_places_geo ON helper_places USING GIST (geo);
+CREATE INDEX ix_helper_places_city_slug ON helper_places (city_slug);
+ANALYZE poi;
+ANALYZE helper_places;
+"""
+
+
+def _bench(conn, sql: str, params: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        conn.execute(text(sql), params).all()
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+def main():
+    url = os.getenv("NEARBY_BENCH_DATABASE_URL")
+    if not url or "test" not in (make_url(url).database or ""):
+        sys.exit("NEARBY_BENCH_DATABASE_URL must point to a throwaway *test* PostGIS database")
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+        for statement in SETUP.split(";"):
+            if statement.strip():
+                conn.execute(text(statement))
+
+    params = {"city": CITY, "lat": CENTER[0], "lon": CENTER[1], "radius": 1000, "limit": 50}
+    new_sql = nearby_sql({"poi", "helper"})
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+            plan = "\n".join(r[0] for r in conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + new_sql), params))
+            print(plan, "\n")
+            for table, index in (("poi", "idx_poi_geo"), ("helper_places", "idx_helper_places_geo")):
+                assert f"Seq Scan on {table}" not in plan, f"sequential scan on {table}"
+                assert index in plan, f"{index} not used"
+            print("plan OK: both branches use their GiST index\n")
+
+            for radius in (300, 1000, 5000):
+                p = {**params, "radius": radius}
+                rows = conn.execute(text(new_sql), p).all()
+                assert all(r.dist <= radius + 1 for r in rows), "row outside radius"
+                print(f"radius {radius:>5} m: {len(rows):>3} rows, "
+                      f"new {_bench(conn, new_sql, p):6.2f} ms, "
+                      f"new poi-only {_bench(conn, nearby_sql({'poi'}), p):6.2f} ms, "
+                      f"old (no radius) {_bench(conn, OLD_SQL, p):6.2f} ms")
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
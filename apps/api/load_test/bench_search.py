@@ -0,0 +1,107 @@
+"""
+Full-text search plan check and benchmark on 100k synthetic POIs.
+
+Builds poi (with the search_vector generated column and its GIN index) in a
+scratch schema of a throwaway PostgreSQL database, prints EXPLAIN ANALYZE of
+the /public/search POI query and fails unless it uses ix_poi_search_vector,
+then times it against the admin ILIKE '%term%' filter it replaces.
+
+    cd apps/api && SEARCH_BENCH_DATABASE_URL=postgresql://.../audiogid_test \\
+        DATABASE_URL=sqlite:// JWT_SECRET=... python load_test/bench_search.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from api.core.search import prefix_query, vector_sql
+
+SCHEMA = "bench_search"
+N_POIS = 100000
+CITY = "bench_city"
+RUNS = 100
+TERMS = ("собор", "кафедральный собор", "музей янтаря", "kant", "форт")
+
+SETUP = f"""
+DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;
+CREATE SCHEMA {SCHEMA};
+SET search_path TO {SCHEMA}, public;
+CREATE TABLE poi (
+    id uuid PRIMARY KEY DEFAULT gen_random_uuid(), city_slug text, published_at timestamp,
+    is_deleted boolean DEFAULT false, title_ru text, title_en text, description_ru text, description_en text);
+INSERT INTO poi (city_slug, published_at, title_ru, title_en, description_ru)
+    SELECT CASE WHEN i % 10 = 0 THEN 'other_city' ELSE '{CITY}' END,
+           CASE WHEN i % 7 = 0 THEN NULL ELSE now() END,
+           (ARRAY['Собор', 'Музей', 'Форт', 'Парк', 'Дом', 'Ворота', 'Башня'])[1 + i % 7] || ' ' ||
+           (ARRAY['Кафедральный', 'Янтаря', 'Канта', 'Победы', 'Королевский', 'Бранденбургский'])[1 + i % 6] || ' ' || i,
+           (ARRAY['Cathedral', 'Museum', 'Fort', 'Park', 'Kant house'])[1 + i % 5] || ' ' || i,
+           repeat('Описание объекта номер ' || i || ' с историей города, архитектурой и легендами. ', 8)
+    FROM generate_series(1, {N_POIS}) AS i;
+ALTER TABLE poi ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector_sql()}) STORED;
+CREATE INDEX ix_poi_search_vector ON poi USING GIN (search_vector);
+CREATE INDEX ix_poi_city_slug ON poi (city_slug);
+ANALYZE poi;
+"""
+
+FTS_SQL = """
+    SELECT id, title_ru, ts_rank_cd(search_vector, q) AS rank
+    FROM poi, to_tsquery('russian'::regconfig, :q) || to_tsquery('simple'::regconfig, :q) AS q
+    WHERE city_slug = :city AND published_at IS NOT NULL AND NOT is_deleted AND search_vector @@ q
+    ORDER BY rank DESC, id
+    LIMIT 20
+"""
+
+ILIKE_SQL = """
+    SELECT id, title_ru FROM poi
+    WHERE city_slug = :city AND NOT is_deleted AND (title_ru ILIKE :like OR description_ru ILIKE :like)
+    ORDER BY id
+    LIMIT 20
+"""
+
+
+def _bench(conn, sql: str, params: dict) -> float:
+    start = time.perf_counter()
+    for _ in range(RUNS):
+        conn.execute(text(sql), params).all()
+    return (time.perf_counter() - start) / RUNS * 1000
+
+
+def main():
+    url = os.getenv("SEARCH_BENCH_DATABASE_URL")
+    if not url or "test" not in (make_url(url).database or ""):
+        sys.exit("SEARCH_BENCH_DATABASE_URL must point to a throwaway *test* PostgreSQL database")
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pgcrypto"))
+        for statement in SETUP.split(";\n"):
+            if statement.strip():
+                conn.execute(text(statement))
+
+    try:
+        with engine.connect() as conn:
+            conn.execute(text(f"SET search_path TO {SCHEMA}, public"))
+            params = {"city": CITY, "q": prefix_query(TERMS[0])}
+            plan = "\n".join(r[0] for r in conn.execute(text("EXPLAIN (ANALYZE, BUFFERS) " + FTS_SQL), params))
+            print(plan, "\n")
+            assert "ix_poi_search_vector" in plan, "GIN index not used"
+            print("plan OK: search uses the GIN index\n")
+
+            for term in TERMS:
+                fts = {"city": CITY, "q": prefix_query(term)}
+                like = {"city": CITY, "like": f"%{term}%"}
+                hits = len(conn.execute(text(FTS_SQL), fts).all())
+                print(f"{term!r:>22}: {hits:>2} hits, "
+                      f"fulltext {_bench(conn, FTS_SQL, fts):7.2f} ms, "
+                      f"ilike {_bench(conn, ILIKE_SQL, like):7.2f} ms")
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+/public/cities/{slug}/suggest lookup benchmark on 50k synthetic titles.
+
+Builds a core.suggest.SuggestIndex in process (no database) and prints the
+build time, then the mean lookup time per query; fails if any query takes
+a millisecond or more on average.
+
+    cd apps/api && DATABASE_URL=sqlite:// JWT_SECRET=... python load_test/bench_suggest.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.core.suggest import SuggestIndex
+
+N_TITLES = 50000
+RUNS = 1000
+LIMIT = 10
+HEADS = ["Собор", "Музей", "Форт", "Парк", "Дом", "Ворота", "Башня", "Кирха", "Бастион", "Площадь"]
+TAILS = ["Кафедральный", "Янтаря", "Канта", "Победы", "Королёвский", "Бранденбургский", "Шиллера", "Врангеля"]
+QUERIES = ("с", "ка", "муз", "кант", "Kant", "форт вр", "королев", "bastion shi", "врангеля форт", "zzz")
+
+
+def main():
+    rnd = random.Random(1)
+    entries = [
+        {"type": "poi" if i % 5 else "tour", "id": i,
+         "title_ru": f"{rnd.choice(HEADS)} {rnd.choice(TAILS)} {i}", "title_en": f"Place {i}"}
+        for i in range(N_TITLES)
+    ]
+    start = time.perf_counter()
+    index = SuggestIndex("bench", entries)
+    print(f"build: {len(index)} titles in {(time.perf_counter() - start) * 1000:.0f} ms\n")
+
+    slow = []
+    for q in QUERIES:
+        hits = len(index.suggest(q, LIMIT))
+        start = time.perf_counter()
+        for _ in range(RUNS):
+            index.suggest(q, LIMIT)
+        ms = (time.perf_counter() - start) / RUNS * 1000
+        print(f"{q!r:>15}: {hits:>2} hits, {ms:.3f} ms")
+        if ms >= 1:
+            slow.append(q)
+    assert not slow, f"lookups of a millisecond or more: {slow}"
+
+
+if __name__ == "__main__":
+    main()
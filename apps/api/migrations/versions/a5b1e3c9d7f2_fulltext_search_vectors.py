@@ -0,0 +1,35 @@
+"""fulltext search vectors
+
+Revision ID: a5b1e3c9d7f2
+Revises: f4a0d2b8c3e5
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5b1e3c9d7f2'
+down_revision = 'f4a0d2b8c3e5'
+branch_labels = None
+depends_on = None
+
+# Same expression as api.core.search.vector_sql() at this revision
+VECTOR = (
+    "setweight(to_tsvector('russian', translate(coalesce(title_ru, '') || ' ' || coalesce(title_en, ''), 'ёЁ', 'еЕ')), 'A') || "
+    "setweight(to_tsvector('simple', translate(coalesce(title_ru, '') || ' ' || coalesce(title_en, ''), 'ёЁ', 'еЕ')), 'A') || "
+    "setweight(to_tsvector('russian', translate(coalesce(description_ru, '') || ' ' || coalesce(description_en, ''), 'ёЁ', 'еЕ')), 'B')"
+)
+
+
+def upgrade():
+    for table in ('poi', 'tour'):
+        op.execute(f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({VECTOR}) STORED")
+        op.execute(f"CREATE INDEX ix_{table}_search_vector ON {table} USING GIN (search_vector)")
+
+
+def downgrade():
+    for table in ('tour', 'poi'):
+        op.execute(f"DROP INDEX IF EXISTS ix_{table}_search_vector")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,43 @@
+"""trigram search indexes
+
+Revision ID: b6c2f4d0e8a1
+Revises: a5b1e3c9d7f2
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6c2f4d0e8a1'
+down_revision = 'a5b1e3c9d7f2'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('ix_city_name_ru_trgm', 'city', 'name_ru'),
+    ('ix_city_slug_trgm', 'city', 'slug'),
+    ('ix_poi_title_ru_trgm', 'poi', 'title_ru'),
+    ('ix_poi_description_ru_trgm', 'poi', 'description_ru'),
+    ('ix_tour_title_ru_trgm', 'tour', 'title_ru'),
+    ('ix_poi_media_author_trgm', 'poi_media', 'author'),
+    ('ix_poi_media_url_trgm', 'poi_media', 'url'),
+    ('ix_tour_media_author_trgm', 'tour_media', 'author'),
+    ('ix_tour_media_url_trgm', 'tour_media', 'url'),
+    ('ix_user_identities_provider_id_trgm', 'user_identities', 'provider_id'),
+    ('ix_qr_mappings_code_trgm', 'qr_mappings', 'code'),
+    ('ix_qr_mappings_label_trgm', 'qr_mappings', 'label'),
+]
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, column in INDEXES:
+        op.create_index(name, table, [column], unique=False,
+                        postgresql_using='gin', postgresql_ops={column: 'gin_trgm_ops'})
+
+
+def downgrade():
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
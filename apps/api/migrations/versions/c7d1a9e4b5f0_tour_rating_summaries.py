@@ -0,0 +1,47 @@
+"""tour_rating_summaries
+
+Revision ID: c7d1a9e4b5f0
+Revises: add_helper_place_fields
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d1a9e4b5f0'
+down_revision = 'add_helper_place_fields'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('tour_rating_summaries',
+        sa.Column('tour_id', sa.Uuid(), nullable=False),
+        sa.Column('rating_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('rating_sum', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('stars_1', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('stars_2', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('stars_3', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('stars_4', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('stars_5', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.ForeignKeyConstraint(['tour_id'], ['tour.id'], ),
+        sa.PrimaryKeyConstraint('tour_id')
+    )
+    # Backfill from existing ratings
+    op.execute("""
+        INSERT INTO tour_rating_summaries
+            (tour_id, rating_count, rating_sum, stars_1, stars_2, stars_3, stars_4, stars_5, updated_at)
+        SELECT tour_id, COUNT(*), SUM(rating),
+               COUNT(*) FILTER (WHERE rating = 1), COUNT(*) FILTER (WHERE rating = 2),
+               COUNT(*) FILTER (WHERE rating = 3), COUNT(*) FILTER (WHERE rating = 4),
+               COUNT(*) FILTER (WHERE rating = 5), now()
+        FROM tour_ratings
+        GROUP BY tour_id
+    """)
+
+
+def downgrade():
+    op.drop_table('tour_rating_summaries')
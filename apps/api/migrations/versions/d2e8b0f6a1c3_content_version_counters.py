@@ -0,0 +1,30 @@
+"""content_versions ETag counters
+
+Revision ID: d2e8b0f6a1c3
+Revises: c7d1a9e4b5f0
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2e8b0f6a1c3'
+down_revision = 'c7d1a9e4b5f0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('content_versions',
+        sa.Column('entity', sa.String(), nullable=False),
+        sa.Column('city_slug', sa.String(), nullable=False, server_default=''),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('entity', 'city_slug')
+    )
+
+
+def downgrade():
+    op.drop_table('content_versions')
@@ -0,0 +1,30 @@
+"""keyset pagination indexes
+
+Revision ID: e3f9c1a7b2d4
+Revises: d2e8b0f6a1c3
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f9c1a7b2d4'
+down_revision = 'd2e8b0f6a1c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_poi_city_updated_id', 'poi', ['city_slug', 'updated_at', 'id'], unique=False)
+    op.create_index('ix_poi_updated_id', 'poi', ['updated_at', 'id'], unique=False)
+    op.create_index('ix_entitlement_grants_granted_id', 'entitlement_grants', ['granted_at', 'id'], unique=False)
+    op.create_index('ix_users_created_id', 'users', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_users_created_id', table_name='users')
+    op.drop_index('ix_entitlement_grants_granted_id', table_name='entitlement_grants')
+    op.drop_index('ix_poi_updated_id', table_name='poi')
+    op.drop_index('ix_poi_city_updated_id', table_name='poi')
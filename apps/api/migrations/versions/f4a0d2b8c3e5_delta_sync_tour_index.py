@@ -0,0 +1,24 @@
+"""delta sync tour index
+
+Revision ID: f4a0d2b8c3e5
+Revises: e3f9c1a7b2d4
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f4a0d2b8c3e5'
+down_revision = 'e3f9c1a7b2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_tour_city_updated_id', 'tour', ['city_slug', 'updated_at', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_tour_city_updated_id', table_name='tour')
@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Rebuild tour_rating_summaries from tour_ratings (repairs drift).
+
+Usage (from apps/api):
+    python scripts/rebuild_rating_summaries.py            # all tours
+    python scripts/rebuild_rating_summaries.py <tour_id>  # one tour
+"""
+import sys
+import uuid
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+api_dir = Path(__file__).resolve().parent.parent
+load_dotenv(api_dir / '.env')
+sys.path.insert(0, str(api_dir))
+
+from sqlmodel import Session  # noqa: E402
+
+from api.core.database import engine  # noqa: E402
+from api.core.rating_summary import rebuild_rating_summaries  # noqa: E402
+
+
+def main():
+    tour_id = uuid.UUID(sys.argv[1]) if len(sys.argv) > 1 else None
+    with Session(engine) as session:
+        written = rebuild_rating_summaries(session, tour_id)
+    scope = f"tour {tour_id}" if tour_id else "all tours"
+    print(f"Rebuilt {written} rating summaries ({scope})")
+
+
+if __name__ == "__main__":
+    main()
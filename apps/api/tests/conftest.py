@@ -23,7 +23,7 @@ def db_session_fixture():
 def mock_env(monkeypatch):
     # Ensure critical envs are present to avoid config crash during imports
     monkeypatch.setenv("DATABASE_URL", "sqlite:///:memory:")
-    monkeypatch.setenv("JWT_SECRET", "test_secret_key_32_chars_long!!")
+    monkeypatch.setenv("JWT_SECRET", "test_secret_key_32_chars_long!!!")
     # We can also mock other vars if needed
 
 
@@ -0,0 +1,121 @@
+"""
+Query-budget harness: records SQL statements per request and fails when a
+route exceeds its declared budget.
+
+Runs against a seeded throwaway PostgreSQL/PostGIS database given by
+QUERY_BUDGET_DATABASE_URL (the database name must contain "test"; the schema
+is dropped and recreated). Without it the budget tests are skipped, the
+route-coverage check still runs.
+"""
+import importlib
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+import pytest
+from sqlalchemy import event
+
+# Routers under budget, in mount order (first match wins for duplicate paths,
+# same as apps/api/index.py).
+BUDGETED_MODULES = [
+    "api.public",
+    "api.map",
+    "api.admin.analytics",
+    "api.admin.audit",
+    "api.admin.cities",
+    "api.admin.entitlements",
+    "api.admin.helpers",
+    "api.admin.itineraries",
+    "api.admin.jobs",
+    "api.admin.media",
+    "api.admin.poi",
+    "api.admin.qrcodes",
+    "api.admin.ratings",
+    "api.admin.settings",
+    "api.admin.tours",
+    "api.admin.users",
+    "api.admin.validation",
+    "api.billing.router",
+    "api.analytics.router",
+]
+
+
+def budgeted_routers():
+    """(module, router) pairs in mount order."""
+    return [(name, importlib.import_module(name).router) for name in BUDGETED_MODULES]
+
+
+def query_budget(max_queries: int):
+    """Mark a test: every request made through budget_client may run at most max_queries statements."""
+    return pytest.mark.query_budget(max_queries)
+
+
+@dataclass
+class RouteBudget:
+    method: str
+    path: str  # route template, placeholders filled from the seed
+    budget: int
+    params: dict = field(default_factory=dict)
+    status: int = 200
+    json: Optional[dict] = None
+
+
+class QueryRecorder:
+    """Collects statements from the instrumented engines while active."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.active = False
+        self.statements: list[str] = []
+
+    def attach(self, engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def detach(self, engine) -> None:
+        event.remove(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active:
+            with self._lock:
+                self.statements.append(statement)
+
+    def start(self) -> None:
+        with self._lock:
+            self.statements = []
+        self.active = True
+
+    def stop(self) -> list[str]:
+        self.active = False
+        with self._lock:
+            return list(self.statements)
+
+
+class BudgetClient:
+    """TestClient wrapper asserting the per-request query budget."""
+
+    def __init__(self, client, recorder: QueryRecorder, default_budget: Optional[int] = None):
+        self.client = client
+        self.recorder = recorder
+        self.default_budget = default_budget
+
+    def request(self, method: str, url: str, budget: Optional[int] = None, **kwargs):
+        budget = self.default_budget if budget is None else budget
+        self.recorder.start()
+        try:
+            response = self.client.request(method, url, **kwargs)
+        finally:
+            statements = self.recorder.stop()
+        if budget is not None and len(statements) > budget:
+            listing = "\n".join(f"  {i + 1}. {s.strip()[:200]}" for i, s in enumerate(statements))
+            pytest.fail(
+                f"{method} {url} ran {len(statements)} queries, budget is {budget}:\n{listing}",
+                pytrace=False,
+            )
+        response.query_count = len(statements)
+        return response
+
+    def get(self, url: str, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        return self.request("POST", url, **kwargs)
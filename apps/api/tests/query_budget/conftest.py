@@ -0,0 +1,281 @@
+"""
+Fixtures for the query-budget suite (see budget_harness.py).
+"""
+import os
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+
+from budget_harness import BudgetClient, QueryRecorder, budgeted_routers
+
+# Seed sizes: large enough that any per-row query blows every budget
+N_CITIES = 30
+N_POIS = 400
+N_TOURS = 200
+ITEMS_PER_TOUR = 8
+N_USERS = 200
+N_RATINGS = 600
+N_ITINERARIES = 60
+N_HELPERS = 200
+N_FUNNELS = 20
+
+CITY = "budget_city"
+PAID_DEVICE = "budget-device-paid"
+
+
+def _budget_db_url():
+    url = os.getenv("QUERY_BUDGET_DATABASE_URL")
+    if not url:
+        pytest.skip("QUERY_BUDGET_DATABASE_URL not set (seeded PostgreSQL/PostGIS required)")
+    if "test" not in (make_url(url).database or ""):
+        pytest.fail("QUERY_BUDGET_DATABASE_URL must point to a throwaway *test* database (schema is recreated)")
+    return url
+
+
+@pytest.fixture(scope="session")
+def budget_engines():
+    from sqlmodel import SQLModel, create_engine
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from api.core import models  # noqa: F401 - register tables
+    from api.core.database import _async_url
+    from api.core.search import vector_sql
+
+    url = _budget_db_url()
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS postgis"))
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        # migration-only columns (not mapped on the models)
+        for table in ("poi", "tour"):
+            conn.execute(text(
+                f"ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector_sql()}) STORED"
+            ))
+
+    async_engine = create_async_engine(_async_url(url))
+    yield SimpleNamespace(sync=engine, async_=async_engine)
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def seed(budget_engines):
+    from geoalchemy2.elements import WKTElement
+    from sqlmodel import Session
+    from api.core.clusters import CELLS_PER_TILE, cell_xy
+    from api.core.rating_summary import rebuild_rating_summaries
+    from api.core.models import (
+        City, Poi, PoiMedia, PoiSource, Narration, Tour, TourItem, TourMedia,
+        Entitlement, EntitlementGrant, HelperPlace, User, UserIdentity, TourRating,
+        Itinerary, ItineraryItem, QRMapping, AuditLog, Job, Funnel, FunnelStep, AppSettings,
+    )
+
+    now = datetime.utcnow()
+    rows = []
+
+    cities = [City(slug=CITY, name_ru="Бюджетск")] + [
+        City(slug=f"budget_city_{i}", name_ru=f"Город {i}") for i in range(N_CITIES - 1)
+    ]
+    rows += cities
+
+    pois = []
+    for i in range(N_POIS):
+        lat, lon = 54.70 + i * 0.0005, 20.50 + i * 0.0005
+        poi = Poi(
+            title_ru=f"Точка {i}", description_ru="Описание точки интереса для проверки",
+            city_slug=CITY, lat=lat, lon=lon, geo=WKTElement(f"POINT({lon} {lat})", srid=4326),
+            published_at=now,
+        )
+        pois.append(poi)
+        rows += [
+            PoiMedia(poi_id=poi.id, url=f"https://cdn.test/poi/{i}.jpg", media_type="image",
+                     license_type="cc-by", author="test", source_page_url="https://test"),
+            Narration(poi_id=poi.id, url=f"https://cdn.test/poi/{i}.mp3", duration_seconds=60.0),
+            PoiSource(poi_id=poi.id, name="test"),
+        ]
+    rows += pois
+
+    tours, entitlements = [], []
+    for i in range(N_TOURS):
+        tour = Tour(title_ru=f"Тур {i}", city_slug=CITY, published_at=now, duration_minutes=60)
+        tours.append(tour)
+        rows.append(TourMedia(tour_id=tour.id, url=f"https://cdn.test/tour/{i}.jpg",
+                              license_type="cc-by", author="test", source_page_url="https://test"))
+        for j in range(ITEMS_PER_TOUR):
+            rows.append(TourItem(tour_id=tour.id, poi_id=pois[(i + j * 37) % N_POIS].id, order_index=j))
+        entitlements.append(Entitlement(
+            slug=f"tour_{tour.id}", scope="tour", ref=str(tour.id), title_ru=f"Тур {i}",
+            price_amount=0 if i % 10 == 0 else 299,
+        ))
+    city_entitlement = Entitlement(slug=f"{CITY}_access", scope="city", ref=CITY, title_ru="Город")
+    rows += tours + entitlements + [city_entitlement]
+
+    grants = [
+        EntitlementGrant(device_anon_id=PAID_DEVICE, entitlement_id=e.id, source="store",
+                         source_ref=f"budget-paid-{k}")
+        for k, e in enumerate(entitlements[:20])
+    ]
+    grants += [
+        EntitlementGrant(device_anon_id=f"budget-device-{k}", entitlement_id=entitlements[k % N_TOURS].id,
+                         source="store", source_ref=f"budget-grant-{k}")
+        for k in range(300)
+    ]
+    rows += grants
+
+    admin = User(role="admin")
+    users = [admin] + [User(role="user") for _ in range(N_USERS)]
+    for k, u in enumerate(users):
+        rows += [
+            UserIdentity(user_id=u.id, provider="phone", provider_id=f"+7900{k:07d}", last_login=now),
+            UserIdentity(user_id=u.id, provider="telegram", provider_id=f"{k}"),
+        ]
+    rows += users
+
+    ratings = [
+        TourRating(tour_id=tours[k % N_TOURS].id, device_anon_id=f"budget-device-{k}", rating=1 + k % 5)
+        for k in range(N_RATINGS)
+    ]
+    rows += ratings
+
+    itineraries = [Itinerary(city_slug=CITY, device_anon_id=f"budget-device-{k}") for k in range(N_ITINERARIES)]
+    for k, it in enumerate(itineraries):
+        rows += [ItineraryItem(itinerary_id=it.id, poi_id=pois[(k * 7 + j) % N_POIS].id, order_index=j)
+                 for j in range(5)]
+    rows += itineraries
+
+    helpers = [
+        HelperPlace(city_slug=CITY, type="toilet" if k % 2 else "cafe", lat=54.7 + k * 0.001,
+                    lon=20.5 + k * 0.001, geo=WKTElement(f"POINT({20.5 + k * 0.001} {54.7 + k * 0.001})", srid=4326))
+        for k in range(N_HELPERS)
+    ]
+    rows += helpers
+
+    qr = [QRMapping(code=f"BGT{k:04d}", target_type="poi", target_id=pois[k].id) for k in range(100)]
+    audit = [AuditLog(action="TEST", target_id=p.id, actor_fingerprint="seed") for p in pois[:100]]
+    jobs = [Job(type="test", status="COMPLETED", created_at=now - timedelta(minutes=k)) for k in range(50)]
+    funnels = [Funnel(name=f"Воронка {k}") for k in range(N_FUNNELS)]
+    for f in funnels:
+        rows += [FunnelStep(funnel_id=f.id, order_index=s, event_type=f"step_{s}") for s in range(3)]
+    settings = [AppSettings(key=f"{prefix}.enabled", value="true") for prefix in ("notifications", "ai", "location", "general")]
+    rows += qr + audit + jobs + funnels + settings
+
+    with Session(budget_engines.sync, expire_on_commit=False) as session:
+        # Parents first: FKs are checked per statement
+        session.add_all(cities)
+        session.flush()
+        session.add_all(rows[len(cities):])
+        session.commit()
+        rebuild_rating_summaries(session)
+
+    return SimpleNamespace(
+        admin=admin,
+        ids={
+            "city": CITY,
+            "slug": CITY,
+            "city_id": cities[0].id,
+            "poi_id": pois[0].id,
+            "tour_id": tours[1].id,
+            "itinerary_id": itineraries[0].id,
+            "entitlement_id": entitlements[1].id,
+            "helper_id": helpers[0].id,
+            "job_id": jobs[0].id,
+            "log_id": audit[0].id,
+            "rating_id": ratings[0].id,
+            "user_id": users[1].id,
+            "funnel_id": funnels[0].id,
+            "code": qr[0].code,
+            "share_id": "missing",
+            "device": PAID_DEVICE,
+            "lat": pois[0].lat,
+            "lon": pois[0].lon,
+            "bbox": f"{pois[0].lon - 0.05},{pois[0].lat - 0.05},{pois[0].lon + 0.05},{pois[0].lat + 0.05}",
+            "z": 14,
+            "x": cell_xy(pois[0].lat, pois[0].lon, 14)[0] // CELLS_PER_TILE,
+            "y": cell_xy(pois[0].lat, pois[0].lon, 14)[1] // CELLS_PER_TILE,
+        },
+    )
+
+
+@pytest.fixture(scope="session")
+def budget_app(budget_engines, seed):
+    from fastapi import FastAPI
+    from fastapi.routing import APIRoute
+    from sqlmodel import Session
+    from sqlmodel.ext.asyncio.session import AsyncSession
+    from api.auth.deps import get_current_user, get_current_user_optional
+    from api.public import limiter
+
+    app = FastAPI()
+    app.state.limiter = limiter
+    calls = set()
+
+    def walk(dependant):
+        for dep in dependant.dependencies:
+            if dep.call is not None:
+                calls.add(dep.call)
+            walk(dep)
+
+    for module, router in budgeted_routers():
+        app.include_router(router, prefix="/v1")
+        for route in router.routes:
+            if isinstance(route, APIRoute):
+                walk(route.dependant)
+
+    def sync_session():
+        with Session(budget_engines.sync) as session:
+            yield session
+
+    async def async_session():
+        async with AsyncSession(budget_engines.async_, expire_on_commit=False) as session:
+            yield session
+
+    # Every module has its own get_session; override them all by name
+    for call in calls:
+        name = getattr(call, "__name__", "")
+        if name in ("get_session", "get_read_session"):
+            app.dependency_overrides[call] = sync_session
+        elif name in ("get_async_session", "get_async_read_session"):
+            app.dependency_overrides[call] = async_session
+    app.dependency_overrides[get_current_user] = lambda: seed.admin
+    app.dependency_overrides[get_current_user_optional] = lambda: seed.admin
+    return app
+
+
+@pytest.fixture(scope="session")
+def query_recorder(budget_engines):
+    recorder = QueryRecorder()
+    recorder.attach(budget_engines.sync)
+    recorder.attach(budget_engines.async_.sync_engine)
+    yield recorder
+    recorder.detach(budget_engines.sync)
+    recorder.detach(budget_engines.async_.sync_engine)
+
+
+@pytest.fixture
+def budget_client(request, budget_app, query_recorder):
+    """
+    Client whose requests are checked against the test's @query_budget(n),
+    or an explicit budget= per request.
+    """
+    from fastapi.testclient import TestClient
+    from api.core.caching import reset_response_cache
+    from api.core.precompressed import reset_public_blobs
+    from api.core.spatial_index import reset_spatial_indexes
+    from api.core.suggest import reset_suggest_indexes
+
+    # Budgets are for a cold response cache
+    reset_response_cache()
+    reset_public_blobs()
+    reset_spatial_indexes()
+    reset_suggest_indexes()
+    marker = request.node.get_closest_marker("query_budget")
+    with TestClient(budget_app) as client:
+        yield BudgetClient(client, query_recorder, marker.args[0] if marker else None)
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "query_budget(n): max SQL statements per request made via budget_client")
@@ -0,0 +1,176 @@
+"""
+Query budgets per route (public, admin, billing, analytics).
+
+Budgets are constants: a route whose query count grows with the seed
+(per-row lookups) cannot pass. Routes with a known N+1 are xfail(strict=True),
+so fixing one fails the suite until its mark is removed.
+"""
+from urllib.parse import urlencode
+
+import pytest
+from fastapi.routing import APIRoute
+
+from budget_harness import RouteBudget, budgeted_routers, query_budget
+
+
+def n_plus_one(reason: str):
+    return pytest.mark.xfail(strict=True, reason=f"N+1: {reason}")
+
+
+def shadowed(reason: str):
+    return pytest.mark.xfail(strict=True, reason=f"Route shadowed: {reason}")
+
+
+CITY_Q = {"city": "{city}"}
+
+ROUTE_BUDGETS = [
+    # --- public.py ---
+    RouteBudget("GET", "/public/tours/{tour_id}/manifest", 8, {"city": "{city}", "device_anon_id": "{device}"}),
+    RouteBudget("GET", "/public/poi/{poi_id}", 5, {"city": "{city}", "device_anon_id": "{device}"}),
+    RouteBudget("GET", "/public/nearby", 3, {"city": "{city}", "lat": "{lat}", "lon": "{lon}"}),  # cold index build; 0 while fresh
+    RouteBudget("GET", "/public/cities", 2),
+    RouteBudget("GET", "/public/catalog", 4, CITY_Q),
+    RouteBudget("GET", "/public/map/attribution", 0),
+    RouteBudget("GET", "/public/tiles/{z}/{x}/{y}.mvt", 2, CITY_Q),  # cold; 1 once the tile is stored
+    RouteBudget("GET", "/public/helpers", 2, CITY_Q),
+    RouteBudget("GET", "/public/search", 2, {"city": "{city}", "q": "тест"}),
+    RouteBudget("GET", "/public/cities/{slug}/suggest", 3, {"q": "точ"}),  # cold index build; 0 while fresh
+    RouteBudget("GET", "/public/cities/{slug}", 1),
+    RouteBudget("GET", "/public/cities/{slug}/pois", 3),
+    RouteBudget("GET", "/public/cities/{slug}/tours", 2),
+    RouteBudget("GET", "/public/cities/{slug}/clusters", 3, {"bbox": "{bbox}", "zoom": "14"}),  # cold index build
+    RouteBudget("GET", "/public/cities/{slug}/offline-manifest", 8),  # cold; 2 once the body is stored
+    RouteBudget("GET", "/public/cities/{slug}/changes", 6),
+    RouteBudget("GET", "/public/itineraries/{itinerary_id}", 2),
+    RouteBudget("GET", "/public/itineraries/{itinerary_id}/manifest", 4),
+    RouteBudget("GET", "/public/share/trip/{share_id}", 0, status=404),
+    RouteBudget("GET", "/public/tours/{tour_id}/ratings", 2),
+    RouteBudget("GET", "/public/tours/{tour_id}/my-rating", 1, {"device_anon_id": "{device}"}),
+    RouteBudget("GET", "/public/qr/{code}", 2),
+    # --- admin/analytics.py ---
+    pytest.param(RouteBudget("GET", "/admin/analytics/funnels", 2), marks=n_plus_one("steps query per funnel")),
+    RouteBudget("GET", "/admin/analytics/funnels/{funnel_id}/conversions", 2),
+    RouteBudget("GET", "/admin/analytics/retention", 1),
+    RouteBudget("GET", "/admin/analytics/cohorts", 1),
+    RouteBudget("GET", "/admin/analytics/overview", 7),  # top-5 title lookups are bounded
+    RouteBudget("GET", "/admin/analytics/heatmap", 1),
+    # --- admin/audit.py ---
+    RouteBudget("GET", "/admin/audit/logs", 1),
+    RouteBudget("GET", "/admin/audit/logs/{log_id}", 1),
+    # --- admin/cities.py ---
+    pytest.param(RouteBudget("GET", "/admin/cities", 2), marks=n_plus_one("POI and tour count per city")),
+    RouteBudget("GET", "/admin/cities/{city_id}", 3),
+    # --- admin/entitlements.py ---
+    pytest.param(RouteBudget("GET", "/admin/entitlements", 2), marks=n_plus_one("ref title lookup per entitlement")),
+    RouteBudget("GET", "/admin/entitlements/{entitlement_id}", 1),
+    pytest.param(RouteBudget("GET", "/admin/entitlement-grants", 2), marks=n_plus_one("entitlement lookup per grant")),
+    # --- admin/helpers.py ---
+    RouteBudget("GET", "/admin/helpers", 2),
+    RouteBudget("GET", "/admin/helpers/{helper_id}", 1),
+    RouteBudget("GET", "/admin/helpers/types/list", 0),
+    pytest.param(RouteBudget("GET", "/admin/helpers/stats", 1), marks=shadowed("/admin/helpers/{helper_id} matches first")),
+    # --- admin/itineraries.py ---
+    pytest.param(RouteBudget("GET", "/admin/itineraries", 2), marks=n_plus_one("city + item count per itinerary")),
+    RouteBudget("GET", "/admin/itineraries/stats", 4),
+    pytest.param(RouteBudget("GET", "/admin/itineraries/{itinerary_id}", 3), marks=n_plus_one("POI lookup per item")),
+    # --- admin/jobs.py ---
+    RouteBudget("GET", "/admin/jobs", 2),
+    RouteBudget("GET", "/admin/jobs/{job_id}", 1),
+    # --- admin/media.py ---
+    RouteBudget("GET", "/admin/media", 2),
+    RouteBudget("GET", "/admin/media", 2, {"search": "tset"}),  # typo: similarity match
+    # --- admin/poi.py ---
+    RouteBudget("GET", "/admin/pois", 2),
+    RouteBudget("GET", "/admin/pois", 2, {"search": "тест", "search_mode": "fulltext"}),
+    RouteBudget("GET", "/admin/pois", 2, {"search": "тест"}),
+    RouteBudget("GET", "/admin/pois/{poi_id}", 4),
+    pytest.param(RouteBudget("GET", "/admin/pois/export", 1), marks=shadowed("/admin/pois/{poi_id} matches first")),
+    RouteBudget("GET", "/admin/pois/{poi_id}/publish_check", 1),
+    # --- admin/qrcodes.py ---
+    RouteBudget("GET", "/admin/qr-mappings", 1),
+    RouteBudget("GET", "/admin/qr-mappings", 1, {"search": "SPB"}),
+    # --- admin/ratings.py ---
+    pytest.param(RouteBudget("GET", "/admin/ratings", 2), marks=n_plus_one("tour lookup per rating")),
+    RouteBudget("GET", "/admin/ratings/stats", 1),
+    RouteBudget("GET", "/admin/ratings/{rating_id}", 2),
+    # --- admin/settings.py ---
+    RouteBudget("GET", "/admin/settings/notifications", 1),
+    RouteBudget("GET", "/admin/settings/ai", 1),
+    RouteBudget("GET", "/admin/settings/location", 1),
+    RouteBudget("GET", "/admin/settings/general", 1),
+    # --- admin/tours.py ---
+    RouteBudget("GET", "/admin/tours", 2),
+    RouteBudget("GET", "/admin/tours", 2, {"search": "тест", "search_mode": "fulltext"}),
+    pytest.param(RouteBudget("GET", "/admin/tours/{tour_id}", 6), marks=n_plus_one("lazy POI per tour item")),
+    pytest.param(RouteBudget("GET", "/admin/tours/{tour_id}/publish_check", 3), marks=n_plus_one("lazy POI per tour item")),
+    RouteBudget("GET", "/admin/content/issues", 0),  # admin/tours.py stub is mounted first
+    # --- admin/users.py ---
+    pytest.param(RouteBudget("GET", "/admin/users", 1), marks=n_plus_one("identities query per user")),
+    RouteBudget("GET", "/admin/users/{user_id}", 2),
+    # --- billing/router.py ---
+    pytest.param(RouteBudget("GET", "/billing/entitlements", 1, {"device_anon_id": "{device}"}),
+                 marks=n_plus_one("lazy entitlement per grant")),
+    RouteBudget("GET", "/billing/restore/{job_id}", 1),
+    # --- analytics/router.py ---
+    RouteBudget("GET", "/analytics/stats", 1),
+]
+
+
+def _entries():
+    return [p.values[0] if hasattr(p, "values") else p for p in ROUTE_BUDGETS]
+
+
+def _fill(template: str, ids: dict) -> str:
+    return template.format(**ids)
+
+
+def test_every_get_route_has_budget():
+    """A new GET route in a budgeted module must declare its query budget here."""
+    declared = {(b.method, b.path) for b in _entries()}
+    missing = []
+    for module, router in budgeted_routers():
+        for route in router.routes:
+            if isinstance(route, APIRoute) and "GET" in route.methods and ("GET", route.path) not in declared:
+                missing.append(f"{module}: GET {route.path}")
+    assert not missing, "Routes without a query budget:\n" + "\n".join(missing)
+
+
+@pytest.mark.parametrize("entry", ROUTE_BUDGETS, ids=lambda b: f"{b.method} {b.path}")
+def test_route_query_budget(entry: RouteBudget, budget_client, seed):
+    url = "/v1" + _fill(entry.path, seed.ids)
+    params = {k: _fill(str(v), seed.ids) for k, v in entry.params.items()}
+    if params:
+        url += "?" + urlencode(params)
+
+    response = budget_client.request(entry.method, url, budget=entry.budget, json=entry.json)
+    assert response.status_code == entry.status, response.text[:500]
+
+
+@query_budget(3)
+def test_public_city_pois_budget_is_page_independent(budget_client, seed):
+    for page in (1, 2, 5):
+        response = budget_client.get(f"/v1/public/cities/{seed.ids['slug']}/pois?page={page}&per_page=50")
+        assert response.status_code == 200
+
+
+@query_budget(3)
+def test_rate_tour_budget(budget_client, seed):
+    response = budget_client.post(
+        f"/v1/public/tours/{seed.ids['tour_id']}/rate",
+        json={"rating": 5, "device_anon_id": "budget-device-rater"},
+    )
+    assert response.status_code == 200
+
+
+@query_budget(1)
+def test_sql_clusters_budget_is_zoom_independent(budget_client, seed, monkeypatch):
+    """Without the in-process index a crowded viewport is coarsened in the same statement."""
+    from api.core.config import config
+    monkeypatch.setattr(config, "SPATIAL_INDEX_ENABLED", False)
+    monkeypatch.setattr(config, "CLUSTER_MAX_FEATURES", 5)
+    response = budget_client.get(
+        f"/v1/public/cities/{seed.ids['slug']}/clusters?bbox=20.4,54.6,20.8,55.0&zoom=18&types=poi,helper"
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert body["zoom"] < 18 and 0 < len(body["features"]) <= 5
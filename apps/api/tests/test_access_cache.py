@@ -0,0 +1,231 @@
+"""
+Unit-тесты для кэша решений о доступе (core/access_cache.py)
+"""
+import asyncio
+
+import pytest
+
+
+class _Store:
+    """Minimal shared Redis state for the sync and async fakes."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.sets = {}
+        self.strings = {}
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+        self.sets.pop(key, None)
+        self.strings.pop(key, None)
+
+
+class _SyncPipeline:
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def incr(self, key):
+        self.ops.append(lambda: self.store.strings.__setitem__(key, str(int(self.store.strings.get(key, 0)) + 1)))
+
+    def expire(self, key, seconds):
+        pass
+
+    def delete(self, key):
+        self.ops.append(lambda: self.store.delete(key))
+
+    def execute(self):
+        return [op() for op in self.ops]
+
+
+class _SyncRedis:
+    def __init__(self, store):
+        self.store = store
+
+    def pipeline(self):
+        return _SyncPipeline(self.store)
+
+
+class _AsyncPipeline:
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def hget(self, key, field):
+        self.ops.append(lambda: self.store.hashes.get(key, {}).get(field))
+
+    def get(self, key):
+        self.ops.append(lambda: self.store.strings.get(key))
+
+    def smembers(self, key):
+        self.ops.append(lambda: set(self.store.sets.get(key, set())))
+
+    incr = _SyncPipeline.incr
+    expire = _SyncPipeline.expire
+    delete = _SyncPipeline.delete
+
+    async def execute(self):
+        return [op() for op in self.ops]
+
+
+class _AsyncRedis:
+    def __init__(self, store):
+        self.store = store
+
+    async def eval(self, script, numkeys, key, generation_key, generation, *args):
+        from api.core.access_cache import _STORE_FREE_TOURS_IF_GENERATION
+        if self.store.strings.get(generation_key, "") != generation:
+            return 0
+        if script == _STORE_FREE_TOURS_IF_GENERATION:
+            self.store.sets[key] = set(args[1:])
+        else:  # _SET_IF_GENERATION
+            field, value, ttl = args
+            self.store.hashes.setdefault(key, {})[field] = value
+        return 1
+
+    def pipeline(self):
+        return _AsyncPipeline(self.store)
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    from api.core import access_cache
+    monkeypatch.setattr(access_cache, "redis_client", None)
+    monkeypatch.setattr(access_cache, "async_redis_client", None)
+    monkeypatch.setattr(access_cache, "_local_access", {})
+    monkeypatch.setattr(access_cache, "_free_tours", None)
+    return access_cache
+
+
+@pytest.fixture
+def shared(cache, monkeypatch):
+    store = _Store()
+    monkeypatch.setattr(cache, "redis_client", _SyncRedis(store))
+    monkeypatch.setattr(cache, "async_redis_client", _AsyncRedis(store))
+    return store
+
+
+def _get(cache, device, tour_id):
+    return asyncio.run(cache.get_cached_access(device, "city", tour_id))[0]
+
+
+def _check(cache, device, tour_id, allowed):
+    """What check_access does on a miss: read the generation, then store the decision."""
+    _, generation = asyncio.run(cache.get_cached_access(device, "city", tour_id))
+    asyncio.run(cache.set_cached_access(device, "city", tour_id, allowed, generation))
+
+
+def test_local_layer_keeps_only_positive_decisions(cache):
+    _check(cache, "dev-1", "t1", True)
+    _check(cache, "dev-1", "t2", False)
+    assert _get(cache, "dev-1", "t1") is True
+    # A local "no" could hide a purchase made through another worker
+    assert _get(cache, "dev-1", "t2") is None
+
+
+def test_redis_layer_keeps_both_and_invalidates_per_device(cache, shared):
+    _check(cache, "dev-1", "t1", True)
+    _check(cache, "dev-1", None, False)
+    _check(cache, "dev-2", None, True)
+    assert _get(cache, "dev-1", None) is False
+
+    cache.invalidate_access("dev-1")
+    assert _get(cache, "dev-1", "t1") is None
+    assert _get(cache, "dev-1", None) is None
+    assert _get(cache, "dev-2", None) is True
+
+
+def test_decision_read_before_invalidation_is_not_stored(cache, shared):
+    _, generation = asyncio.run(cache.get_cached_access("dev-1", "city", None))
+    # purchase commits and invalidates while the "no" is being read from the DB
+    cache.invalidate_access("dev-1")
+    asyncio.run(cache.set_cached_access("dev-1", "city", None, False, generation))
+    assert _get(cache, "dev-1", None) is None
+
+    _check(cache, "dev-1", None, True)
+    assert _get(cache, "dev-1", None) is True
+
+
+def test_async_invalidation_matches_sync(cache, shared):
+    _check(cache, "dev-1", "t1", True)
+    _, generation = asyncio.run(cache.get_cached_access("dev-2", "city", None))
+    asyncio.run(cache.invalidate_access_async("dev-1"))
+    asyncio.run(cache.invalidate_access_async("dev-2"))
+    asyncio.run(cache.set_cached_access("dev-2", "city", None, False, generation))
+    assert _get(cache, "dev-1", "t1") is None
+    assert _get(cache, "dev-2", None) is None
+
+
+def test_local_positive_expires(cache, monkeypatch):
+    monkeypatch.setattr(cache.config, "ACCESS_CACHE_LOCAL_TTL_SECONDS", 0)
+    _check(cache, "dev-1", "t1", True)
+    assert _get(cache, "dev-1", "t1") is None
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class _Session:
+    def __init__(self, refs):
+        self.refs = refs
+        self.calls = 0
+
+    async def exec(self, query):
+        self.calls += 1
+        return _Result(list(self.refs))
+
+
+def test_free_tour_ids_loaded_once_and_shared(cache, shared):
+    session = _Session(["t1", "t2"])
+    assert asyncio.run(cache.get_free_tour_ids(session)) == {"t1", "t2"}
+    assert asyncio.run(cache.get_free_tour_ids(session)) == {"t1", "t2"}
+    assert session.calls == 1
+
+    # Another worker (empty local copy) reads the Redis set, not the DB
+    cache._free_tours = None
+    assert asyncio.run(cache.get_free_tour_ids(_Session([]))) == {"t1", "t2"}
+
+
+def test_free_tours_empty_set_is_cached(cache, shared):
+    session = _Session([])
+    assert asyncio.run(cache.get_free_tour_ids(session)) == frozenset()
+    cache._free_tours = None
+    assert asyncio.run(cache.get_free_tour_ids(session)) == frozenset()
+    assert session.calls == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_invalidate_free_tours_reloads(cache, shared, use_async):
+    asyncio.run(cache.get_free_tour_ids(_Session(["t1"])))
+    if use_async:
+        asyncio.run(cache.invalidate_free_tours_async())
+    else:
+        cache.invalidate_free_tours()
+    assert asyncio.run(cache.get_free_tour_ids(_Session(["t1", "t3"]))) == {"t1", "t3"}
+
+
+class _InvalidatingSession(_Session):
+    """The entitlement change commits and invalidates while the old set is read."""
+
+    def __init__(self, refs, cache):
+        super().__init__(refs)
+        self.cache = cache
+
+    async def exec(self, query):
+        result = await super().exec(query)
+        self.cache.invalidate_free_tours()
+        return result
+
+
+def test_free_tours_read_before_invalidation_is_not_stored(cache, shared):
+    stale = asyncio.run(cache.get_free_tour_ids(_InvalidatingSession(["t1"], cache)))
+    assert stale == {"t1"}  # this request still answers from its own read
+    assert cache._free_tours is None
+    assert cache.FREE_TOURS_KEY not in shared.sets
+
+    assert asyncio.run(cache.get_free_tour_ids(_Session(["t1", "t3"]))) == {"t1", "t3"}
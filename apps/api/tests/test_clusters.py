@@ -0,0 +1,63 @@
+"""
+Unit-тесты для иерархических кластеров карты (core/clusters.py)
+"""
+import random
+
+import pytest
+
+BOX = (54.62, 20.36, 54.80, 20.66)  # min_lat, min_lon, max_lat, max_lon
+
+
+def _points(n=3000, seed=3):
+    rnd = random.Random(seed)
+    points = []
+    for i in range(n):
+        kind = "helper" if i % 5 == 0 else "poi"
+        p = {"kind": kind, "id": i, "title": f"p{i}",
+             "lat": BOX[0] + rnd.random() * (BOX[2] - BOX[0]), "lon": BOX[1] + rnd.random() * (BOX[3] - BOX[1])}
+        if kind == "helper":
+            p["helper_type"] = "cafe"
+        points.append(p)
+    return points
+
+
+def _total(features):
+    return sum(f["count"] if f["type"] == "cluster" else 1 for f in features)
+
+
+def test_cell_xy_matches_tile_grid():
+    from api.core.clusters import CELLS_PER_TILE, cell_xy
+    # Kaliningrad at zoom 10 is tile (570, 325)
+    x, y = cell_xy(54.71, 20.51, 10)
+    assert (x // CELLS_PER_TILE, y // CELLS_PER_TILE) == (570, 325)
+    assert cell_xy(0, -180, 0) == (0, CELLS_PER_TILE // 2)
+
+
+@pytest.mark.parametrize("zoom", [8, 12, 15, 18])
+def test_every_point_counted_once(zoom):
+    from api.core.clusters import ClusterTree
+    tree = ClusterTree(_points())
+    used, features = tree.query(*BOX, zoom, {"poi", "helper"}, 10_000)
+    assert used == zoom
+    assert _total(features) == 3000
+
+
+def test_crowded_viewport_steps_to_coarser_zoom():
+    from api.core.clusters import ClusterTree
+    tree = ClusterTree(_points())
+    used, features = tree.query(*BOX, 18, {"poi", "helper"}, 100)
+    assert used < 18 and len(features) <= 100
+    assert _total(features) == 3000
+
+
+def test_kinds_filter_and_single_points():
+    from api.core.clusters import ClusterTree
+    points = _points()
+    tree = ClusterTree(points)
+    _, features = tree.query(*BOX, 18, {"helper"}, 10_000)
+
+    assert _total(features) == 600
+    singles = [f for f in features if f["type"] != "cluster"]
+    assert singles and all(f["type"] == "helper" and f["helper_type"] == "cafe" for f in singles)
+    by_id = {p["id"]: p for p in points}
+    assert all(by_id[f["id"]]["lat"] == f["lat"] for f in singles)
@@ -0,0 +1,110 @@
+"""
+Unit-тесты для счётчиков версий контента (core/content_versions.py)
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlmodel import Session, SQLModel
+
+from api.core.models import City, ContentVersion, Tour, TourItem, TourMedia, TourSource
+from api.core.content_versions import bump_content_version
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine, tables=[
+        m.__table__ for m in (City, Tour, TourItem, TourSource, TourMedia, ContentVersion)
+    ])
+    with Session(engine) as s:
+        yield s
+
+
+def _version(session, entity, city_slug=""):
+    row = session.get(ContentVersion, (entity, city_slug), populate_existing=True)
+    return row.version if row else 0
+
+
+def test_writes_bump_entity_and_city_counters(session):
+    session.add(City(slug="kgd", name_ru="Калининград"))
+    session.add(Tour(title_ru="Тур", city_slug="kgd"))
+    session.commit()
+    assert _version(session, "city") == 1
+    assert _version(session, "tour") == 1
+    assert _version(session, "tour", "kgd") == 1
+    assert _version(session, "tour", "msk") == 0
+
+
+def test_tour_moved_between_cities_bumps_both(session):
+    tour = Tour(title_ru="Тур", city_slug="kgd")
+    session.add(tour)
+    session.commit()
+
+    tour.city_slug = "msk"
+    session.add(tour)
+    session.commit()
+    assert _version(session, "tour", "kgd") == 2
+    assert _version(session, "tour", "msk") == 1
+
+    session.delete(tour)
+    session.commit()
+    assert _version(session, "tour", "msk") == 2
+    assert _version(session, "tour") == 3
+
+
+def test_unmodified_and_rolled_back_flushes_do_not_bump(session):
+    tour = Tour(title_ru="Тур", city_slug="kgd")
+    session.add(tour)
+    session.commit()
+
+    session.add(tour)  # no attribute changes
+    session.commit()
+    assert _version(session, "tour", "kgd") == 1
+
+    tour.title_ru = "Новое название"
+    session.add(tour)
+    session.flush()
+    session.rollback()
+    assert _version(session, "tour", "kgd") == 1
+
+
+def test_marker_changes_only_with_version(session):
+    from api.core.caching import generate_version_marker
+
+    before = generate_version_marker(session, Tour, "kgd")
+    assert generate_version_marker(session, Tour, "kgd") == before
+    assert generate_version_marker(session, Tour, "msk") != before
+
+    bump_content_version(session, "tour", "kgd")
+    session.commit()
+    assert generate_version_marker(session, Tour, "kgd") != before
+
+
+def test_child_rows_bump_parent_city(session):
+    tour = Tour(title_ru="Тур", city_slug="kgd")
+    session.add(tour)
+    session.commit()
+
+    session.add(TourMedia(tour_id=tour.id, url="https://cdn.test/t.jpg", license_type="cc-by",
+                          author="test", source_page_url="https://test"))
+    session.commit()
+    assert _version(session, "tour", "kgd") == 2
+    assert _version(session, "tour", "msk") == 0
+
+
+def test_updated_at_moves_on_row_and_child_writes(session):
+    """Дельта-синхронизация опирается на updated_at родителя."""
+    from datetime import datetime
+    tour = Tour(title_ru="Тур", city_slug="kgd", updated_at=datetime(2026, 1, 1))
+    session.add(tour)
+    session.commit()
+
+    tour.published_at = None
+    tour.title_ru = "Новый тур"
+    session.commit()
+    assert session.get(Tour, tour.id, populate_existing=True).updated_at > datetime(2026, 1, 1)
+
+    tour.updated_at = datetime(2026, 1, 1)  # explicit value wins over onupdate
+    session.commit()
+    session.add(TourItem(tour_id=tour.id, order_index=1))
+    session.commit()
+    assert session.get(Tour, tour.id, populate_existing=True).updated_at > datetime(2026, 1, 1)
@@ -0,0 +1,72 @@
+"""
+Unit-тесты для настройки пула соединений (core/database.py)
+"""
+import pytest
+
+
+@pytest.fixture
+def db_module():
+    from api.core import database
+    return database
+
+
+def test_pool_limits_defaults(db_module, monkeypatch):
+    monkeypatch.setattr(db_module.config, "DB_POOL_SIZE", 5)
+    monkeypatch.setattr(db_module.config, "DB_MAX_OVERFLOW", 10)
+    monkeypatch.setattr(db_module.config, "DB_MAX_CONNECTIONS", 0)
+    assert db_module._pool_limits() == (5, 10)
+
+
+def test_pool_limits_capped_by_worker_budget(db_module, monkeypatch):
+    monkeypatch.setattr(db_module.config, "DB_POOL_SIZE", 10)
+    monkeypatch.setattr(db_module.config, "DB_MAX_OVERFLOW", 10)
+    monkeypatch.setattr(db_module.config, "DB_MAX_CONNECTIONS", 40)
+    monkeypatch.setattr(db_module.config, "WEB_CONCURRENCY", 4)
+
+    pool_size, max_overflow = db_module._pool_limits()
+    assert pool_size == 10
+    assert max_overflow == 0
+    assert (pool_size + max_overflow) * 4 <= 40
+
+
+def test_pool_limits_split_between_sync_and_async_engines(db_module, monkeypatch):
+    monkeypatch.setattr(db_module.config, "DB_POOL_SIZE", 10)
+    monkeypatch.setattr(db_module.config, "DB_MAX_OVERFLOW", 10)
+    monkeypatch.setattr(db_module.config, "DB_MAX_CONNECTIONS", 40)
+    monkeypatch.setattr(db_module.config, "WEB_CONCURRENCY", 4)
+
+    pool_size, max_overflow = db_module._pool_limits(engines=2)
+    assert (pool_size + max_overflow) * 4 * 2 <= 40
+
+
+def test_async_url_maps_driver_and_sslmode(db_module):
+    url = db_module._async_url("postgresql://u:p@db:5432/app?sslmode=require")
+    assert url == "postgresql+asyncpg://u:p@db:5432/app"
+    assert db_module._async_url("sqlite:///:memory:") is None
+    assert db_module._async_connect_args("postgresql://u:p@db/app?sslmode=require")["ssl"] == "require"
+
+
+def test_engine_kwargs_postgres_uses_queue_pool(db_module, monkeypatch):
+    monkeypatch.setattr(db_module.config, "DB_DISABLE_POOL", False)
+    kwargs = db_module._engine_kwargs("postgresql://u:p@localhost/db")
+    assert kwargs["poolclass"] is db_module.QueuePool
+    assert kwargs["pool_pre_ping"] == db_module.config.DB_POOL_PRE_PING
+
+
+def test_engine_kwargs_nullpool_escape_hatch(db_module, monkeypatch):
+    monkeypatch.setattr(db_module.config, "DB_DISABLE_POOL", True)
+    kwargs = db_module._engine_kwargs("postgresql://u:p@localhost/db")
+    assert kwargs["poolclass"] is db_module.NullPool
+
+
+def test_engine_kwargs_sqlite_untouched(db_module):
+    assert db_module._engine_kwargs("sqlite:///:memory:") == {}
+
+
+def test_pool_status_reports_queue_pool(db_module):
+    from sqlalchemy import create_engine
+    engine = create_engine("sqlite://", poolclass=db_module.QueuePool, pool_size=3, max_overflow=2)
+    status = db_module.get_pool_status(engine)
+    assert status["class"] == "QueuePool"
+    assert status["size"] == 3
+    assert status["checked_out"] == 0
@@ -0,0 +1,50 @@
+"""
+Unit-тесты для маршрутизации чтения на реплику (core/db_routing.py)
+"""
+import pytest
+
+
+@pytest.fixture
+def routing(monkeypatch):
+    from api.core import db_routing
+    # Pretend a replica is configured: a distinct engine object is enough
+    monkeypatch.setattr(db_routing, "replica_engine", object())
+    monkeypatch.setattr(db_routing, "redis_client", None)
+    monkeypatch.setattr(db_routing, "_recent_writes", {})
+    return db_routing
+
+
+def test_no_replica_skips_marks(monkeypatch):
+    from api.core import db_routing
+    monkeypatch.setattr(db_routing, "replica_engine", db_routing.engine)
+    monkeypatch.setattr(db_routing, "_recent_writes", {})
+    db_routing.mark_recent_write("dev-1")
+    assert db_routing._recent_writes == {}
+
+
+def test_recent_write_pins_device(routing):
+    assert not routing.has_recent_write("dev-1")
+    routing.mark_recent_write("dev-1")
+    assert routing.has_recent_write("dev-1")
+    assert not routing.has_recent_write("dev-2")
+    assert not routing.has_recent_write(None)
+
+
+def test_recent_write_expires(routing, monkeypatch):
+    monkeypatch.setattr(routing.config, "DB_REPLICA_RYW_SECONDS", 0)
+    routing.mark_recent_write("dev-1")
+    assert not routing.has_recent_write("dev-1")
+
+
+def test_read_session_routes_by_device(routing):
+    class _Req:
+        def __init__(self, device):
+            self.query_params = {"device_anon_id": device} if device else {}
+            self.headers = {}
+
+    routing.mark_recent_write("dev-1")
+    gen = routing.get_read_session(_Req("dev-1"))
+    assert next(gen).bind is routing.engine
+
+    gen = routing.get_read_session(_Req("dev-2"))
+    assert next(gen).bind is routing.replica_engine
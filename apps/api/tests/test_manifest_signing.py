@@ -0,0 +1,53 @@
+"""
+Unit-тесты для подписи закэшированного манифеста тура (public._sign_manifest)
+"""
+import copy
+
+
+def _skeleton():
+    return {
+        "tour": {"id": "t1", "city_slug": "kgd", "published_at": "2026-01-01T00:00:00"},
+        "pois": [{
+            "id": "p1",
+            "order_index": 0,
+            "narrations": [{"id": "n1", "url": "https://cdn.test/n1.mp3", "kids_url": None, "locale": "ru"}],
+            "media": [{"id": "m1", "url": "https://cdn.test/m1.jpg", "type": "image"}],
+        }],
+        "assets": [{"url": "https://cdn.test/n1.mp3", "type": "audio", "owner_id": "p1"}],
+    }
+
+
+def test_sign_manifest_signs_urls_without_touching_skeleton(monkeypatch):
+    from api import public
+    from api.core import security
+    monkeypatch.setattr(security.config, "YOOKASSA_WEBHOOK_SECRET", "test-platform-secret")
+    monkeypatch.setattr(security.AssetUrlSigner, "_sign", lambda self, url: f"{url}?sig=1")
+    skeleton = _skeleton()
+    original = copy.deepcopy(skeleton)
+
+    signed = public._sign_manifest(skeleton, security.AssetUrlSigner())
+
+    assert skeleton == original
+    assert signed["pois"][0]["narrations"][0]["url"] == "https://cdn.test/n1.mp3?sig=1"
+    assert signed["pois"][0]["narrations"][0]["kids_url"] is None
+    assert signed["pois"][0]["media"][0]["url"] == "https://cdn.test/m1.jpg?sig=1"
+    assert signed["assets"][0]["url"] == "https://cdn.test/n1.mp3?sig=1"
+    assert signed["tour"] == original["tour"]
+    assert "asset_tokens" not in signed
+
+
+def test_prefix_mode_returns_one_token_per_entity_directory(monkeypatch):
+    from api import public
+    from api.core import security
+    monkeypatch.setattr(security.config, "YOOKASSA_WEBHOOK_SECRET", "test-platform-secret")
+    poi_dir = "https://cdn.test/poi/6f1c2f8e-1d5b-4d59-a8b7-5a3c1c1e9a10/"
+    skeleton = _skeleton()
+    skeleton["pois"][0]["media"][0]["url"] = poi_dir + "a.jpg"
+    skeleton["assets"].append({"url": poi_dir + "b.jpg", "type": "image", "owner_id": "p1"})
+
+    signed = public._sign_manifest(skeleton, security.AssetUrlSigner(prefix_scoped=True))
+
+    assert signed["pois"][0]["media"][0]["url"] == poi_dir + "a.jpg"
+    assert [t["prefix"] for t in signed["asset_tokens"]] == [poi_dir]
+    # Flat keys (narrations/<id>.mp3 style) keep per-URL signatures
+    assert "token=" in signed["pois"][0]["narrations"][0]["url"]
@@ -0,0 +1,23 @@
+"""
+Unit-тесты для SQL поиска рядом (public.nearby_sql)
+"""
+
+
+def test_branches_follow_requested_types():
+    from api.public import nearby_sql
+    poi_only = nearby_sql({"poi"})
+    both = nearby_sql({"helper", "poi"})
+
+    assert "FROM poi" in poi_only and "helper_places" not in poi_only
+    assert "FROM poi" in both and "FROM helper_places" in both
+    assert both.count("UNION ALL") == 1
+
+
+def test_every_branch_filters_by_radius_and_orders_by_knn():
+    from api.public import nearby_sql
+    sql = nearby_sql({"poi", "helper"})
+
+    assert sql.count("ST_DWithin(geo, ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography, :radius)") == 2
+    # KNN ordering against an inline point (index-usable), not a joined column
+    assert sql.count("ORDER BY geo <-> ST_SetSRID(ST_MakePoint(:lon, :lat), 4326)::geography") == 2
+    assert sql.count("LIMIT :limit") == 3
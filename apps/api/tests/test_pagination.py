@@ -0,0 +1,88 @@
+"""
+Unit-тесты для keyset-пагинации (core/pagination.py)
+"""
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlmodel import Session, SQLModel, select
+
+from api.core.models import Entitlement, EntitlementGrant
+
+T0 = datetime(2026, 3, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine, tables=[Entitlement.__table__, EntitlementGrant.__table__])
+    with Session(engine) as s:
+        ent = Entitlement(slug="kgd", scope="city", ref="kgd", title_ru="Калининград")
+        s.add(ent)
+        # 25 grants, several sharing a timestamp
+        for i in range(25):
+            s.add(EntitlementGrant(device_anon_id=f"d{i}", entitlement_id=ent.id, source="store",
+                                   source_ref=f"r{i}", granted_at=T0 + timedelta(minutes=i // 3)))
+        s.commit()
+        yield s
+
+
+def _walk(session, descending=True, limit=7):
+    from api.core.pagination import keyset_page
+    seen, cursor, pages = [], None, 0
+    while True:
+        rows, cursor = keyset_page(
+            session, select(EntitlementGrant), EntitlementGrant.granted_at, EntitlementGrant.id,
+            limit, cursor=cursor, descending=descending,
+        )
+        seen += rows
+        pages += 1
+        if cursor is None:
+            return seen, pages
+
+
+@pytest.mark.parametrize("descending", [True, False])
+def test_cursor_walk_returns_every_row_once_in_order(session, descending):
+    seen, pages = _walk(session, descending=descending)
+
+    keys = [(g.granted_at, g.id) for g in seen]
+    assert len(seen) == 25 and len(set(keys)) == 25
+    assert keys == sorted(keys, reverse=descending)
+    assert pages == 4
+
+
+def test_offset_page_hands_over_to_cursor(session):
+    from api.core.pagination import keyset_page
+    query = select(EntitlementGrant)
+    args = (session, query, EntitlementGrant.granted_at, EntitlementGrant.id, 5)
+
+    first, cursor = keyset_page(*args, offset=5)
+    after, _ = keyset_page(*args, cursor=cursor)
+    by_offset, _ = keyset_page(*args, offset=10)
+
+    assert [g.id for g in after] == [g.id for g in by_offset]
+
+
+@pytest.mark.parametrize("cursor", ["garbage", "W10", "WyJ4IiwgInkiXQ"])
+def test_malformed_cursor_is_400(session, cursor):
+    from api.core.pagination import keyset_page
+    with pytest.raises(HTTPException) as exc:
+        keyset_page(session, select(EntitlementGrant), EntitlementGrant.granted_at, EntitlementGrant.id, 5, cursor=cursor)
+    assert exc.value.status_code == 400
+
+
+def test_count_is_cached_per_key(session, monkeypatch):
+    from api.core import caching
+    from api.core.pagination import count_cached
+    monkeypatch.setattr(caching, "redis_client", None)
+    caching.reset_response_cache()
+    query = select(EntitlementGrant)
+
+    assert count_cached(session, query, "grants:test") == 25
+    session.add(EntitlementGrant(device_anon_id="new", entitlement_id=uuid.uuid4(), source="store", source_ref="new"))
+    session.commit()
+    assert count_cached(session, query, "grants:test") == 25
+    assert count_cached(session, query, "grants:test:v2") == 26
+    caching.reset_response_cache()
@@ -0,0 +1,102 @@
+"""
+Unit-тесты для предсжатых тел публичных ответов (core/precompressed.py)
+"""
+import gzip
+import json
+
+import pytest
+from starlette.requests import Request
+from starlette.responses import Response
+
+
+def _request(accept_encoding=None):
+    headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.fixture
+def blobs(monkeypatch):
+    from api.core import caching, precompressed
+    monkeypatch.setattr(precompressed, "_redis", None)
+    monkeypatch.setattr(precompressed, "_async_redis", None)
+    monkeypatch.setattr(caching, "redis_client", None)
+    monkeypatch.setattr(caching, "async_redis_client", None)
+    monkeypatch.setattr(precompressed.config, "PUBLIC_BLOB_DIR", None)
+    precompressed.reset_public_blobs()
+    caching.reset_response_cache()
+    yield precompressed
+    precompressed.reset_public_blobs()
+    caching.reset_response_cache()
+
+
+def test_choose_encoding(blobs):
+    available = {"identity", "gzip", "br"}
+    assert blobs.choose_encoding("gzip, deflate, br", available) == "br"
+    assert blobs.choose_encoding("gzip;q=1.0, br;q=0", available) == "gzip"
+    assert blobs.choose_encoding("gzip", {"identity", "gzip"}) == "gzip"
+    assert blobs.choose_encoding("*", {"identity", "gzip"}) == "gzip"
+    assert blobs.choose_encoding("", available) == "identity"
+    assert blobs.choose_encoding(None, available) == "identity"
+
+
+def test_body_built_once_and_served_per_encoding(blobs):
+    calls = []
+
+    def load():
+        calls.append(1)
+        return [{"slug": "kgd", "name_ru": "Калининград"}]
+
+    response = Response()
+    response.headers["ETag"] = 'W/"v1"'
+    response.headers["Cache-Control"] = "public, max-age=60"
+
+    zipped = blobs.precompressed_response(_request("gzip"), response, "cities:v1", load)
+    plain = blobs.precompressed_response(_request(), response, "cities:v1", load)
+
+    assert len(calls) == 1
+    assert zipped.headers["content-encoding"] == "gzip"
+    assert zipped.headers["etag"] == 'W/"v1"'
+    assert "Accept-Encoding" in zipped.headers["vary"]
+    assert json.loads(gzip.decompress(zipped.body)) == load()
+    assert "content-encoding" not in plain.headers
+    assert json.loads(plain.body) == load()
+    assert plain.headers["content-length"] == str(len(plain.body))
+
+
+def test_disk_tier_survives_local_reset(blobs, monkeypatch, tmp_path):
+    monkeypatch.setattr(blobs.config, "PUBLIC_BLOB_DIR", str(tmp_path))
+    blobs.store_blobs("city_tours:kgd:v2", blobs.encode_blobs({"a": 1}), ttl=60)
+    blobs.reset_public_blobs()
+
+    stored = blobs.get_blobs("city_tours:kgd:v2")
+    assert json.loads(stored["identity"]) == {"a": 1}
+    assert json.loads(gzip.decompress(stored["gzip"])) == {"a": 1}
+
+    blobs.store_blobs("city_tours:kgd:old", blobs.encode_blobs({"a": 0}), ttl=-1)
+    blobs.reset_public_blobs()
+    assert blobs.get_blobs("city_tours:kgd:old") is None
+
+
+def test_disk_tier_sweeps_expired_and_caps_size(blobs, monkeypatch, tmp_path):
+    import os
+    monkeypatch.setattr(blobs.config, "PUBLIC_BLOB_DIR", str(tmp_path))
+    monkeypatch.setattr(blobs.config, "PUBLIC_BLOB_DIR_MAX_MB", 1)
+    monkeypatch.setattr(blobs, "_last_sweep", 0.0)
+    blobs._disk_put("old", {"identity": b"x"}, expires=1.0)
+    big = os.urandom(600 * 1024)
+    blobs._disk_put("soon", {"identity": big}, expires=4e9)
+    monkeypatch.setattr(blobs, "_last_sweep", 0.0)
+    blobs._disk_put("late", {"identity": big}, expires=4e9 + 1)
+
+    # expired file gone, earliest-expiring body dropped to fit 1 MB
+    assert sorted(os.listdir(tmp_path)) == [os.path.basename(blobs._disk_path("late", "identity"))]
+
+
+def test_binary_body_keeps_media_type(blobs):
+    tile = bytes(range(256)) * 4
+    stored = blobs.compress_blobs(tile)
+
+    served = blobs.blob_response(_request("gzip"), Response(), stored, media_type="application/vnd.mapbox-vector-tile")
+
+    assert served.headers["content-type"] == "application/vnd.mapbox-vector-tile"
+    assert gzip.decompress(served.body) == tile
@@ -0,0 +1,86 @@
+"""
+Unit-тесты для подсчёта SQL-запросов на запрос (core/query_metrics.py)
+"""
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+
+
+@pytest.fixture
+def metrics():
+    from api.core import query_metrics
+    query_metrics.reset_route_metrics()
+    yield query_metrics
+    query_metrics.reset_route_metrics()
+
+
+@pytest.fixture
+def client(metrics):
+    from api.core.middleware_security import SecurityMiddleware
+
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+
+    app = FastAPI()
+    app.add_middleware(SecurityMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int):
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+        return {"id": item_id}
+
+    return TestClient(app)
+
+
+def test_stats_outside_request_are_ignored(metrics):
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert metrics.current_stats() is None
+
+
+def test_counts_queries_within_context(metrics):
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine)
+    metrics.instrument_engine(engine)  # idempotent
+    stats, token = metrics.start_request_stats()
+    try:
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            conn.execute(text("SELECT 2"))
+    finally:
+        metrics.end_request_stats(token)
+    assert stats.count == 2
+    assert stats.duration_ms >= 0
+
+
+def test_server_timing_header_and_route_histogram(client, metrics):
+    resp = client.get("/items/7")
+    assert resp.status_code == 200
+    assert 'desc="3 queries"' in resp.headers["Server-Timing"]
+
+    body = metrics.render_prometheus()
+    assert 'db_queries_per_request_bucket{method="GET",route="/items/{item_id}",le="5"} 1' in body
+    assert 'db_queries_per_request_bucket{method="GET",route="/items/{item_id}",le="2"} 0' in body
+    assert 'db_time_ms_per_request_count{method="GET",route="/items/{item_id}"} 1' in body
+
+
+def test_metrics_endpoint_requires_token(metrics, monkeypatch):
+    from api import ops
+    from api.core.config import config
+    app = FastAPI()
+    app.include_router(ops.router)
+    client = TestClient(app)
+
+    monkeypatch.setattr(config, "METRICS_TOKEN", None)
+    assert client.get("/ops/metrics", headers={"Authorization": "Bearer "}).status_code == 401
+
+    monkeypatch.setattr(config, "METRICS_TOKEN", "scrape-secret")
+    assert client.get("/ops/metrics").status_code == 401
+    assert client.get("/ops/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    resp = client.get("/ops/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert resp.status_code == 200 and resp.headers["content-type"].startswith("text/plain")
@@ -0,0 +1,110 @@
+"""
+Tests for maintained tour rating summaries (api.core.rating_summary).
+"""
+import uuid
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlmodel import Session, SQLModel
+
+from api.core.models import TourRating, TourRatingSummary
+from api.core.rating_summary import apply_rating_change, get_rating_summaries, rebuild_rating_summaries, update_rating
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    # SQLite does not enforce FKs by default; the tour table is not needed here
+    SQLModel.metadata.create_all(engine, tables=[TourRating.__table__, TourRatingSummary.__table__])
+    with Session(engine) as s:
+        yield s
+
+
+def _rate(session, tour_id, stars, device="d"):
+    rating = TourRating(tour_id=tour_id, device_anon_id=device, rating=stars)
+    session.add(rating)
+    apply_rating_change(session, tour_id, None, stars)
+    session.commit()
+    return rating
+
+
+def test_insert_update_delete_keep_summary_in_step(session):
+    tour_id = uuid.uuid4()
+    _rate(session, tour_id, 5, "a")
+    r = _rate(session, tour_id, 3, "b")
+
+    summary = session.get(TourRatingSummary, tour_id)
+    assert (summary.rating_count, summary.rating_sum) == (2, 8)
+    assert summary.avg_rating == 4.0
+    assert summary.distribution == {1: 0, 2: 0, 3: 1, 4: 0, 5: 1}
+
+    apply_rating_change(session, tour_id, r.rating, 1)
+    r.rating = 1
+    session.commit()
+    session.refresh(summary)
+    assert (summary.rating_count, summary.rating_sum) == (2, 6)
+    assert summary.distribution == {1: 1, 2: 0, 3: 0, 4: 0, 5: 1}
+
+    apply_rating_change(session, tour_id, r.rating, None)
+    session.delete(r)
+    session.commit()
+    session.refresh(summary)
+    assert (summary.rating_count, summary.rating_sum) == (1, 5)
+    assert summary.distribution[1] == 0
+
+
+def test_concurrent_updates_from_same_rating(session):
+    tour_id = uuid.uuid4()
+    rating_id = _rate(session, tour_id, 3).id
+    engine = session.get_bind()
+
+    # both requests read rating 3 before either writes
+    with Session(engine) as first, Session(engine) as second:
+        a, b = first.get(TourRating, rating_id), second.get(TourRating, rating_id)
+        update_rating(first, a, 4)
+        first.commit()
+        update_rating(second, b, 5, comment="changed my mind")
+        second.commit()
+
+    session.expire_all()
+    summary = session.get(TourRatingSummary, tour_id)
+    assert (summary.rating_count, summary.rating_sum) == (1, 5)
+    assert summary.distribution == {1: 0, 2: 0, 3: 0, 4: 0, 5: 1}
+    assert session.get(TourRating, rating_id).comment == "changed my mind"
+
+
+def test_unchanged_rating_is_noop(session):
+    tour_id = uuid.uuid4()
+    statements = []
+    event.listen(session.get_bind(), "before_cursor_execute", lambda *a: statements.append(a[2]))
+    apply_rating_change(session, tour_id, 4, 4)
+    assert statements == []
+
+
+def test_rebuild_repairs_drift(session):
+    t1, t2 = uuid.uuid4(), uuid.uuid4()
+    _rate(session, t1, 4, "a")
+    _rate(session, t1, 2, "b")
+    # Rating written without maintaining the summary, plus a stale summary row
+    session.add(TourRating(tour_id=t1, device_anon_id="c", rating=5))
+    session.add(TourRatingSummary(tour_id=t2, rating_count=3, rating_sum=9))
+    session.commit()
+
+    assert rebuild_rating_summaries(session) == 1
+    summaries = get_rating_summaries(session, [t1, t2])
+    assert set(summaries) == {t1}
+    assert (summaries[t1].rating_count, summaries[t1].rating_sum) == (3, 11)
+    assert summaries[t1].distribution == {1: 0, 2: 1, 3: 0, 4: 1, 5: 1}
+
+
+def test_rebuild_single_tour_leaves_others(session):
+    t1, t2 = uuid.uuid4(), uuid.uuid4()
+    _rate(session, t1, 4, "a")
+    _rate(session, t2, 1, "b")
+    session.exec(TourRatingSummary.__table__.update().values(rating_count=99))
+    session.commit()
+
+    rebuild_rating_summaries(session, t1)
+    summaries = get_rating_summaries(session, [t1, t2])
+    assert summaries[t1].rating_count == 1
+    assert summaries[t2].rating_count == 99
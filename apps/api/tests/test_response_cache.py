@@ -0,0 +1,113 @@
+"""
+Unit-тесты для многоуровневого кэша ответов (core/caching.cached_response)
+"""
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    from api.core import caching
+    monkeypatch.setattr(caching, "redis_client", None)
+    monkeypatch.setattr(caching, "async_redis_client", None)
+    caching.reset_response_cache()
+    yield caching
+    caching.reset_response_cache()
+
+
+def test_hit_skips_compute_and_encodes_like_fastapi(cache):
+    calls = []
+    poi_id = uuid.uuid4()
+
+    def compute():
+        calls.append(1)
+        return {"id": poi_id}
+
+    assert cache.cached_response("k", compute) == {"id": str(poi_id)}
+    assert cache.cached_response("k", compute) == {"id": str(poi_id)}
+    assert len(calls) == 1
+
+
+def test_errors_are_not_cached(cache):
+    def boom():
+        raise ValueError("db down")
+
+    with pytest.raises(ValueError):
+        cache.cached_response("k", boom)
+    assert cache.cached_response("k", lambda: 1) == 1
+
+
+def test_concurrent_misses_compute_once(cache):
+    calls = []
+    start = threading.Barrier(8)
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return "v"
+
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(cache.cached_response("k", compute))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["v"] * 8
+    assert len(calls) == 1
+
+
+def test_stale_entry_served_while_one_request_rebuilds(cache):
+    cache.cached_response("k", lambda: "old", fresh_ttl=0, stale_ttl=60)
+    rebuilding = threading.Event()
+    release = threading.Event()
+
+    def slow():
+        rebuilding.set()
+        release.wait(2)
+        return "new"
+
+    t = threading.Thread(target=lambda: cache.cached_response("k", slow, fresh_ttl=60))
+    t.start()
+    rebuilding.wait(2)
+    assert cache.cached_response("k", lambda: pytest.fail("second rebuild")) == "old"
+    release.set()
+    t.join()
+    assert cache.cached_response("k", lambda: pytest.fail("should be fresh")) == "new"
+
+
+def test_expired_past_stale_window_recomputes(cache):
+    cache.cached_response("k", lambda: "old", fresh_ttl=0, stale_ttl=0)
+    assert cache.cached_response("k", lambda: "new") == "new"
+
+
+def test_lru_is_bounded(cache, monkeypatch):
+    monkeypatch.setattr(cache._local_responses, "max_entries", 2)
+    for key in ("a", "b", "c"):
+        cache.cached_response(key, lambda: key)
+    assert cache._local_responses.get("a") is None
+    assert cache._local_responses.get("c")["v"] == "c"
+
+
+def test_async_concurrent_misses_compute_once(cache):
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def run():
+        return await asyncio.gather(*[cache.cached_response_async("k", compute) for _ in range(5)])
+
+    assert asyncio.run(run()) == ["v"] * 5
+    assert len(calls) == 1
+    assert cache._async_flights == {}
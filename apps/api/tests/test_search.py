@@ -0,0 +1,94 @@
+"""
+Unit-тесты для полнотекстового поиска (core/search.py)
+"""
+import pytest
+from sqlalchemy.dialects import postgresql
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("Кафедральный собор", "кафедральный:* & собор:*"),
+    ("  Ёлка!  ", "елка:*"),
+    ("o'neil 2", "o:* & neil:* & 2:*"),
+    ("!!! ---", None),
+    ("", None),
+])
+def test_prefix_query(text, expected):
+    from api.core.search import prefix_query
+    assert prefix_query(text) == expected
+
+
+def test_prefix_query_caps_terms():
+    from api.core.search import MAX_TERMS, prefix_query
+    assert prefix_query(" ".join(f"w{i}" for i in range(20))).count(":*") == MAX_TERMS
+
+
+def test_match_uses_both_configs_on_the_indexed_column():
+    from api.core.models import Poi
+    from api.core.search import fulltext_match
+    sql = str(fulltext_match(Poi, "собор:*").compile(dialect=postgresql.dialect()))
+    assert sql.startswith("poi.search_vector @@ ")
+    assert "(to_tsquery('russian'::regconfig, %(to_tsquery_1)s) || to_tsquery('simple'::regconfig," in sql
+
+
+@pytest.fixture
+def media_session():
+    import uuid
+    from sqlalchemy import create_engine
+    from sqlmodel import Session, SQLModel
+    from api.core.models import PoiMedia, TourMedia
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine, tables=[PoiMedia.__table__, TourMedia.__table__])
+    with Session(engine) as s:
+        # Core inserts: the content-version flush hook would look up the (absent) poi/tour parents
+        s.execute(PoiMedia.__table__.insert(), [
+            {"id": uuid.uuid4(), "poi_id": uuid.uuid4(), "url": f"https://cdn.test/p{i}.jpg", "media_type": "image",
+             "license_type": "cc-by", "author": "Иван Петров" if i % 2 else "100% Studio"}
+            for i in range(5)
+        ])
+        s.execute(TourMedia.__table__.insert(), [
+            {"id": uuid.uuid4(), "tour_id": uuid.uuid4(), "url": f"https://cdn.test/t{i}.jpg", "media_type": "video",
+             "license_type": "cc-by", "author": "Иван Петров", "source_page_url": "https://test"}
+            for i in range(3)
+        ])
+        s.commit()
+        yield s
+
+
+def test_fuzzy_search_substring_is_escaped(media_session):
+    from sqlmodel import select
+    from api.core.models import PoiMedia
+    from api.core.search import fuzzy_search
+    query, rank = fuzzy_search(media_session, select(PoiMedia), "100%", PoiMedia.author)
+    assert rank is None  # SQLite: substring only
+    assert len(media_session.exec(query).all()) == 3
+    query, _ = fuzzy_search(media_session, select(PoiMedia), "0_", PoiMedia.author)
+    assert media_session.exec(query).all() == []
+
+
+def test_fuzzy_search_postgres_clause():
+    from types import SimpleNamespace
+    from sqlmodel import select
+    from api.core.models import City
+    from api.core.search import fuzzy_search
+    session = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()))
+    query, rank = fuzzy_search(session, select(City), "Калининрад", City.name_ru, City.slug)
+    sql = str(query.order_by(rank.desc()).compile(dialect=postgresql.dialect()))
+    # ILIKE on the bare column (a lower() wrapper would not use the trigram index)
+    assert "city.name_ru ILIKE" in sql and "<%% city.name_ru" in sql and "<%% city.slug" in sql
+    assert "ORDER BY greatest(coalesce(word_similarity(" in sql
+
+
+def test_media_list_filters_and_pages_in_sql(media_session):
+    from api.admin.media import list_media
+    args = dict(type=None, media_type=None, entity_type=None, session=media_session, user=None)
+
+    everything = list_media(page=1, per_page=3, search=None, **args)
+    assert everything.total == 8 and everything.pages == 3 and len(everything.items) == 3
+    assert everything.items[0].entity_type == "poi"
+
+    found = list_media(page=1, per_page=10, search="Иван", **args)
+    assert found.total == 5
+    videos = list_media(page=1, per_page=10, search=None, **{**args, "type": "video"})
+    assert {m.entity_type for m in videos.items} == {"tour"} and videos.total == 3
+    tours = list_media(page=1, per_page=10, search=None, **{**args, "entity_type": "tour"})
+    assert tours.total == 3
@@ -0,0 +1,116 @@
+"""
+Unit-тесты для быстрой JSON-сериализации ответов (core/serialization.py)
+"""
+import json
+import uuid
+from datetime import datetime
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from starlette.responses import Response
+
+
+class _Item(BaseModel):
+    id: uuid.UUID
+    at: datetime
+
+
+def _payload():
+    return {
+        "id": uuid.uuid4(),
+        "published_at": datetime(2026, 1, 2, 3, 4, 5, 678901),
+        "price": Decimal("299.50"),
+        "item": _Item(id=uuid.uuid4(), at=datetime(2026, 1, 1)),
+        "pois": [{"title_ru": "Кафедральный собор", "lat": 54.706, "cover_image": None}],
+    }
+
+
+def test_fast_response_matches_default_encoding():
+    from api.core.serialization import FastJSONResponse
+    payload = _payload()
+
+    fast = json.loads(FastJSONResponse(payload).body)
+    default = json.loads(JSONResponse(jsonable_encoder(payload)).body)
+
+    assert fast == default
+
+
+def test_fast_json_is_noop_when_disabled(monkeypatch):
+    from api.core import serialization
+    monkeypatch.setattr(serialization.config, "FAST_JSON_RESPONSES", False)
+    data = {"a": 1}
+
+    assert serialization.fast_json(data, Response()) is data
+    assert serialization.json_response_class() is JSONResponse
+
+
+def test_fast_json_keeps_headers_set_on_injected_response(monkeypatch):
+    from api.core import serialization
+    monkeypatch.setattr(serialization.config, "FAST_JSON_RESPONSES", True)
+    response = Response()
+    response.headers["Cache-Control"] = "private, no-store"
+    response.headers["ETag"] = 'W/"v1"'
+
+    out = serialization.fast_json({"id": uuid.UUID(int=1)}, response)
+
+    assert isinstance(out, serialization.FastJSONResponse)
+    assert out.headers["cache-control"] == "private, no-store"
+    assert out.headers["etag"] == 'W/"v1"'
+    assert out.headers.getlist("content-length") == [str(len(out.body))]
+    assert json.loads(out.body) == {"id": str(uuid.UUID(int=1))}
+
+
+def test_signed_manifest_matches_typed_shape(monkeypatch):
+    from api import public
+    from api.core import security
+    from api.public_schemas import TourManifest
+    monkeypatch.setattr(security.config, "YOOKASSA_WEBHOOK_SECRET", "test-platform-secret")
+    poi_id, tour_id = uuid.uuid4(), uuid.uuid4()
+    skeleton = jsonable_encoder({
+        "tour": {"id": tour_id, "city_slug": "kgd", "title_ru": "Тур", "description_ru": None,
+                 "duration_minutes": 60, "published_at": datetime(2026, 1, 1)},
+        "pois": [{
+            "order_index": 0, "id": poi_id, "title_ru": "Точка", "lat": 54.7, "lon": 20.5,
+            "category": "landmark", "override_lat": None, "override_lon": None,
+            "effective_lat": 54.7, "effective_lon": 20.5,
+            "transition_text_ru": None, "transition_audio_url": None,
+            "narrations": [{"id": str(uuid.uuid4()), "url": f"https://cdn.test/poi/{poi_id}/a.mp3",
+                            "kids_url": None, "locale": "ru", "duration_seconds": 61.0, "transcript": None}],
+            "media": [{"id": str(uuid.uuid4()), "url": f"https://cdn.test/poi/{poi_id}/a.jpg", "type": "image"}],
+        }],
+        "assets": [{"url": f"https://cdn.test/poi/{poi_id}/a.mp3", "type": "audio", "owner_id": str(poi_id),
+                    "locale": "ru", "duration": 61.0}],
+    })
+
+    for prefix_scoped in (False, True):
+        signed = public._sign_manifest(skeleton, security.AssetUrlSigner(prefix_scoped=prefix_scoped))
+        manifest = TourManifest.model_validate(signed)
+        assert (manifest.asset_tokens is not None) == prefix_scoped
+
+
+def test_iter_json_object_streams_arrays_in_chunks():
+    from api.core.serialization import iter_json_object
+    items = [{"id": uuid.UUID(int=i), "title_ru": f"Точка {i}"} for i in range(200)]
+    seen = []
+
+    def counted():
+        for item in items:
+            seen.append(item)
+            yield item
+
+    chunks = list(iter_json_object([
+        ("city", {"slug": "kgd"}),
+        ("pois", counted()),
+        ("empty", iter([])),
+        ("total", lambda: len(seen)),
+    ], chunk_size=1024))
+
+    assert len(chunks) > 1
+    assert json.loads(b"".join(chunks)) == {
+        "city": {"slug": "kgd"},
+        "pois": jsonable_encoder(items),
+        "empty": [],
+        "total": 200,
+    }
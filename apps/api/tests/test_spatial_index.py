@@ -0,0 +1,187 @@
+"""
+Unit-тесты для in-process пространственного индекса города (core/spatial_index.py)
+"""
+import math
+import random
+from types import SimpleNamespace
+
+import pytest
+
+CENTER = (54.71, 20.51)
+
+
+def _points(n=2000, seed=7):
+    rnd = random.Random(seed)
+    points = []
+    for i in range(n):
+        kind = "helper" if i % 4 == 0 else "poi"
+        p = {"kind": kind, "id": i, "title": f"p{i}",
+             "lat": CENTER[0] - 0.09 + rnd.random() * 0.18, "lon": CENTER[1] - 0.15 + rnd.random() * 0.30}
+        if kind == "helper":
+            p["helper_type"] = "toilet" if i % 8 == 0 else "cafe"
+        points.append(p)
+    return points
+
+
+def _haversine(lat1, lon1, lat2, lon2):
+    from api.core.spatial_index import EARTH_RADIUS_M
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((p2 - p1) / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+@pytest.mark.parametrize("radius", [150, 1000, 5000])
+def test_nearby_matches_brute_force(radius):
+    from api.core.spatial_index import CityIndex
+    points = _points()
+    index = CityIndex("v1", points)
+    lat, lon = CENTER
+
+    hits = index.nearby(lat, lon, radius, 50, {"poi", "helper"})
+
+    expected = sorted((_haversine(lat, lon, p["lat"], p["lon"]), p["id"]) for p in points)
+    expected = [e for e in expected if e[0] <= radius][:50]
+    assert [p["id"] for _, p in hits] == [i for _, i in expected]
+    assert all(d == pytest.approx(e, abs=0.01) for (d, _), (e, _) in zip(hits, expected))
+
+
+def test_nearby_filters_kinds():
+    from api.core.spatial_index import CityIndex
+    index = CityIndex("v1", _points())
+    hits = index.nearby(*CENTER, 3000, 200, {"helper"})
+    assert hits and all(p["kind"] == "helper" for _, p in hits)
+
+
+def test_within_bbox():
+    from api.core.spatial_index import CityIndex
+    points = _points()
+    index = CityIndex("v1", points)
+    box = (54.70, 20.50, 54.72, 20.53)
+
+    found = index.within_bbox(*box, "helper")
+
+    expected = {p["id"] for p in points if p["kind"] == "helper"
+                and box[0] <= p["lat"] <= box[2] and box[1] <= p["lon"] <= box[3]}
+    assert {p["id"] for p in found} == expected
+
+
+class _Session:
+    """Answers the two build queries in order: POIs, then helper places."""
+
+    def __init__(self, pois, helpers):
+        self.results, self.queries = [pois, helpers], 0
+
+    def exec(self, query):
+        rows = self.results[self.queries % 2]
+        self.queries += 1
+        return SimpleNamespace(all=lambda: rows)
+
+
+def _helper(i, lat, lon):
+    return SimpleNamespace(id=i, type="toilet", name_ru=None, lat=lat, lon=lon,
+                           model_dump=lambda exclude: {"id": i, "type": "toilet", "lat": lat, "lon": lon})
+
+
+def test_rebuilt_only_when_version_changes(monkeypatch):
+    from api.core import spatial_index
+    versions = ["poi:1|helper_places:1"]
+    monkeypatch.setattr(spatial_index, "content_versions", lambda session, city, *models: versions[0])
+    monkeypatch.setattr(spatial_index.config, "SPATIAL_INDEX_CHECK_SECONDS", 0)
+    spatial_index.reset_spatial_indexes()
+    session = _Session([SimpleNamespace(id=1, title_ru="A", lat=54.71, lon=20.51)], [_helper(2, 54.711, 20.511)])
+
+    first = spatial_index.get_city_index(session, "kgd")
+    again = spatial_index.get_city_index(session, "kgd")
+    assert again is first and session.queries == 2
+    assert first.within_bbox(54.70, 20.50, 54.72, 20.52, "helper")[0]["payload"]["title"] == ""
+
+    versions[0] = "poi:2|helper_places:1"
+    rebuilt = spatial_index.get_city_index(session, "kgd")
+    assert rebuilt is not first and session.queries == 4
+    spatial_index.reset_spatial_indexes()
+
+
+def test_large_city_not_indexed(monkeypatch):
+    from api.core import spatial_index
+    monkeypatch.setattr(spatial_index, "content_versions", lambda session, city, *models: "v")
+    monkeypatch.setattr(spatial_index.config, "SPATIAL_INDEX_MAX_POINTS", 1)
+    spatial_index.reset_spatial_indexes()
+    session = _Session([SimpleNamespace(id=i, title_ru="A", lat=54.71, lon=20.51) for i in range(2)], [])
+
+    assert spatial_index.get_city_index(session, "kgd") is None
+    # remembered: no rebuild attempt inside the check interval
+    assert spatial_index.get_city_index(session, "kgd") is None and session.queries == 2
+    spatial_index.reset_spatial_indexes()
+
+
+def test_empty_city_not_kept(monkeypatch):
+    from api.core import spatial_index
+    monkeypatch.setattr(spatial_index, "content_versions", lambda session, city, *models: "v")
+    monkeypatch.setattr(spatial_index.config, "SPATIAL_INDEX_MAX_CITIES", 1)
+    spatial_index.reset_spatial_indexes()
+    real = spatial_index.get_city_index(_Session([SimpleNamespace(id=1, title_ru="A", lat=54.71, lon=20.51)], []), "kgd")
+
+    # an unknown slug answers empty without evicting the real city
+    empty = spatial_index.get_city_index(_Session([], []), "no-such-city")
+    assert empty is not None and len(empty) == 0
+    assert spatial_index._indexes == {"kgd": real} and not spatial_index._checked
+    spatial_index.reset_spatial_indexes()
+
+
+class _AsyncSession:
+    def __init__(self, pois, helpers):
+        self.sync = _Session(pois, helpers)
+
+    async def exec(self, query):
+        return self.sync.exec(query)
+
+
+def test_async_build_runs_off_the_event_loop(monkeypatch):
+    import asyncio
+    import threading
+    from api.core import spatial_index
+
+    async def versions(session, city, *models):
+        return "v"
+    monkeypatch.setattr(spatial_index, "content_versions_async", versions)
+    spatial_index.reset_spatial_indexes()
+    threads = []
+    real_build = spatial_index._build
+    monkeypatch.setattr(spatial_index, "_build", lambda *a: threads.append(threading.current_thread()) or real_build(*a))
+
+    session = _AsyncSession([SimpleNamespace(id=1, title_ru="A", lat=54.71, lon=20.51)], [])
+    index = asyncio.run(spatial_index.get_city_index_async(session, "kgd"))
+    assert len(index) == 1 and threads and threads[0] is not threading.main_thread()
+    spatial_index.reset_spatial_indexes()
+
+
+@pytest.mark.parametrize("lat", [90, -90])
+def test_pole_and_world_box_walk_populated_cells(lat):
+    import time
+    from api.core.spatial_index import CityIndex
+    points = _points() + [{"kind": "poi", "id": "pole", "title": "pole", "lat": lat, "lon": 20.5}]
+    index = CityIndex("v1", points)
+
+    start = time.perf_counter()
+    hits = index.nearby(lat, 20.5, 5000, 10, {"poi"})
+    world = index.within_bbox(-90, -180, 90, 180, "helper")
+    assert time.perf_counter() - start < 0.5
+    assert [p["id"] for _, p in hits] == ["pole"]
+    assert len(world) == sum(1 for p in points if p["kind"] == "helper")
+
+
+def test_build_locks_not_kept_per_slug(monkeypatch):
+    import asyncio
+    from api.core import caching, spatial_index
+
+    async def versions(session, city, *models):
+        return "v"
+    monkeypatch.setattr(spatial_index, "content_versions", lambda session, city, *models: "v")
+    monkeypatch.setattr(spatial_index, "content_versions_async", versions)
+    spatial_index.reset_spatial_indexes()
+
+    for i in range(50):
+        spatial_index.get_city_index(_Session([], []), f"slug-{i}")
+        asyncio.run(spatial_index.get_city_index_async(_AsyncSession([], []), f"slug-{i}"))
+    assert not [k for k in caching._thread_flights if k.startswith("spatial_index:")]
+    assert not [k for k in caching._async_flights if k.startswith("spatial_index:")]
@@ -0,0 +1,111 @@
+"""
+Unit-тесты для автодополнения названий POI и туров (core/suggest.py)
+"""
+from types import SimpleNamespace
+
+import pytest
+
+TITLES = [
+    ("poi", 1, "Кафедральный собор", "Königsberg Cathedral"),
+    ("poi", 2, "Дом-музей Канта", "Kant House Museum"),
+    ("poi", 3, "Музей янтаря", "Amber Museum"),
+    ("poi", 4, "Королёвские ворота", "King's Gate"),
+    ("tour", 5, "Кант и его город", None),
+    ("tour", 6, "Форты Кёнигсберга", "Forts of Königsberg"),
+]
+
+
+def _index():
+    from api.core.suggest import SuggestIndex
+    return SuggestIndex("v1", [
+        {"type": kind, "id": i, "title_ru": ru, "title_en": en} for kind, i, ru, en in TITLES
+    ])
+
+
+def _ids(items):
+    return [item["id"] for item in items]
+
+
+def test_normalize_words_folds_and_transliterates():
+    from api.core.suggest import normalize_words
+    assert normalize_words("Дом-музей Канта") == ["dom", "muzei", "kanta"]
+    assert normalize_words("Королёвские ВОРОТА!") == normalize_words("королевские ворота")
+    assert normalize_words("Königsberg") == ["konigsberg"]
+    assert normalize_words(None) == []
+
+
+@pytest.mark.parametrize("query", ["кант", "Kant", "КАНТ"])
+def test_scripts_and_case_match_the_same_titles(query):
+    # both are title-start matches ("Kant House Museum"): shorter title_ru first
+    assert _ids(_index().suggest(query, 10)) == [2, 5]
+
+
+def test_infix_at_word_boundary_and_yo():
+    index = _index()
+    assert _ids(index.suggest("собор", 10)) == [1]
+    assert _ids(index.suggest("королев", 10)) == [4]
+    assert _ids(index.suggest("кенигсб", 10)) == [6]
+    assert _ids(index.suggest("konigsberg", 10)) == [1, 6]
+
+
+def test_every_query_word_must_match():
+    index = _index()
+    assert _ids(index.suggest("муз кант", 10)) == [2]
+    assert _ids(index.suggest("муз", 10)) == [3, 2]
+    assert index.suggest("муз парк", 10) == []
+    assert index.suggest("  ", 10) == []
+
+
+def test_limit():
+    assert len(_index().suggest("м", 1)) == 1
+
+
+class _Session:
+    """Answers the two build queries in order: POIs, then tours."""
+
+    def __init__(self, pois, tours):
+        self.results, self.queries = [pois, tours], 0
+
+    def exec(self, query):
+        rows = self.results[self.queries % 2]
+        self.queries += 1
+        return SimpleNamespace(all=lambda: rows)
+
+
+def test_rebuilt_only_when_version_changes(monkeypatch):
+    from api.core import suggest
+    versions = ["poi:1|tour:1"]
+    monkeypatch.setattr(suggest, "content_versions", lambda session, city, *models: versions[0])
+    monkeypatch.setattr(suggest.config, "SUGGEST_INDEX_CHECK_SECONDS", 0)
+    suggest.reset_suggest_indexes()
+    session = _Session([SimpleNamespace(id=1, title_ru="Собор", title_en=None)],
+                       [SimpleNamespace(id=2, title_ru="Обзорный тур", title_en="City tour")])
+
+    first = suggest.get_suggest_index(session, "kgd")
+    again = suggest.get_suggest_index(session, "kgd")
+    assert again is first and session.queries == 2
+    assert first.suggest("tour", 5) == [{"type": "tour", "id": 2, "title_ru": "Обзорный тур", "title_en": "City tour"}]
+
+    versions[0] = "poi:2|tour:1"
+    rebuilt = suggest.get_suggest_index(session, "kgd")
+    assert rebuilt is not first and session.queries == 4
+    suggest.reset_suggest_indexes()
+
+
+def test_empty_city_not_kept(monkeypatch):
+    from api.core import suggest
+    monkeypatch.setattr(suggest, "content_versions", lambda session, city, *models: "v")
+    suggest.reset_suggest_indexes()
+
+    assert suggest.get_suggest_index(_Session([], []), "no-such-city").suggest("a", 5) == []
+    assert "no-such-city" not in suggest._indexes
+
+
+def test_build_locks_not_kept_per_slug(monkeypatch):
+    from api.core import caching, suggest
+    monkeypatch.setattr(suggest, "content_versions", lambda session, city, *models: "v")
+    suggest.reset_suggest_indexes()
+
+    for i in range(50):
+        suggest.get_suggest_index(_Session([], []), f"slug-{i}")
+    assert not [k for k in caching._thread_flights if k.startswith("suggest:")]
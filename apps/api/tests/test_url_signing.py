@@ -0,0 +1,110 @@
+"""
+Unit-тесты для пакетной подписи URL ресурсов (core/security.AssetUrlSigner)
+"""
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+
+@pytest.fixture
+def security(monkeypatch):
+    from api.core import security
+    monkeypatch.setattr(security.config, "YOOKASSA_WEBHOOK_SECRET", "test-platform-secret")
+    monkeypatch.setattr(security, "_signatures", {})
+    return security
+
+
+def _params(url):
+    return {k: v[0] for k, v in parse_qs(urlsplit(url).query).items()}
+
+
+def test_expiry_is_bucketed_and_never_shorter(security, monkeypatch):
+    monkeypatch.setattr(security.time, "time", lambda: 1_000_001.0)
+    signer = security.AssetUrlSigner(ttl_seconds=3600)
+    assert signer.expires % security.SIGNATURE_BUCKET_SECONDS == 0
+    assert 1_000_001 + 3600 <= signer.expires < 1_000_001 + 3600 + security.SIGNATURE_BUCKET_SECONDS
+
+
+def test_signed_urls_verify(security):
+    url = security.sign_asset_url("https://cdn.test/a.mp3")
+    params = _params(url)
+    assert security.verify_asset_signature("https://cdn.test/a.mp3", params["token"], int(params["expires"]))
+    assert not security.verify_asset_signature("https://cdn.test/b.mp3", params["token"], int(params["expires"]))
+
+
+def test_repeated_urls_hmac_once_per_bucket(security, monkeypatch):
+    calls = []
+    real_new = security.hmac.new
+
+    def counting_new(*args, **kwargs):
+        calls.append(1)
+        return real_new(*args, **kwargs)
+
+    monkeypatch.setattr(security.hmac, "new", counting_new)
+    urls = ["https://cdn.test/a.mp3", "https://cdn.test/b.jpg", "https://cdn.test/a.mp3"]
+    first = security.AssetUrlSigner().sign_many(urls)
+    second = security.AssetUrlSigner().sign_many(urls)  # next response, same bucket
+    assert first == second
+    assert first[0] == first[2]
+    assert len(calls) == 2
+
+
+def test_existing_query_and_empty_urls(security):
+    sign = security.AssetUrlSigner()
+    assert sign("") == ""
+    assert sign(None) is None
+    signed = sign("https://cdn.test/a.jpg?w=100")
+    assert signed.startswith("https://cdn.test/a.jpg?w=100&token=")
+
+
+def test_missing_secret_returns_url_unsigned(security, monkeypatch):
+    monkeypatch.setattr(security.config, "YOOKASSA_WEBHOOK_SECRET", None)
+    assert security.AssetUrlSigner()("https://cdn.test/a.mp3") == "https://cdn.test/a.mp3"
+
+
+POI_DIR = "https://cdn.test/poi/6f1c2f8e-1d5b-4d59-a8b7-5a3c1c1e9a10/"
+
+
+def test_asset_prefix_only_for_entity_directories(security):
+    assert security.asset_prefix(POI_DIR + "a.jpg?w=1") == POI_DIR
+    assert security.asset_prefix("https://cdn.test/narrations/6f1c2f8e-1d5b-4d59-a8b7-5a3c1c1e9a10.mp3") is None
+    assert security.asset_prefix("https://cdn.test/poi/a.jpg") is None
+
+
+def test_prefix_token_covers_directory_only(security):
+    t = security.sign_asset_prefix(POI_DIR)
+    ok = lambda url: security.verify_asset_access(url, t["token"], t["expires"], prefix=t["prefix"])
+    assert ok(POI_DIR + "a.jpg")
+    assert ok(POI_DIR + "sub/b.mp3")
+    assert not ok("https://cdn.test/poi/other/a.jpg")
+    assert not ok(POI_DIR + "../other/a.jpg")
+    assert not ok(POI_DIR + "%2E%2E/other/a.jpg")
+    assert not security.verify_asset_access(POI_DIR + "a.jpg", t["token"], t["expires"] + 300, prefix=t["prefix"])
+
+
+def test_per_url_token_is_not_a_prefix_token(security):
+    params = _params(security.sign_asset_url(POI_DIR.rstrip("/")))
+    assert not security.verify_asset_prefix_token(POI_DIR + "a.jpg", POI_DIR, params["token"], int(params["expires"]))
+
+
+def test_prefix_mode_signer_collects_tokens(security):
+    sign = security.AssetUrlSigner(prefix_scoped=True)
+    urls = sign.sign_many([POI_DIR + "a.jpg", POI_DIR + "b.jpg", "https://cdn.test/narrations/x.mp3"])
+    assert urls[:2] == [POI_DIR + "a.jpg", POI_DIR + "b.jpg"]
+    assert "token=" in urls[2]
+    assert [t["prefix"] for t in sign.tokens()] == [POI_DIR]
+
+
+def test_buckets_created_and_evicted_across_threads(security, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    monkeypatch.setattr(security.time, "time", lambda: 1_000_000.0)
+
+    def sign(i):
+        security._bucket_signatures(900_000 + i)  # expired: evicted by the next new bucket
+        security._bucket_signatures(1_000_010 + i % 20)[str(i)] = "sig"
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(sign, range(4000)))
+    # one dict per live expiry: concurrent creations did not replace each other
+    for k in range(20):
+        assert set(security._signatures[1_000_010 + k]) == {str(i) for i in range(k, 4000, 20)}